@@ -1,5 +1,103 @@
-from .magister_session import MagisterSession
-from .request_manager import LoginRequestsSender, AuthorizedRequestSender
-from .jsparser import *
-from .magister_errors import *
-from .response_items import *
+'''
+The classes of MagisterPy are loaded the first time they are used (PEP 562), so importing the package
+(or a module like MagisterPy.response_items) doesn't load requests, aiohttp or numpy until they are needed.
+'''
+import importlib
+from typing import TYPE_CHECKING
+
+# attribute name -> module it is defined in
+_lazy_attributes = {
+    "MagisterSession": "magister_session",
+    "AsyncMagisterSession": "async_magister_session",
+    "MagisterSessionPool": "session_pool",
+    "PoolResult": "session_pool",
+    "TokenRefresher": "token_refresher",
+    "RetryPolicy": "retry_policy",
+    "CircuitBreaker": "retry_policy",
+    "CircuitBreakerRegistry": "retry_policy",
+    "ScheduleCache": "schedule_cache",
+    "GradeSync": "grade_sync",
+    "GradeSyncState": "grade_sync",
+    "GradeSyncStore": "grade_sync",
+    "InMemoryGradeSyncStore": "grade_sync",
+    "SQLiteGradeSyncStore": "grade_sync",
+    "LoginRequestsSender": "request_manager",
+    "AuthorizedRequestSender": "request_manager",
+    "SharedHTTPAdapter": "request_manager",
+    "RateLimiter": "request_manager",
+    "JsParser": "jsparser",
+    "AuthcodeScanner": "jsparser",
+    "AUTHCODE_WINDOW": "jsparser",
+    "BaseMagisterError": "magister_errors",
+    "UnableToInputCredentials": "magister_errors",
+    "IncorrectCredentials": "magister_errors",
+    "ConnectionError": "magister_errors",
+    "NotLoggedInError": "magister_errors",
+    "AuthcodeError": "magister_errors",
+    "FetchError": "magister_errors",
+    "InvalidSessionState": "magister_errors",
+    "CircuitOpenError": "magister_errors",
+    "DroppedFieldError": "magister_errors",
+    "parse_datetime": "response_items",
+    "parse_datetimes": "response_items",
+    "parse_grade_value": "response_items",
+    "JsonResponseItem": "response_items",
+    "Lesson": "response_items",
+    "Grade": "response_items",
+    "PersonProfile": "response_items",
+    "AccountProfile": "response_items",
+    "CompactLesson": "compact_items",
+    "CompactGrade": "compact_items",
+    "CompactPersonProfile": "compact_items",
+    "CompactAccountProfile": "compact_items",
+    "ScheduleFrame": "frames",
+    "GradeFrame": "frames",
+    "GradeStatistics": "grade_statistics",
+    "Tracer": "tracing",
+    "TraceEvent": "tracing",
+    "RecordingTracer": "tracing",
+    "OpenTelemetryTracer": "tracing",
+    "MetricsRegistry": "metrics",
+    "MetricsServer": "metrics",
+    "default_metrics_registry": "metrics",
+    "QueueLogging": "session_logging",
+    "AuthcodeCache": "authcode_cache",
+    "default_authcode_cache": "authcode_cache",
+}
+
+__all__ = list(_lazy_attributes)
+
+
+def __getattr__(name):
+    module_name = _lazy_attributes.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # the next lookups don't go through __getattr__ anymore
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .magister_session import MagisterSession
+    from .async_magister_session import AsyncMagisterSession
+    from .session_pool import MagisterSessionPool, PoolResult
+    from .token_refresher import TokenRefresher
+    from .retry_policy import RetryPolicy, CircuitBreaker, CircuitBreakerRegistry
+    from .schedule_cache import ScheduleCache
+    from .grade_sync import GradeSync, GradeSyncState, GradeSyncStore, InMemoryGradeSyncStore, SQLiteGradeSyncStore
+    from .request_manager import LoginRequestsSender, AuthorizedRequestSender, SharedHTTPAdapter, RateLimiter
+    from .jsparser import JsParser, AuthcodeScanner, AUTHCODE_WINDOW
+    from .magister_errors import *
+    from .response_items import *
+    from .compact_items import CompactLesson, CompactGrade, CompactPersonProfile, CompactAccountProfile
+    from .frames import ScheduleFrame, GradeFrame
+    from .grade_statistics import GradeStatistics
+    from .tracing import Tracer, TraceEvent, RecordingTracer, OpenTelemetryTracer
+    from .metrics import MetricsRegistry, MetricsServer, default_metrics_registry
+    from .session_logging import QueueLogging
+    from .authcode_cache import AuthcodeCache, default_authcode_cache
@@ -0,0 +1,911 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+import weakref
+from typing import AsyncIterator, Optional
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from .request_manager import LoginRequestsSender, AuthorizedRequestSender
+from .jsparser import AuthcodeScanner
+from .error_handler import async_error_handler, set_relogging_in, reset_relogging_in, collect_relogin_failures, reset_relogin_failures, report_server_failure
+from .magister_errors import *
+from .response_items import *
+from .compact_items import CompactLesson, CompactGrade, CompactPersonProfile, CompactAccountProfile
+from .authcode_cache import AuthcodeCache, default_authcode_cache
+from .retry_policy import RetryPolicy
+from .tracing import Tracer, trace_request, record_phase
+from .metrics import MetricsRegistry, SessionMetrics, default_metrics_registry
+from .session_logging import log_session_message
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError:  # aiohttp is an optional dependency (pip install MagisterPy[async])
+    aiohttp = None
+
+
+# one connection pool per event loop, shared by all of the sessions running on that loop
+_shared_connectors = weakref.WeakKeyDictionary()
+
+
+def get_shared_connector(limit: int = 100, limit_per_host: int = 0) -> "aiohttp.TCPConnector":
+    '''
+    returns the connection pool that is shared by all of the AsyncMagisterSessions on the running event loop.
+    The limits are only used when the pool gets created.
+    '''
+    loop = asyncio.get_running_loop()
+    connector = _shared_connectors.get(loop)
+    if connector is None or connector.closed:
+        connector = aiohttp.TCPConnector(
+            limit=limit, limit_per_host=limit_per_host)
+        _shared_connectors[loop] = connector
+    return connector
+
+
+class AsyncResponse():
+    '''
+    The fully read response of an aiohttp request. Mirrors the parts of requests.Response that are used by the session.
+    '''
+
+    def __init__(self, status_code: int, url: str, headers, content: bytes, encoding: Optional[str] = None):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def __bool__(self):
+        return self.status_code < 400
+
+    def __repr__(self):
+        return f"<AsyncResponse [{self.status_code}]>"
+
+
+def _url(url: str) -> "URL":
+    # the urls used during the login are already encoded and have to be sent exactly as they are
+    return URL(url, encoded=True)
+
+
+async def send_request(request_session: "aiohttp.ClientSession", method: str, url: str, headers: Optional[dict] = None,
+                       tracer: Optional[Tracer] = None, phase: str = "request", retries: int = 0, **kwargs) -> AsyncResponse:
+    '''
+    sends a request and reads the whole response so the connection can go back to the pool right away.
+    The request is reported to the tracer (if there is one) under the phase.
+    It is retried up to retries times on a connection error, a timeout or a temporary server error, like AuthorizedRequestSender does.
+    Requests that are not idempotent (POST) are only retried if the connection couldn't be made
+    '''
+    if headers is not None:
+        # aiohttp doesn't skip headers without a value like requests does
+        headers = {key: value for key,
+                   value in headers.items() if value is not None}
+    idempotent = method.upper() in AuthorizedRequestSender.IDEMPOTENT_METHODS
+    with trace_request(tracer, phase, method, url) as event:
+        atempt = 0
+        while True:
+            try:
+                async with request_session.request(method, _url(url), headers=headers, **kwargs) as response:
+                    content = await response.read()
+                    response = AsyncResponse(status_code=response.status, url=str(response.url), headers=response.headers,
+                                             content=content, encoding=response.get_encoding() if content else None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if atempt >= retries or (not idempotent and not isinstance(e, aiohttp.ClientConnectorError)):
+                    event.set(retries=atempt)
+                    raise
+            else:
+                if response.status_code not in AuthorizedRequestSender.RETRY_STATUS_CODES or atempt >= retries or not idempotent:
+                    event.set(retries=atempt)
+                    event.set_response(response)
+                    return response
+
+            await asyncio.sleep(AuthorizedRequestSender.RETRY_POLICY.get_delay(atempt))
+            atempt += 1
+
+
+class AsyncLoginRequestsSender(LoginRequestsSender):
+    '''
+    The asyncio version of LoginRequestsSender. The parsing helpers are inherited, the requests are awaitable.
+    '''
+
+    async def get_accountid(self, request_session, app_auth_token, api_url) -> str:
+        url = f"{api_url}/sessions/current"
+
+        headers = {
+            "authorization": app_auth_token
+        }
+        response = await send_request(request_session, "GET", url, headers=headers, tracer=self.tracer, phase="account_id")
+        if response.status_code == 200:
+            response_link = response.json()["links"]["account"]["href"]
+            account_id = response_link[response_link.rfind("/")+1:]
+
+            return account_id
+
+    async def get_personid(self, request_session, app_auth_token, api_url, account_id) -> str:
+
+        url = f"{api_url}/accounts/{account_id}"
+
+        headers = {
+            "authorization": app_auth_token
+        }
+
+        response = await send_request(request_session, "GET", url, headers=headers, tracer=self.tracer, phase="person_id")
+
+        if response.status_code == 200:
+            response_link = response.json()["links"]["leerling"]["href"]
+            personid = response_link[response_link.rfind("/")+1:]
+
+            return personid
+
+    async def get_profile_auth_token(self, request_session) -> str:
+        url = r"https://accounts.magister.net/connect/authorize?client_id=iam-profile&redirect_uri=https%3A%2F%2Faccounts.magister.net%2Fprofile%2Foidc%2Fredirect_callback.html&response_type=id_token%20token&scope=openid%20profile%20email%20magister.iam.profile&state=57dcb9c3b667407791ff32a7af41e703&nonce=ec78d557c0e44751bf573db6719445cd"
+        response = await send_request(request_session, "GET", url, allow_redirects=False, tracer=self.tracer, phase="profile_token")
+
+        url = response.headers["Location"]
+        return "Bearer " + self.extract_auth_token(url)
+
+    async def get_app_auth_token(self, request_session, api_url) -> str:
+        url = "https://accounts.magister.net/connect/authorize"
+        subdomain = self.get_subdomain(api_url)
+        params = {
+            "client_id": f"M6-{subdomain}.magister.net",
+            "redirect_uri": f"https://{subdomain}.magister.net/oidc/redirect_callback.html",
+            "response_type": "id_token token",
+            "scope": "openid profile opp.read opp.manage attendance.overview attendance.administration "
+            "calendar.user calendar.ical.user calendar.to-do.user grades.read grades.manage "
+            "oso.administration registration.admin lockers.administration enrollment.admin",
+            "state": "57dcb9c3b667407791ff32a7af41e703",
+            "nonce": "ec78d557c0e44751bf573db6719445cd",
+            "acr_values": f"tenant:{subdomain}.magister.net"
+        }
+
+        response = await send_request(request_session, "GET", url, params=params, allow_redirects=False,
+                                      tracer=self.tracer, phase="app_token")
+        url = response.headers["Location"]
+        return "Bearer " + self.extract_auth_token(url)
+
+    async def get_api_url(self, request_session, profile_auth_token) -> str:
+        headers = {"authorization": profile_auth_token}
+
+        response = await send_request(request_session, "GET", "https://magister.net/.well-known/host-meta.json", headers=headers,
+                                      tracer=self.tracer, phase="host_meta")
+
+        items = response.json()
+        main_page = items["links"][0]["href"]
+        return main_page
+
+    async def search_for_tenant_id(self, request_session, school_name, session_id) -> str:
+        response = await send_request(request_session, "GET", "https://accounts.magister.net/challenges/tenant/search",
+                                      params={"sessionId": session_id, "key": school_name}, tracer=self.tracer, phase="tenant_search")
+        return response.json()[0]["id"]
+
+    async def set_school(self, request_session, school_name, main_payload) -> AsyncResponse:
+
+        tenant_id = await self.search_for_tenant_id(
+            request_session, school_name, main_payload["sessionId"])
+        main_payload["tenant"] = tenant_id
+
+        return await self.send_post_request(request_session, main_payload, "https://accounts.magister.net/challenges/tenant", phase="tenant_challenge")
+
+    async def extract_dynamic_authcode_streaming(self, request_session, bundle_url: str, chunk_size: int = 16384) -> str:
+        '''
+        downloads the account javascript bundle in chunks and stops as soon as the marker of the authcode has been received
+        '''
+        scanner = AuthcodeScanner()
+        # the parsing is spread over the chunks, so its time is added up to report it separately from the download
+        parse_seconds = 0.0
+        with trace_request(self.tracer, "bundle_download", "GET", bundle_url) as event:
+            async with request_session.get(_url(bundle_url)) as response:
+                event.set(status_code=response.status)
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    start = time.perf_counter()
+                    scanner.feed(chunk)
+                    parse_seconds += time.perf_counter() - start
+                    if scanner.done:
+                        # the rest of the bundle isn't needed, so the connection is closed instead of being read to the end
+                        response.close()
+                        break
+            event.set(bytes_received=scanner.bytes_received)
+        start = time.perf_counter()
+        authcode = scanner.finish()
+        record_phase(self.tracer, "authcode_parse", parse_seconds + time.perf_counter() - start,
+                     bytes_received=scanner.bytes_received)
+        return authcode
+
+    async def set_password(self, request_session, password, main_payload) -> AsyncResponse:
+        main_payload["password"] = password
+        main_payload["userWantsToPairSoftToken"] = False
+        return await self.send_post_request(request_session, main_payload, "https://accounts.magister.net/challenges/password", phase="password_challenge")
+
+    async def set_username(self, request_session, username, main_payload) -> AsyncResponse:
+
+        main_payload["username"] = username
+        return await self.send_post_request(request_session, main_payload, "https://accounts.magister.net/challenges/username", phase="username_challenge")
+
+    async def send_post_request(self, request_session, payload, url, auth_token=None, phase: str = "challenge") -> AsyncResponse:
+        xsrf_token = None
+        for cookie in request_session.cookie_jar:
+            if cookie.key == "XSRF-TOKEN":
+                xsrf_token = cookie.value
+
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "authorization": auth_token,
+            "origin": "https://accounts.magister.net",
+            "x-xsrf-token": xsrf_token
+        }
+
+        return await send_request(request_session, "POST", url, json=payload, headers=headers, tracer=self.tracer, phase=phase)
+
+
+class AsyncMagisterSession():
+    '''
+    Creates an asyncio session with Magister. It works the same way as MagisterSession, but all of the methods that
+    send requests have to be awaited. All of the AsyncMagisterSessions on an event loop share one connection pool,
+    so a single event loop can drive a lot of sessions at once.
+
+    Requires aiohttp (pip install MagisterPy[async])
+
+    Parameters:
+            enable_logging (bool):  Used to display information in the standard output. The messages are always logged to the
+            "MagisterPy.session" logger as well, with the tenant, account_id and correlation_id of the session (see MagisterPy.session_logging)
+
+            automatically_handle_errors (bool): Used to automatically handle errors. If any function fails it returns None instead of raising an error
+
+            enable_automatic_relogin (bool): If set to True the session will atempt to relogin when it detects that a method has raised an error caused by session expiring or poor internet connection
+
+            max_relogin_atempts (int): Specifies how many times the session will try to reconnect before throwing an error
+
+            delay_between_relogin_atempts (int) The base delay in seconds between the relogin atempts. The delay grows exponentially with random jitter.
+
+            retry_policy (RetryPolicy): Decides how long to wait between the relogin atempts and stops relogging in to a school that keeps failing. Defaults to a policy based on delay_between_relogin_atempts
+
+            enable_authcode_cache (bool): If set to True the authcode extracted from the account javascript is cached, so it doesn't get downloaded and parsed on every login
+
+            authcode_cache (AuthcodeCache): The cache used for the authcodes. Defaults to a cache that is shared by all of the sessions in the process
+
+            connector (aiohttp.BaseConnector): The connection pool used for the requests. Defaults to the pool shared by all of the sessions on the event loop
+
+            request_timeout (float): How many seconds to wait for the Magister API before giving up on a request. None waits forever
+
+            request_retries (int): How many times a request to the Magister API is retried after a connection error or a temporary server error.
+            POST requests are only retried when the connection couldn't be made
+
+            cancellations_from_status (bool): If set to True get_schedule(with_changes=True) detects the cancelled lessons using their Status field,
+            which only needs one request instead of two
+
+            compact_items (bool): If set to True the methods return the compact items (CompactLesson, CompactGrade, ...) that only keep the fields
+            used by their getters. They use a lot less memory when a lot of items are kept around, but they are read only
+
+            keep_raw_json (bool): If set to True the compact items also keep their whole json (as compact bytes), so all of its fields can
+            still be read. Without it reading a field the getters don't use raises DroppedFieldError
+
+            tracer (Tracer): Gets called at the start and the end of every request with the phase of the login or fetch it belongs to
+            (see MagisterPy.tracing). Defaults to None, which skips the tracing completely
+
+            enable_metrics (bool): If set to True the session counts its calls, errors, relogins and cache lookups (see MagisterPy.metrics).
+            Defaults to None, which only turns them on if a metrics_registry is given. Without metrics they are skipped completely
+
+            metrics_registry (MetricsRegistry): The registry the metrics are reported into. Passing one turns the metrics on (unless enable_metrics is False).
+            Defaults to a registry that is shared by all of the sessions in the process
+
+    Example:
+        async with AsyncMagisterSession() as session:
+            await session.login(school_name="School_name", username="your_username", password="your_password")
+            grades = await session.get_grades(top=1)
+    '''
+
+    def __init__(self, enable_logging=False, automatically_handle_errors=True, max_relogin_atempts=5, enable_automatic_relogin=True, delay_between_relogin_atempts=2,
+                 enable_authcode_cache=True, authcode_cache: Optional[AuthcodeCache] = None, retry_policy: Optional[RetryPolicy] = None, connector: Optional["aiohttp.BaseConnector"] = None,
+                 request_timeout: Optional[float] = None, request_retries: int = 0, cancellations_from_status: bool = False, compact_items: bool = False, keep_raw_json: bool = False, tracer: Optional[Tracer] = None,
+                 enable_metrics: Optional[bool] = None, metrics_registry: Optional[MetricsRegistry] = None):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncMagisterSession requires aiohttp. Install it using: pip install MagisterPy[async]")
+
+        self.connector = connector
+        self.tracer = tracer
+        if enable_metrics is None:
+            # a session that is given a registry is meant to report into it
+            enable_metrics = metrics_registry is not None
+        if not enable_metrics:
+            self.metrics = None
+        else:
+            self.metrics = SessionMetrics(
+                metrics_registry if metrics_registry is not None else default_metrics_registry)
+        self.session = None
+        # the tasks that fail while another task is relogging in wait for it instead of starting their own relogin
+        self.__relogin_future = None
+        self.token_generation = 0  # increases every time the session logs in and gets a new app_auth_token
+        self.__set_vars()
+
+        self.automatically_handle_errors = automatically_handle_errors
+        # errors that are caused by a bad connection and should invoke a relogin
+        self.connection_errors = (aiohttp.ClientConnectionError,)
+        # errors that are handled without a relogin, the server was only slow so a new token wouldn't help
+        self.timeout_errors = (asyncio.TimeoutError,)
+
+        self.max_relogin_atempts = max_relogin_atempts
+        self.relogin_atempts = max_relogin_atempts
+        self.enable_automatic_relogin = enable_automatic_relogin
+        self.delay_between_relogin_atempts = delay_between_relogin_atempts
+        if retry_policy is None:
+            retry_policy = RetryPolicy(base_delay=delay_between_relogin_atempts)
+        self.retry_policy = retry_policy
+
+        self.recieve_log = enable_logging
+        self.request_timeout = request_timeout
+        self.request_retries = request_retries
+        self.cancellations_from_status = cancellations_from_status
+        self.compact_items = compact_items
+        self.keep_raw_json = keep_raw_json
+        # the classes the responses are wrapped in
+        if compact_items:
+            self.lesson_class = functools.partial(CompactLesson, keep_raw=keep_raw_json)
+            self.grade_class = functools.partial(CompactGrade, keep_raw=keep_raw_json)
+            self.person_profile_class = functools.partial(CompactPersonProfile, keep_raw=keep_raw_json)
+            self.account_profile_class = functools.partial(CompactAccountProfile, keep_raw=keep_raw_json)
+        else:
+            self.lesson_class, self.grade_class = Lesson, Grade
+            self.person_profile_class, self.account_profile_class = PersonProfile, AccountProfile
+
+        if not enable_authcode_cache:
+            self.authcode_cache = None
+        elif authcode_cache is None:
+            self.authcode_cache = default_authcode_cache
+        else:
+            self.authcode_cache = authcode_cache
+
+    def __set_vars(self, reset_credentials=None):
+        '''
+        Sets/resets all of the variables back to their original state.
+        '''
+        if reset_credentials is None:
+            reset_credentials = True
+
+        self.request_sender = AsyncLoginRequestsSender(tracer=self.tracer)
+        self.profile_auth_token = None
+        self.app_auth_token = None
+        self.app_auth_token_expiry = None
+        self.authcode = None
+        self.sessionid = None
+        self.returnurl = None
+        self.main_payload = None
+        self.person_id = None
+        self.account_id = None
+        self.api_url = None
+        self.x_correlation_id = None
+        if reset_credentials:
+            self.__school_name = None
+            self.__username = None
+            self.__password = None
+
+    def __new_client_session(self) -> "aiohttp.ClientSession":
+        connector = self.connector
+        if connector is None:
+            connector = get_shared_connector()
+        # the 5xx responses of a relogin count for the circuit breaker of the school
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(self.__on_request_end)
+        # every session gets its own cookies but the connections are shared
+        return aiohttp.ClientSession(connector=connector, connector_owner=False, cookie_jar=aiohttp.CookieJar(),
+                                     trace_configs=[trace_config])
+
+    async def __on_request_end(self, client_session, context, params) -> None:
+        report_server_failure(self, params.response.status)
+
+    async def __close_client_session(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def clear(self, reset_credentials: bool = True) -> None:
+        '''
+        Closes the current session and resets all of the variables.
+
+        params:
+        reset_credentials (bool) -> if True also resets the credentials stored inside of the class. That means that the future use of relogin() will cause an error
+        -> If False doesn't reset credentials. That means you can use relogin() to log back into Magister.
+        '''
+        await self.__close_client_session()
+        self.__set_vars(reset_credentials=reset_credentials)
+        self._logMessage("Session has successfully been cleared")
+
+    async def close(self) -> None:
+        '''
+        Closes the session. The shared connection pool stays open for the other sessions
+        '''
+        await self.__close_client_session()
+
+    async def __aenter__(self):
+        await self.clear()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.clear()
+
+    def _logMessage(self, msg: str, *args, level: int = logging.INFO, exc_info=None):
+        '''
+        logs the message with the context of the session (see MagisterPy.session_logging). The args are only
+        merged into the message when it is emitted
+        '''
+        log_session_message(self, level, msg, args, exc_info=exc_info)
+
+    def _get_tenant(self) -> str:
+        '''
+        returns the name the metrics of the session are reported under: the host of the api or, before the first login, the school name
+        '''
+        if self.api_url:
+            return urlparse(self.api_url).netloc
+        return self.__school_name or "unknown"
+
+    def is_logged_in(self) -> bool:
+        '''
+        returns True -> user is logged in
+                False -> user still needs to log in
+        '''
+        # the password is only needed for relogging in, a session resumed from a state without it is still logged in
+        return self.app_auth_token and self.__school_name and self.__username
+
+    @async_error_handler
+    async def input_school(self, school_name: str) -> Optional[AsyncResponse]:
+        '''
+        Sets up a session by inputting the school name. This is the **first step** in the login sequence
+        and must be awaited before `input_username()` and `input_password()`.
+
+        Returns:
+            AsyncResponse: if the school is found and session is successfully initiated.
+            None: if the school is not found or there’s an issue in the school lookup.
+        '''
+        # clearing the session
+        await self.__close_client_session()
+        self.session = self.__new_client_session()
+
+        await send_request(self.session, "GET", "https://accounts.magister.net/", allow_redirects=False,
+                           tracer=self.tracer, phase="login_start")
+
+        redirect_url_1 = r"https://accounts.magister.net/connect/authorize?client_id=iam-profile&redirect_uri=https%3A%2F%2Faccounts.magister.net%2Fprofile%2Foidc%2Fredirect_callback.html&response_type=id_token%20token&scope=openid%20profile%20email%20magister.iam.profile&state=57dcb9c3b667407791ff32a7af41e703&nonce=ec78d557c0e44751bf573db6719445cd"
+        response = await send_request(self.session, "GET", redirect_url_1, allow_redirects=False,
+                                      tracer=self.tracer, phase="authorize_redirect")
+
+        response = await send_request(self.session, "GET", response.headers.get("location"), allow_redirects=False,
+                                      tracer=self.tracer, phase="login_redirect")
+
+        response = await send_request(self.session, "GET",
+                                      "https://accounts.magister.net/" + response.headers.get("location"), allow_redirects=False,
+                                      tracer=self.tracer, phase="login_page")
+
+        self.sessionid = parse_qs(urlparse(response.url).query).get(
+            'sessionId', [None])[0]
+        self.returnurl = parse_qs(urlparse(response.url).query).get(
+            'returnUrl', [None])[0]
+        self.x_correlation_id = parse_qs(urlparse(self.returnurl).query).get(
+            'X-Correlation-ID', [None])[0]
+
+        javascript_redirect_url = self.request_sender.extract_redirect_url_from_html(
+            response.text)
+        bundle_url = f"https://accounts.magister.net/{javascript_redirect_url}"
+
+        self.authcode, authcode_from_cache = await self.__get_authcode(bundle_url)
+
+        self.main_payload = {
+            'authCode': self.authcode,
+            'returnUrl': self.returnurl,
+            'sessionId': self.sessionid
+        }
+
+        try:
+            response = await self.request_sender.set_school(
+                request_session=self.session, school_name=school_name, main_payload=self.main_payload)
+            if response.status_code != 200 and authcode_from_cache:
+                # the cached authcode might be stale, so the bundle gets downloaded again before giving up
+                self._logMessage(
+                    "The cached authcode was rejected, downloading the authcode again")
+                if self.metrics is not None:
+                    self.metrics.record_authcode_cache("stale")
+                self.authcode_cache.invalidate(bundle_url)
+                self.authcode, _ = await self.__get_authcode(bundle_url)
+                self.main_payload["authCode"] = self.authcode
+                response = await self.request_sender.set_school(
+                    request_session=self.session, school_name=school_name, main_payload=self.main_payload)
+            if response.status_code != 200:
+                raise IncorrectCredentials(
+                    f"Could not find school: {school_name}")
+        except (ValueError, IndexError):
+            raise IncorrectCredentials(f"Could not find school: {school_name}")
+        self.__school_name = school_name
+        return response
+
+    async def __get_authcode(self, bundle_url: str) -> tuple:
+        '''
+        returns the authcode of the account javascript bundle and whether it came from the authcode cache
+        '''
+        if self.authcode_cache is not None:
+            authcode = self.authcode_cache.get(bundle_url)
+            if self.metrics is not None:
+                self.metrics.record_authcode_cache(
+                    "miss" if authcode is None else "hit")
+            if authcode is not None:
+                return authcode, True
+
+        # the authcode is found before the end of the bundle, so the rest of it isn't downloaded
+        authcode = await self.request_sender.extract_dynamic_authcode_streaming(self.session, bundle_url)
+
+        if self.authcode_cache is not None:
+            self.authcode_cache.set(bundle_url, authcode)
+        return authcode, False
+
+    @async_error_handler
+    async def input_username(self, username: str) -> Optional[AsyncResponse]:
+        '''
+        Sets the username for the current session. This is the **second step** in the login sequence
+        and must be awaited after `input_school()` but before `input_password()`.
+        '''
+        if not self.main_payload:
+            raise UnableToInputCredentials()
+        response = await self.request_sender.set_username(
+            request_session=self.session, username=username, main_payload=self.main_payload)
+        if response.status_code != 200:
+            raise IncorrectCredentials()
+        self.__username = username
+        return response
+
+    @async_error_handler
+    async def input_password(self, password: str) -> Optional[AsyncResponse]:
+        '''
+        Sets the password for the session and finalizes the login process. This is the **third and final step**
+        in the login sequence and must be awaited after `input_school()` and `input_username()`.
+        '''
+        if not self.main_payload:
+            raise UnableToInputCredentials()
+        response = await self.request_sender.set_password(
+            request_session=self.session, password=password, main_payload=self.main_payload)
+        if response.status_code != 200:
+            raise IncorrectCredentials(
+                "Incorrect password or the password input is on cooldown")
+
+        # setup for variables
+        self.profile_auth_token = await self.request_sender.get_profile_auth_token(
+            request_session=self.session)
+        self.api_url = await self.request_sender.get_api_url(
+            request_session=self.session, profile_auth_token=self.profile_auth_token)
+        self.app_auth_token = await self.request_sender.get_app_auth_token(
+            request_session=self.session, api_url=self.api_url)
+        self.app_auth_token_expiry = self.request_sender.get_token_expiry(
+            self.app_auth_token)
+        self.account_id = await self.request_sender.get_accountid(
+            request_session=self.session, app_auth_token=self.app_auth_token, api_url=self.api_url)
+        self.person_id = await self.request_sender.get_personid(
+            request_session=self.session, app_auth_token=self.app_auth_token, api_url=self.api_url, account_id=self.account_id)
+
+        self._logMessage("you have successfully logged in!")
+        self.__password = password
+        self.token_generation += 1
+        return response
+
+    @async_error_handler
+    async def login(self, school_name: str, username: str, password: str) -> bool:
+        '''
+        logs the user into their account
+
+        returns:
+        True -> if user logged in successfully
+        False -> if user wasn't able to login
+        '''
+        with trace_request(self.tracer, "login") as event:
+            event.set(success=False)
+            if not await self.input_school(school_name=school_name):
+                return False
+
+            if not await self.input_username(username=username):
+                return False
+
+            if not await self.input_password(password=password):
+                return False
+
+            event.set(success=True)
+            return True
+
+    async def wait_for_relogin(self) -> None:
+        '''
+        waits until the relogin running in another task is finished
+        '''
+        if self.__relogin_future is not None:
+            await asyncio.shield(self.__relogin_future)
+
+    async def relogin(self, token_generation: Optional[int] = None):
+        '''
+        Tries to relogin using the previously provided credentials (for example using login or input_{...} methods)
+        True -> if user logged in successfully
+        False -> if the session was resumed from a state without the password, so it can't relogin
+
+        raises an error if all the relogin atempts were used up
+
+        If several tasks call relogin at the same time only one of them relogs in, the others wait for it and get its result.
+
+        Keep in mind that the errors raised by this method are not handled automatically
+        '''
+        if token_generation is not None and token_generation != self.token_generation:
+            # another task has already relogged in after the failed call was made
+            return True
+        if self.__relogin_future is not None:
+            return await asyncio.shield(self.__relogin_future)
+
+        relogin_future = asyncio.get_running_loop().create_future()
+        self.__relogin_future = relogin_future
+        relogging_in_token = set_relogging_in(self)
+        tenant = self._get_tenant()
+        if self.metrics is not None:
+            self.metrics.relogin_started(tenant)
+        result = False
+        try:
+            result = await self.__relogin()
+            return result
+        finally:
+            reset_relogging_in(relogging_in_token)
+            if self.metrics is not None:
+                self.metrics.relogin_finished(tenant, bool(result))
+            self.__relogin_future = None
+            relogin_future.set_result(bool(result))
+
+    async def __relogin(self):
+        self._logMessage("Atempting to relogin...")
+        if None in (self.__school_name, self.__username):
+            raise NotLoggedInError()
+        if self.__password is None:
+            # a session resumed from a state without the password can't relogin, the caller handles it like a failed relogin
+            self._logMessage("Can't relogin without the password", level=logging.WARNING)
+            return False
+        circuit_breaker = self.retry_policy.get_circuit_breaker(
+            urlparse(self.api_url).netloc if self.api_url else self.__school_name)
+        try:
+            atempt = 0
+            while self.relogin_atempts > 0:
+                if not circuit_breaker.allow_request():
+                    raise CircuitOpenError()
+                self._logMessage("Atempts left: %s", self.relogin_atempts)
+                self.relogin_atempts -= 1
+                # only connection errors and server errors count for the circuit breaker that is shared by the whole school,
+                # incorrect credentials only use up the atempts of this session
+                failures = []
+                failures_token = collect_relogin_failures(failures)
+                result = False
+                try:
+                    result = await self.login(school_name=self.__school_name,
+                                              username=self.__username,
+                                              password=self.__password)
+                except Exception as e:
+                    report_server_failure(self, e)
+                    raise
+                finally:
+                    reset_relogin_failures(failures_token)
+                    # also runs for a NotLoggedInError or a KeyboardInterrupt, so a trial atempt is always finished
+                    if result:
+                        circuit_breaker.record_success()
+                    elif failures:
+                        circuit_breaker.record_failure()
+                    else:
+                        circuit_breaker.release()
+                    if self.metrics is not None:
+                        self.metrics.record_relogin_attempt(
+                            self._get_tenant(), bool(result))
+                if result:
+                    return True
+
+                if self.relogin_atempts > 0:
+                    await asyncio.sleep(self.retry_policy.get_delay(atempt))
+                atempt += 1
+        finally:
+            # the atempts are reset even if the relogin failed, so the session can relogin again later
+            self.relogin_atempts = self.max_relogin_atempts
+        raise ConnectionError(
+            "\nCould not reconect to your account after all of the atempts")
+
+    async def send_authorized_request(self, url: str, method: str = "GET", params: Optional[dict] = None, extra_headers: Optional[dict] = None,
+                                      phase: str = "api_request", **kwargs) -> AsyncResponse:
+        '''
+        sends a request to the Magister API using the app auth token of the session. The request is reported to the tracer under the phase.
+        It uses the request_timeout and the request_retries of the session
+        '''
+        headers = {"authorization": self.app_auth_token} | (extra_headers or {})
+        if self.request_timeout is not None:
+            kwargs.setdefault("timeout", aiohttp.ClientTimeout(total=self.request_timeout))
+        return await send_request(self.session, method, url, params=params, headers=headers, tracer=self.tracer, phase=phase,
+                                  retries=self.request_retries, **kwargs)
+
+    @async_error_handler
+    async def get_schedule(self, _from: str, to: str, with_changes=False) -> list[Lesson]:
+        '''
+        Retrieves the user’s schedule within a specified date range. See MagisterSession.get_schedule
+        '''
+        if not self.app_auth_token:
+            self._logMessage("You have not logged in yet", level=logging.WARNING)
+            return
+
+        params = {
+            "status": 1,
+            "tot": to,
+            "van": _from
+        }
+        # without the status parameter the cancelled lessons are included
+        params_with_cancelled = {
+            "tot": to,
+            "van": _from
+        }
+        url = f"{self.api_url}/personen/{self.person_id}/afspraken"
+
+        if with_changes and self.cancellations_from_status:
+            # the Status field tells which lessons are cancelled, so the schedule without the cancelled lessons isn't needed
+            response = await self.send_authorized_request(url, params=params_with_cancelled, phase="schedule")
+            if response.status_code != 200:
+                raise FetchError()
+            response_json = response.json().get("Items")
+            if response_json is None:
+                raise FetchError()
+            lessons = [self.lesson_class(lesson) for lesson in response_json]
+            for lesson in lessons:
+                lesson.cancelled = lesson.has_cancelled_status()
+            return lessons
+
+        response_original_schedule = None
+        if with_changes:
+            # both schedules are fetched at the same time
+            response, response_original_schedule = await asyncio.gather(
+                self.send_authorized_request(url, params=params, phase="schedule"),
+                self.send_authorized_request(url, params=params_with_cancelled, phase="schedule"))
+            if response_original_schedule.status_code == 200:
+                response_original_schedule = response_original_schedule.json().get("Items")
+            else:
+                response_original_schedule = None
+        else:
+            response = await self.send_authorized_request(url, params=params, phase="schedule")
+
+        if response.status_code == 200:
+
+            response_json = response.json().get("Items")
+
+            if response_json is None:
+                raise FetchError()
+            if response_original_schedule is not None and with_changes:
+                # lessons that only exist in the unfiltered schedule are the cancelled ones
+                response_json_ids = {lesson.get("Id")
+                                     for lesson in response_json}
+                response_original_schedule = [
+                    self.lesson_class(lesson) for lesson in response_original_schedule]
+                for lesson in response_original_schedule:
+                    if lesson.get_id() not in response_json_ids:
+                        lesson.cancelled = True
+                return response_original_schedule
+            return [self.lesson_class(lesson) for lesson in response_json]
+        raise FetchError()
+
+    @async_error_handler
+    async def get_grades(self, top: int = 25, skip: int = 0) -> list[Grade]:
+        '''
+        Retrieves the most recent grades for the user. See MagisterSession.get_grades
+        '''
+        if not self.app_auth_token:
+            self._logMessage("You have not logged in yet", level=logging.WARNING)
+            return
+
+        params = {
+            "top": top,
+            "skip": skip
+        }
+        url = f"{self.api_url}/personen/{self.person_id}/cijfers/laatste"
+        response = await self.send_authorized_request(url, params=params, phase="grades")
+
+        if response.status_code == 200:
+
+            response_json = response.json().get("items")
+            if response_json is None:
+                raise FetchError()
+            return [self.grade_class(grade) for grade in response_json]
+
+        raise FetchError()
+
+    async def iter_grades(self, page_size: int = 100, prefetch: int = 1) -> AsyncIterator[Grade]:
+        '''
+        Iterates over all of the grades of the user, from the most recent to the oldest, while the next pages
+        are already being fetched in the background. See MagisterSession.iter_grades
+
+        Example:
+            async for grade in session.iter_grades(page_size=50):
+                print(grade.get_value())
+        '''
+        pending_pages = deque()
+        next_skip = 0
+
+        def fetch_next_page():
+            nonlocal next_skip
+            pending_pages.append(asyncio.ensure_future(
+                self.get_grades(top=page_size, skip=next_skip)))
+            next_skip += page_size
+
+        try:
+            for _ in range(prefetch + 1):
+                fetch_next_page()
+            while pending_pages:
+                page = await pending_pages.popleft()
+                if page is None:
+                    # get_grades handled an error, stopping here would look like the end of the grades
+                    raise FetchError("\nCould not fetch a page of the grades")
+                if not page:
+                    return
+                if len(page) < page_size:
+                    # a page that isn't full is the last page
+                    for grade in page:
+                        yield grade
+                    return
+                fetch_next_page()
+                for grade in page:
+                    yield grade
+        finally:
+            for task in pending_pages:
+                task.cancel()
+
+    @async_error_handler
+    async def get_person_profile(self) -> PersonProfile:
+        '''
+        returns the current account's person profile. See MagisterSession.get_person_profile
+        '''
+        if not self.is_logged_in():
+            raise NotLoggedInError()
+        account_profile = await self.get_account_profile()
+        if account_profile is None:
+            raise FetchError()
+        all_links = account_profile.get_all_links()
+        api_endpoint = None
+        if "self" in all_links:
+            del all_links["self"]
+        for role in all_links:
+            api_endpoint = all_links.get(role, {}).get("href")
+            if api_endpoint is not None and len(api_endpoint) > 4:
+                break
+
+        if api_endpoint is not None:
+            response = await self.send_authorized_request(f"{self.api_url}/{api_endpoint[4:]}", phase="person_profile")
+
+            if response.status_code == 200:
+                return self.person_profile_class(response.json())
+        raise FetchError()
+
+    @async_error_handler
+    async def get_account_profile(self) -> AccountProfile:
+        '''
+        returns the account profile of the user. See MagisterSession.get_account_profile
+        '''
+        if not self.is_logged_in():
+            raise NotLoggedInError()
+        response = await self.send_authorized_request(f"{self.api_url}/accounts/{self.account_id}", phase="account_profile")
+
+        if response.status_code == 200:
+            return self.account_profile_class(response.json())
+        raise FetchError()
+
+    @async_error_handler
+    async def get_photo(self) -> bytes:
+        '''
+        returns the logged in user's photo as bytes
+        '''
+        if not self.is_logged_in():
+            raise NotLoggedInError()
+        person_profile = await self.get_person_profile()
+        if person_profile is None:
+            raise FetchError()
+        photo_api_endpoint = person_profile.get_photo_link()
+
+        if photo_api_endpoint is None or len(photo_api_endpoint) <= 4:
+            raise FetchError()
+        response = await self.send_authorized_request(f"{self.api_url}/{photo_api_endpoint[4:]}", phase="photo")
+        if response.status_code == 200:
+            return response.content
+        raise FetchError()
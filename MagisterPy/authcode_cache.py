@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+
+class AuthcodeCache():
+    '''
+    Caches the authcodes that get extracted from the account javascript bundle.
+
+    The bundle is served under a name containing a content hash (account-<hash>.js), so as long as the
+    name doesn't change the authcode inside of it doesn't change either. Storing the authcode per bundle url
+    means that the bundle only has to be downloaded and parsed once instead of on every login.
+
+    Parameters:
+            ttl (float): How many seconds a cached authcode stays valid. Defaults to one day
+
+            cache_file (str): Optional path to a json file. If provided the cache is also stored on disk
+            so it can be shared between processes and survives restarts.
+    '''
+
+    def __init__(self, ttl: float = 24 * 60 * 60, cache_file: Optional[str] = None):
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.__entries = {}  # bundle_url -> {"authcode": str, "stored_at": float}
+        self.__lock = threading.Lock()
+        if self.cache_file:
+            self.__entries.update(self.__read_cache_file())
+
+    def __is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry.get("stored_at", 0) < self.ttl
+
+    def __read_cache_file(self) -> dict:
+        try:
+            with open(self.cache_file, "r") as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return {url: entry for url, entry in entries.items()
+                if isinstance(entry, dict) and "authcode" in entry}
+
+    def __write_cache_file(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        try:
+            # write to a temporary file first so other processes never read a half written cache
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory)
+            try:
+                with os.fdopen(file_descriptor, "w") as file:
+                    json.dump(self.__entries, file)
+                os.replace(temp_path, self.cache_file)
+            except BaseException:
+                # the temporary file would otherwise be left behind in the cache directory
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            pass
+
+    def get(self, bundle_url: str) -> Optional[str]:
+        '''
+        returns the cached authcode for the bundle url or None if there is no fresh authcode stored
+        '''
+        with self.__lock:
+            entry = self.__entries.get(bundle_url)
+
+            if entry is None and self.cache_file:
+                # another process might have stored it in the meantime
+                self.__entries.update(self.__read_cache_file())
+                entry = self.__entries.get(bundle_url)
+
+            if entry is None:
+                return None
+            if not self.__is_fresh(entry):
+                del self.__entries[bundle_url]
+                return None
+            return entry["authcode"]
+
+    def set(self, bundle_url: str, authcode: str) -> None:
+        '''
+        stores the authcode for the bundle url
+        '''
+        with self.__lock:
+            # expired entries are dropped so the cache doesn't keep growing with old bundle names
+            self.__entries = {url: entry for url, entry in self.__entries.items()
+                              if self.__is_fresh(entry)}
+            self.__entries[bundle_url] = {
+                "authcode": authcode, "stored_at": time.time()}
+            if self.cache_file:
+                self.__write_cache_file()
+
+    def invalidate(self, bundle_url: str) -> None:
+        '''
+        removes the authcode of the bundle url from the cache. Used when Magister rejects the cached authcode
+        '''
+        with self.__lock:
+            if self.__entries.pop(bundle_url, None) is not None and self.cache_file:
+                self.__write_cache_file()
+
+    def clear(self) -> None:
+        '''
+        removes all of the stored authcodes
+        '''
+        with self.__lock:
+            self.__entries = {}
+            if self.cache_file:
+                self.__write_cache_file()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, bundle_url):
+        return self.get(bundle_url) is not None
+
+
+# shared by all of the sessions in the process unless a session gets its own cache
+default_authcode_cache = AuthcodeCache()
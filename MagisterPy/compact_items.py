@@ -0,0 +1,515 @@
+import abc
+import functools
+import json as json_module
+import sys
+from datetime import datetime
+from typing import Optional, Union
+from .magister_errors import DroppedFieldError
+from .response_items import parse_datetime, parse_grade_value
+
+
+@functools.lru_cache(maxsize=4096)
+def _intern_frozen(types, value):
+    return value
+
+
+def _get_types(value):
+    '''
+    returns the types of all of the values in the frozen json. 1, 1.0 and True are equal, so the cache of _intern_frozen
+    is keyed on the types as well, otherwise {"Id": True} could come back as {"Id": 1}
+    '''
+    if isinstance(value, tuple):
+        return tuple(_get_types(item) for item in value)
+    return type(value)
+
+
+def _intern(value):
+    '''
+    the same teachers, rooms and subjects show up in a lot of lessons, so they are only stored once.
+    Strings use sys.intern, the frozen json values a bounded cache of the most recently seen ones
+    '''
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, tuple):
+        return _intern_frozen(_get_types(value), value)
+    return value
+
+
+def _freeze(value):
+    '''
+    converts a json value to a hashable value that can be interned
+    '''
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ("__list__",) + tuple(_freeze(item) for item in value)
+    return value
+
+
+def _unfreeze(value):
+    if isinstance(value, tuple):
+        if value and value[0] == "__list__":
+            return [_unfreeze(item) for item in value[1:]]
+        return {key: _unfreeze(item) for key, item in value}
+    return value
+
+
+class CompactResponseItem(abc.ABC):
+    '''
+    Base class of the compact response items.
+
+    The compact items only keep the fields their getters use in __slots__, so they use a lot less memory than the
+    regular response items that keep the whole json dict alive. They are read only.
+    The json can still be accessed (item.json, item["key"], item.get("key"), ...). If the item was created with
+    keep_raw=True the original json is stored as compact bytes and decoded when it is asked for.
+    Otherwise only the fields in kept_keys can be read, asking for any other field (or for the whole json
+    of an item that dropped some of its fields) raises DroppedFieldError.
+    '''
+    __slots__ = ("_raw", "_valid", "_complete")
+    required_keys = frozenset()
+    # the fields of the json that are kept unchanged, _to_json rebuilds them
+    kept_keys = frozenset()
+    DATETIME_KEYS = ()
+    # json key -> (slot with the timestamp, slot with the parsed datetime)
+    _datetime_slots = {}
+
+    def _init_raw(self, json: Union[list, dict], keep_raw: bool) -> None:
+        self._valid = isinstance(json, dict) and not bool(
+            self.required_keys - json.keys())
+        # nothing was dropped, so the rebuilt json is the original one
+        self._complete = isinstance(json, dict) and json.keys() == self.kept_keys
+        self._raw = json_module.dumps(json, separators=(
+            ",", ":")).encode() if keep_raw else None
+
+    @abc.abstractmethod
+    def _to_json(self) -> dict:
+        '''
+        rebuilds the json from the kept fields
+        '''
+
+    def _get_datetime(self, key: str, memo: Optional[dict] = None) -> Optional[datetime]:
+        value_slot, datetime_slot = self._datetime_slots[key]
+        parsed = getattr(self, datetime_slot)
+        if parsed is None:
+            value = getattr(self, value_slot)
+            if value is None:
+                return None
+            if memo is None:
+                parsed = parse_datetime(value)
+            else:
+                parsed = memo.get(value)
+                if parsed is None:
+                    parsed = memo[value] = parse_datetime(value)
+            setattr(self, datetime_slot, parsed)
+        return parsed
+
+    def _get_json(self) -> Union[list, dict]:
+        if self._raw is not None:
+            return json_module.loads(self._raw)
+        return self._to_json()
+
+    def _has_field(self, key) -> bool:
+        # a valid item has all of the kept fields, an invalid one might not have had them at all
+        return self._raw is not None or self._complete or (self._valid and key in self.kept_keys)
+
+    def _dropped_field_error(self, key=None) -> DroppedFieldError:
+        field = "all of the fields" if key is None else f"the {key!r} field"
+        return DroppedFieldError(f"\n{type(self).__name__} didn't keep {field} of its json. "
+                                 "Create it with keep_raw=True (or the session with keep_raw_json=True) to keep the whole json")
+
+    @property
+    def json(self) -> Union[list, dict]:
+        if self._raw is None and not self._complete:
+            raise self._dropped_field_error()
+        return self._get_json()
+
+    def is_valid(self) -> bool:
+        '''
+        Checks if the json the item was created from contained all required keys.
+        '''
+        return self._valid
+
+    def get(self, key, default=None):
+        if not self._has_field(key):
+            raise self._dropped_field_error(key)
+        return self._get_json().get(key, default)
+
+    def keys(self):
+        return self.json.keys()
+
+    def values(self):
+        return self.json.values()
+
+    def items(self):
+        return self.json.items()
+
+    def __getitem__(self, key):
+        if not self._has_field(key):
+            raise self._dropped_field_error(key)
+        return self._get_json()[key]
+
+    def __setitem__(self, key, value):
+        raise TypeError(f"{type(self).__name__} is read only")
+
+    def __delitem__(self, key):
+        raise TypeError(f"{type(self).__name__} is read only")
+
+    def __contains__(self, key):
+        if not self._has_field(key):
+            raise self._dropped_field_error(key)
+        return key in self._get_json()
+
+    def __iter__(self):
+        return iter(self.json)
+
+    def __len__(self):
+        return len(self.json)
+
+    def __repr__(self):
+        if self._raw is None and not self._complete:
+            return f"<{type(self).__name__} id={self.get_id()!r}>"
+        return f"{repr(self.json)}"
+
+
+class CompactLesson(CompactResponseItem):
+    '''
+    The compact version of Lesson. It has the same getters
+    '''
+    __slots__ = ("_id", "_location", "_start", "_end", "_status", "_description", "_teachers",
+                 "_locations", "_subjects", "cancelled", "_start_datetime", "_end_datetime")
+    # values of the Status field of cancelled lessons (4: cancelled manually, 5: cancelled automatically)
+    CANCELLED_STATUSES = {4, 5}
+    DATETIME_KEYS = ("Start", "Einde")
+    _datetime_slots = {"Start": ("_start", "_start_datetime"),
+                       "Einde": ("_end", "_end_datetime")}
+    required_keys = frozenset({
+        "Start", "Einde", "LesuurVan", "LesuurTotMet", "DuurtHeleDag",
+        "Omschrijving", "Lokatie", "Status", "Type", "Subtype",
+        "IsOnlineDeelname", "WeergaveType", "Inhoud", "Opmerking",
+        "InfoType", "Aantekening", "Afgerond", "HerhaalStatus",
+        "Herhaling", "Vakken", "Docenten", "Lokalen", "Groepen",
+        "OpdrachtId", "HeeftBijlagen", "Bijlagen", "Id"
+    })
+    # Vakken and Lokalen are not kept whole, only their names are
+    kept_keys = frozenset({"Id", "Start", "Einde", "Omschrijving", "Lokatie", "Status", "Docenten"})
+
+    def __init__(self, json: dict, cancelled=False, keep_raw=False):
+        '''
+        Initializes a CompactLesson instance.
+
+        Args:
+            json (dict): The JSON data representing the lesson.
+            cancelled (bool, optional): Indicates if the lesson is cancelled. Defaults to False.
+            keep_raw (bool, optional): Keeps the whole json (as bytes) instead of only the fields used by the getters. Defaults to False.
+        '''
+        self._init_raw(json, keep_raw)
+        self.cancelled = cancelled
+        get = json.get if isinstance(json, dict) else {}.get
+        self._id = get("Id")
+        self._location = _intern(get("Lokatie"))
+        self._start = _intern(get("Start"))
+        self._end = _intern(get("Einde"))
+        self._start_datetime = self._end_datetime = None
+        self._status = get("Status")
+        self._description = _intern(get("Omschrijving"))
+        self._teachers = _intern(_freeze(get("Docenten")))
+
+        locations = get("Lokalen")
+        self._locations = tuple(_intern(location["Naam"]) for location in locations
+                                if "Naam" in location) if isinstance(locations, list) else None
+        subjects = get("Vakken")
+        self._subjects = tuple(_intern(subject["Naam"]) for subject in subjects
+                               if "Naam" in subject) if isinstance(subjects, list) else None
+
+    @classmethod
+    def from_lesson(cls, lesson, keep_raw=False) -> "CompactLesson":
+        return cls(lesson.json, cancelled=lesson.is_cancelled(), keep_raw=keep_raw)
+
+    def _to_json(self) -> dict:
+        return {
+            "Id": self._id,
+            "Start": self._start,
+            "Einde": self._end,
+            "Omschrijving": self._description,
+            "Lokatie": self._location,
+            "Status": self._status,
+            "Docenten": _unfreeze(self._teachers)
+        }
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled
+
+    def has_cancelled_status(self) -> bool:
+        return self._status in self.CANCELLED_STATUSES
+
+    def get_status(self) -> Union[None, int]:
+        return self._status
+
+    def get_id(self) -> Union[None, int]:
+        return self._id
+
+    def get_location(self) -> Union[None, str]:
+        return self._location
+
+    def get_start_time(self) -> Union[None, str]:
+        return self._start
+
+    def get_end_time(self) -> Union[None, str]:
+        return self._end
+
+    def get_start_datetime(self) -> Union[None, datetime]:
+        return self._get_datetime("Start")
+
+    def get_end_datetime(self) -> Union[None, datetime]:
+        return self._get_datetime("Einde")
+
+    def get_teacher_names(self) -> Union[None, list[dict]]:
+        return _unfreeze(self._teachers)
+
+    def get_locations(self) -> Union[None, list[str]]:
+        return list(self._locations) if self._locations is not None else None
+
+    def get_subject_names(self) -> Union[None, list[str]]:
+        return list(self._subjects) if self._subjects is not None else None
+
+    def get_description(self) -> Union[None, str]:
+        return self._description
+
+
+class CompactGrade(CompactResponseItem):
+    '''
+    The compact version of Grade. It has the same getters
+    '''
+    __slots__ = ("_id", "_description", "_entered_time", "_lesson_code", "_lesson_name", "_value",
+                 "_weighting_factor", "_is_sufficient", "_counts", "_has_exemption", "_entered_datetime")
+    DATETIME_KEYS = ("ingevoerdOp",)
+    _datetime_slots = {"ingevoerdOp": ("_entered_time", "_entered_datetime")}
+    required_keys = frozenset({
+        "kolomId", "omschrijving", "ingevoerdOp", "vak", "waarde",
+        "weegfactor", "isVoldoende", "teltMee", "moetInhalen",
+        "heeftVrijstelling", "behaaldOp", "links"
+    })
+    # only the code and the name of the vak are kept
+    kept_keys = frozenset({"kolomId", "omschrijving", "ingevoerdOp", "waarde", "weegfactor",
+                           "isVoldoende", "teltMee", "heeftVrijstelling"})
+
+    def __init__(self, json: dict, keep_raw=False):
+        '''
+        Initializes a CompactGrade instance.
+
+        Args:
+            json (dict): The JSON data representing the grade.
+            keep_raw (bool, optional): Keeps the whole json (as bytes) instead of only the fields used by the getters. Defaults to False.
+        '''
+        self._init_raw(json, keep_raw)
+        get = json.get if isinstance(json, dict) else {}.get
+        self._id = get("kolomId")
+        self._description = get("omschrijving")
+        self._entered_time = get("ingevoerdOp")
+        self._entered_datetime = None
+        lesson = get("vak")
+        self._lesson_code = _intern(
+            lesson.get("code")) if lesson is not None else None
+        self._lesson_name = _intern(
+            lesson.get("omschrijving")) if lesson is not None else None
+        self._value = _intern(get("waarde"))
+        self._weighting_factor = get("weegfactor")
+        self._is_sufficient = get("isVoldoende")
+        self._counts = get("teltMee")
+        self._has_exemption = get("heeftVrijstelling")
+
+    @classmethod
+    def from_grade(cls, grade, keep_raw=False) -> "CompactGrade":
+        return cls(grade.json, keep_raw=keep_raw)
+
+    def _to_json(self) -> dict:
+        return {
+            "kolomId": self._id,
+            "omschrijving": self._description,
+            "ingevoerdOp": self._entered_time,
+            "waarde": self._value,
+            "weegfactor": self._weighting_factor,
+            "isVoldoende": self._is_sufficient,
+            "teltMee": self._counts,
+            "heeftVrijstelling": self._has_exemption
+        }
+
+    def get_id(self) -> Union[None, int]:
+        return self._id
+
+    def get_value(self) -> Union[None, str]:
+        return self._value
+
+    def get_numeric_value(self) -> Union[None, float]:
+        if self._value is None:
+            return None
+        return parse_grade_value(self._value)
+
+    def get_lesson_code(self) -> Union[None, str]:
+        return self._lesson_code
+
+    def get_lesson_name(self) -> Union[None, str]:
+        return self._lesson_name
+
+    def get_entered_time(self) -> Union[None, str]:
+        return self._entered_time
+
+    def get_entered_datetime(self) -> Union[None, datetime]:
+        return self._get_datetime("ingevoerdOp")
+
+    def get_weighting_factor(self) -> Union[None, int]:
+        return self._weighting_factor
+
+    def is_counted(self) -> bool:
+        return self._counts is not False
+
+    def has_exemption(self) -> bool:
+        return bool(self._has_exemption)
+
+
+class CompactPersonProfile(CompactResponseItem):
+    '''
+    The compact version of PersonProfile. It has the same getters
+    '''
+    __slots__ = ("_id", "_externe_id", "_account_external_id", "_initials", "_first_name", "_infix",
+                 "_last_name", "_student_number", "_roles", "_links")
+    required_keys = frozenset({
+        "id", "externeId", "accountExterneId", "voorletters",
+        "roepnaam", "tussenvoegsel", "achternaam", "stamnummer",
+        "rollenVanGebruiker", "links"
+    })
+    kept_keys = required_keys
+
+    def __init__(self, json: dict, keep_raw=False):
+        self._init_raw(json, keep_raw)
+        get = json.get if isinstance(json, dict) else {}.get
+        self._id = get("id")
+        self._externe_id = get("externeId")
+        self._account_external_id = get("accountExterneId")
+        self._initials = get("voorletters")
+        self._first_name = get("roepnaam")
+        self._infix = get("tussenvoegsel")
+        self._last_name = get("achternaam")
+        self._student_number = get("stamnummer")
+        self._roles = _freeze(get("rollenVanGebruiker"))
+        self._links = _freeze(get("links", {}))
+
+    def _to_json(self) -> dict:
+        return {
+            "id": self._id,
+            "externeId": self._externe_id,
+            "accountExterneId": self._account_external_id,
+            "voorletters": self._initials,
+            "roepnaam": self._first_name,
+            "tussenvoegsel": self._infix,
+            "achternaam": self._last_name,
+            "stamnummer": self._student_number,
+            "rollenVanGebruiker": _unfreeze(self._roles),
+            "links": _unfreeze(self._links)
+        }
+
+    def get_id(self) -> int:
+        return self._id
+
+    def get_externe_id(self) -> str:
+        return self._externe_id
+
+    def get_account_external_id(self) -> str:
+        return self._account_external_id
+
+    def get_initials(self) -> str:
+        return self._initials
+
+    def get_first_name(self) -> str:
+        return self._first_name
+
+    def get_infix(self) -> str:
+        return self._infix
+
+    def get_last_name(self) -> str:
+        return self._last_name
+
+    def get_student_number(self) -> int:
+        return self._student_number
+
+    def get_roles(self) -> list[str]:
+        return _unfreeze(self._roles)
+
+    def get_all_links(self) -> dict[dict[str]]:
+        return _unfreeze(self._links) or {}
+
+    def get_specific_link(self, name: str) -> str:
+        return self.get_all_links().get(name, {}).get("href")
+
+    def get_photo_link(self) -> str:
+        return self.get_specific_link("foto")
+
+
+class CompactAccountProfile(CompactResponseItem):
+    '''
+    The compact version of AccountProfile. It has the same getters
+    '''
+    __slots__ = ("_id", "_username", "_email", "_mobile_number", "_softtoken_status", "_email_verified",
+                 "_must_verify_email", "_uuid", "_links")
+    required_keys = frozenset({
+        "id", "naam", "emailadres", "mobielTelefoonnummer",
+        "softtokenStatus", "isEmailadresGeverifieerd",
+        "moetEmailadresVerifieren", "uuId", "links"
+    })
+    kept_keys = required_keys
+
+    def __init__(self, json: dict, keep_raw=False):
+        self._init_raw(json, keep_raw)
+        get = json.get if isinstance(json, dict) else {}.get
+        self._id = get("id")
+        self._username = get("naam")
+        self._email = get("emailadres")
+        self._mobile_number = get("mobielTelefoonnummer")
+        self._softtoken_status = get("softtokenStatus")
+        self._email_verified = get("isEmailadresGeverifieerd")
+        self._must_verify_email = get("moetEmailadresVerifieren")
+        self._uuid = get("uuId")
+        self._links = _freeze(get("links"))
+
+    def _to_json(self) -> dict:
+        return {
+            "id": self._id,
+            "naam": self._username,
+            "emailadres": self._email,
+            "mobielTelefoonnummer": self._mobile_number,
+            "softtokenStatus": self._softtoken_status,
+            "isEmailadresGeverifieerd": self._email_verified,
+            "moetEmailadresVerifieren": self._must_verify_email,
+            "uuId": self._uuid,
+            "links": _unfreeze(self._links)
+        }
+
+    def get_id(self) -> int:
+        return self._id
+
+    def get_username(self) -> str:
+        return self._username
+
+    def get_email(self) -> str:
+        return self._email
+
+    def get_mobile_number(self) -> str:
+        return self._mobile_number
+
+    def get_softtoken_status(self) -> str:
+        return self._softtoken_status
+
+    def is_email_verified(self) -> bool:
+        return self._email_verified
+
+    def must_verify_email(self) -> bool:
+        return self._must_verify_email
+
+    def get_uuid(self) -> str:
+        return self._uuid
+
+    def get_all_links(self) -> dict[dict[str]]:
+        return _unfreeze(self._links)
+
+    def get_specific_link(self, name: str) -> str:
+        return (self.get_all_links() or {}).get(name, {}).get("href")
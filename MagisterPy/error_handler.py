@@ -1,17 +1,89 @@
+import contextvars
+import logging
+import time
 import requests
 from .magister_errors import *
 
+# ids of the sessions that are relogging in inside of the current thread/task.
+# The methods called by relogin itself should neither start another relogin nor wait for the running one
+_relogging_in = contextvars.ContextVar("magister_relogging_in", default=())
+# the server failures (errors and 5xx responses) seen by the login atempt of the relogin running in the current thread/task.
+# Only these count for the circuit breaker of the school, a login that failed because of the credentials doesn't
+_relogin_failures = contextvars.ContextVar("magister_relogin_failures", default=None)
+
+
+def is_relogging_in(_self) -> bool:
+    '''
+    returns True if the current thread (or asyncio task) is running the relogin of the session
+    '''
+    return id(_self) in _relogging_in.get()
+
+
+def set_relogging_in(_self) -> contextvars.Token:
+    '''
+    marks the current thread (or asyncio task) as running the relogin of the session. Pass the returned token to reset_relogging_in
+    '''
+    return _relogging_in.set(_relogging_in.get() + (id(_self),))
+
+
+def reset_relogging_in(token: contextvars.Token) -> None:
+    _relogging_in.reset(token)
+
+
+def collect_relogin_failures(failures: list) -> contextvars.Token:
+    '''
+    makes the server failures of the current thread (or asyncio task) get appended to failures. Pass the returned token to reset_relogin_failures
+    '''
+    return _relogin_failures.set(failures)
+
+
+def reset_relogin_failures(token: contextvars.Token) -> None:
+    _relogin_failures.reset(token)
+
+
+def is_server_failure(_self, failure) -> bool:
+    '''
+    returns True if the error or the status code of a response means that Magister couldn't be reached or failed itself:
+    a connection error, a timeout or a 5xx status code
+    '''
+    if isinstance(failure, BaseException):
+        server_errors = (ConnectionError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        return isinstance(failure, server_errors + getattr(_self, "connection_errors", ()) + getattr(_self, "timeout_errors", ()))
+    return failure >= 500
+
+
+def report_server_failure(_self, failure) -> None:
+    '''
+    passes the error or the status code of a response to the running relogin if it is a server failure
+    '''
+    failures = _relogin_failures.get()
+    if failures is not None and is_server_failure(_self, failure):
+        failures.append(failure)
+
 
 def should_start_relogin(_self):
     '''
     returns True if the error was caused outside of the relogin method and automatic relogin is enabled
     '''
-    return _self.max_relogin_atempts == _self.relogin_atempts and _self.enable_automatic_relogin
+    return _self.enable_automatic_relogin and not is_relogging_in(_self)
+
 
+def report_error(_self, func, error: BaseException) -> None:
+    report_server_failure(_self, error)
+    if _self.metrics is not None:
+        _self.metrics.record_error(_self._get_tenant(), func.__name__, error)
 
-def invoke_relogin(_self):
+
+def report_call(_self, func, result: str, start: float) -> None:
+    if _self.metrics is not None:
+        _self.metrics.record_call(_self._get_tenant(), func.__name__, result, time.perf_counter() - start)
+
+
+def invoke_relogin(_self, token_generation=None):
     if should_start_relogin(_self):
-        return _self.relogin()
+        if _self.metrics is not None:
+            _self.metrics.record_session_expired(_self._get_tenant())
+        return _self.relogin(token_generation=token_generation)
 
 
 def error_handler(func, __recursive_call=None):
@@ -25,20 +97,84 @@ def error_handler(func, __recursive_call=None):
         _self = args[0]
         errors_that_invoke_relogin = [FetchError,
                                       requests.exceptions.ConnectionError]
+        if not is_relogging_in(_self):
+            # calls made while another thread is relogging in wait for the new token instead of failing
+            _self.wait_for_relogin()
+        token_generation = _self.token_generation
+        # reported to the metrics of the session when the call is finished
+        call_result = "error"
+        start = time.perf_counter()
         try:
             result = func(*args, **kwargs)
+            call_result = "ok"
             return result
         except KeyboardInterrupt:
             raise KeyboardInterrupt
-        except (BaseMagisterError, requests.exceptions.ConnectionError) as e:
+        # a read timeout means Magister is slow, so it is handled like the other errors but doesn't start a relogin
+        except (BaseMagisterError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            report_error(_self, func, e)
             # Detects if there is an irregular error in the method and makes sure that the method doesn't rerun recursively
-            if any(isinstance(e, error_type) for error_type in errors_that_invoke_relogin) and not __recursive_call and invoke_relogin(_self):
+            # (a connect timeout is also a ConnectionError)
+            relogin = any(isinstance(e, error_type) for error_type in errors_that_invoke_relogin) and not isinstance(e, requests.exceptions.Timeout)
+            if relogin and not __recursive_call and invoke_relogin(_self, token_generation):
 
                 # Reruns the the method
+                call_result = "relogin"
                 return error_handler(func, __recursive_call=True)(*args, **kwargs)
 
             elif not _self.automatically_handle_errors:
                 raise e
-            _self._logMessage(str(e))
+            _self._logMessage("%s raised %r", func.__name__, e, level=logging.WARNING)
+        finally:
+            report_call(_self, func, call_result, start)
+
+    return wrapper
+
+
+async def async_invoke_relogin(_self, token_generation=None):
+    if should_start_relogin(_self):
+        if _self.metrics is not None:
+            _self.metrics.record_session_expired(_self._get_tenant())
+        return await _self.relogin(token_generation=token_generation)
+
+
+def async_error_handler(func, __recursive_call=None):
+    '''
+    The same as error_handler but for the coroutine methods of AsyncMagisterSession
+    '''
+    if __recursive_call is None:
+        __recursive_call = False
+
+    async def wrapper(*args, **kwargs):
+        _self = args[0]
+        errors_that_invoke_relogin = (FetchError,) + _self.connection_errors
+        if not is_relogging_in(_self):
+            await _self.wait_for_relogin()
+        token_generation = _self.token_generation
+        call_result = "error"
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+            call_result = "ok"
+            return result
+        except KeyboardInterrupt:
+            raise KeyboardInterrupt
+        # a timeout means Magister is slow, so like in error_handler it is handled but doesn't start a relogin
+        except (BaseMagisterError,) + _self.connection_errors + _self.timeout_errors as e:
+            report_error(_self, func, e)
+            # Detects if there is an irregular error in the method and makes sure that the method doesn't rerun recursively
+            # (the aiohttp timeouts are also connection errors)
+            relogin = isinstance(e, errors_that_invoke_relogin) and not isinstance(e, _self.timeout_errors)
+            if relogin and not __recursive_call and await async_invoke_relogin(_self, token_generation):
+
+                # Reruns the the method
+                call_result = "relogin"
+                return await async_error_handler(func, __recursive_call=True)(*args, **kwargs)
+
+            elif not _self.automatically_handle_errors:
+                raise e
+            _self._logMessage("%s raised %r", func.__name__, e, level=logging.WARNING)
+        finally:
+            report_call(_self, func, call_result, start)
 
     return wrapper
@@ -0,0 +1,310 @@
+import abc
+from datetime import datetime
+from typing import Hashable, Iterable, Optional, Union
+from .response_items import Lesson, Grade
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency (pip install MagisterPy[frames])
+    np = None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "ScheduleFrame and GradeFrame require numpy. Install it using: pip install MagisterPy[frames]")
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    return value.timestamp() if value is not None else float("nan")
+
+
+def _object_array(items: list) -> "np.ndarray":
+    # assigned one by one, because numpy would try to unpack the dict-like items
+    array = np.empty(len(items), dtype=object)
+    for index, item in enumerate(items):
+        array[index] = item
+    return array
+
+
+def get_counting_mask(values, weights, counts, exempt):
+    '''
+    returns which grades count towards the average: numeric grades (not nan) with a weight that count (teltMee)
+    and are not exempt (heeftVrijstelling). Works on numpy arrays and on the values of a single grade
+    '''
+    # a nan isn't equal to itself and ^ True negates both a bool and a bool array
+    return counts & (exempt ^ True) & (values == values) & (weights > 0)
+
+
+class _CategoryEncoder():
+    '''
+    Gives every distinct label an integer code. Missing labels (None) get the code -1
+    '''
+
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def encode(self, label: Optional[Hashable]) -> int:
+        if label is None:
+            return -1
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class _Frame(abc.ABC):
+    '''
+    Base class of the frames. Every column is a numpy array with one value per item.
+    Categorical columns (like the subject) hold integer codes, the labels of the codes are kept in categories.
+    '''
+    CATEGORICAL_COLUMNS = ()
+
+    def __init__(self, columns: dict, categories: dict, items: "np.ndarray"):
+        _require_numpy()
+        self.columns = columns
+        self.categories = categories  # column name -> list of labels, indexed by code
+        self.items = items
+
+    @classmethod
+    @abc.abstractmethod
+    def from_list(cls, items: Iterable) -> "_Frame":
+        '''
+        builds the frame from a list of items (Lessons or Grades)
+        '''
+
+    def to_list(self) -> list:
+        '''
+        returns the items (Lessons or Grades) of the frame
+        '''
+        return self.items.tolist()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} items)"
+
+    def get_column(self, name: str) -> "np.ndarray":
+        return self.columns[name]
+
+    def get_labels(self, name: str) -> "np.ndarray":
+        '''
+        returns the labels of a categorical column (None for the missing labels)
+        '''
+        labels = np.array(self.categories[name] + [None], dtype=object)
+        # code -1 picks the None at the end
+        return labels[self.columns[name]]
+
+    def take(self, selection) -> "_Frame":
+        '''
+        returns a frame with the selected rows. selection can be a boolean mask or an array of indices
+        '''
+        return type(self)({name: column[selection] for name, column in self.columns.items()},
+                          self.categories, self.items[selection])
+
+    def filter(self, mask=None, **equals) -> "_Frame":
+        '''
+        returns a frame with the rows that match the mask and all of the given column values
+
+        Example:
+            frame.filter(subject="wi", counts=True)
+        '''
+        selection = np.ones(len(self), dtype=bool) if mask is None else np.asarray(
+            mask, dtype=bool)
+        for name, value in equals.items():
+            if name in self.CATEGORICAL_COLUMNS:
+                if value is not None and value not in self.categories[name]:
+                    # nothing has this label
+                    selection = np.zeros(len(self), dtype=bool)
+                    continue
+                value = self.categories[name].index(
+                    value) if value is not None else -1
+            selection = selection & (self.columns[name] == value)
+        return self.take(selection)
+
+    def group_by(self, name: str) -> dict:
+        '''
+        splits the frame by the values of the column
+
+        returns:
+        dict -> value (the label for categorical columns) -> frame with the rows that have the value
+        '''
+        column = self.columns[name]
+        order = np.argsort(column, kind="stable")
+        values, starts = np.unique(column[order], return_index=True)
+        groups = {}
+        for value, indices in zip(values, np.split(order, starts[1:])):
+            if name in self.CATEGORICAL_COLUMNS:
+                value = self.categories[name][value] if value >= 0 else None
+            else:
+                value = value.item()
+            groups[value] = self.take(indices)
+        return groups
+
+    def _sum_by(self, name: str, values: "np.ndarray") -> "np.ndarray":
+        '''
+        sums the values per code of a categorical column. The sum of the missing labels is at index 0, the sum of code n at index n + 1
+        '''
+        codes = self.columns[name] + 1  # the missing labels (-1) end up in bin 0
+        return np.bincount(codes, weights=values, minlength=len(self.categories[name]) + 1)
+
+
+class ScheduleFrame(_Frame):
+    '''
+    Holds a schedule as columns, so it can be filtered, grouped and summed without looping over the lessons.
+
+    Columns:
+        id, start, end (unix timestamps), status, cancelled, subject (first subject name) and location
+
+    Requires numpy (pip install MagisterPy[frames])
+
+    Example:
+        frame = ScheduleFrame.from_list(session.get_schedule("2024-09-01", "2025-01-31"))
+        hours_per_room = {room: seconds / 3600 for room, seconds in frame.get_total_duration(by="location").items()}
+    '''
+    CATEGORICAL_COLUMNS = ("subject", "location")
+
+    @classmethod
+    def from_list(cls, lessons: Iterable[Lesson]) -> "ScheduleFrame":
+        _require_numpy()
+        lessons = list(lessons)
+        subjects, locations = _CategoryEncoder(), _CategoryEncoder()
+        ids, starts, ends, statuses, cancelled, subject_codes, location_codes = [], [], [], [], [], [], []
+        for lesson in lessons:
+            ids.append(lesson.get_id() or 0)
+            starts.append(_timestamp(lesson.get_start_datetime()))
+            ends.append(_timestamp(lesson.get_end_datetime()))
+            status = lesson.get_status()
+            statuses.append(status if isinstance(status, int) else -1)
+            cancelled.append(bool(lesson.is_cancelled()))
+            subject_names = lesson.get_subject_names()
+            subject_codes.append(subjects.encode(
+                subject_names[0] if subject_names else None))
+            location_codes.append(locations.encode(lesson.get_location()))
+
+        items = _object_array(lessons)
+        columns = {
+            "id": np.array(ids, dtype=np.int64),
+            "start": np.array(starts, dtype=np.float64),
+            "end": np.array(ends, dtype=np.float64),
+            "status": np.array(statuses, dtype=np.int64),
+            "cancelled": np.array(cancelled, dtype=bool),
+            "subject": np.array(subject_codes, dtype=np.int32),
+            "location": np.array(location_codes, dtype=np.int32)
+        }
+        return cls(columns, {"subject": subjects.labels, "location": locations.labels}, items)
+
+    def get_durations(self) -> "np.ndarray":
+        '''
+        returns the duration of every lesson in seconds
+        '''
+        return self.columns["end"] - self.columns["start"]
+
+    def between(self, _from: Union[datetime, float], to: Union[datetime, float]) -> "ScheduleFrame":
+        '''
+        returns the lessons that start between _from (inclusive) and to (exclusive)
+        '''
+        _from = _from.timestamp() if isinstance(_from, datetime) else _from
+        to = to.timestamp() if isinstance(to, datetime) else to
+        start = self.columns["start"]
+        return self.take((start >= _from) & (start < to))
+
+    def sort_by_start(self) -> "ScheduleFrame":
+        return self.take(np.argsort(self.columns["start"], kind="stable"))
+
+    def get_total_duration(self, by: str = "location", include_cancelled: bool = False) -> dict:
+        '''
+        returns the total duration in seconds of the lessons per label of a categorical column (for example the occupancy per room)
+        '''
+        durations = np.nan_to_num(self.get_durations())
+        if not include_cancelled:
+            durations = np.where(self.columns["cancelled"], 0, durations)
+        sums = self._sum_by(by, durations)
+        totals = {label: float(total) for label, total in zip(
+            self.categories[by], sums[1:]) if total > 0}
+        if sums[0] > 0:
+            totals[None] = float(sums[0])
+        return totals
+
+
+class GradeFrame(_Frame):
+    '''
+    Holds grades as columns, so averages can be computed without looping over the grades.
+
+    Columns:
+        id, entered (unix timestamp), subject (the subject code), value (nan if it is not a number),
+        weight, counts (teltMee) and exempt (heeftVrijstelling)
+
+    Requires numpy (pip install MagisterPy[frames])
+
+    Example:
+        frame = GradeFrame.from_list(session.get_grades(top=500))
+        print(frame.get_weighted_mean(by="subject"))
+    '''
+    CATEGORICAL_COLUMNS = ("subject",)
+
+    @classmethod
+    def from_list(cls, grades: Iterable[Grade]) -> "GradeFrame":
+        _require_numpy()
+        grades = list(grades)
+        subjects = _CategoryEncoder()
+        ids, entered, subject_codes, values, weights, counts, exempt = [], [], [], [], [], [], []
+        for grade in grades:
+            ids.append(grade.get_id() or 0)
+            entered.append(_timestamp(grade.get_entered_datetime()))
+            subject_codes.append(subjects.encode(grade.get_lesson_code()))
+            value = grade.get_numeric_value()
+            values.append(value if value is not None else float("nan"))
+            weights.append(grade.get_weighting_factor() or 0)
+            counts.append(grade.is_counted())
+            exempt.append(grade.has_exemption())
+
+        items = _object_array(grades)
+        columns = {
+            "id": np.array(ids, dtype=np.int64),
+            "entered": np.array(entered, dtype=np.float64),
+            "subject": np.array(subject_codes, dtype=np.int32),
+            "value": np.array(values, dtype=np.float64),
+            "weight": np.array(weights, dtype=np.float64),
+            "counts": np.array(counts, dtype=bool),
+            "exempt": np.array(exempt, dtype=bool)
+        }
+        return cls(columns, {"subject": subjects.labels}, items)
+
+    def get_counting_mask(self) -> "np.ndarray":
+        '''
+        returns a mask of the grades that count towards the average:
+        numeric grades with a weight that count (teltMee) and are not exempt (heeftVrijstelling)
+        '''
+        columns = self.columns
+        return get_counting_mask(columns["value"], columns["weight"], columns["counts"], columns["exempt"])
+
+    def get_weighted_mean(self, by: Optional[str] = None) -> Union[None, float, dict]:
+        '''
+        returns the weighted average of the grades that count
+
+        params:
+        by -> a categorical column (for example "subject"). If given a dict label -> average is returned
+
+        returns:
+        float -> the average, None if no grade counts
+        dict -> the average per label, labels without counting grades are left out
+        '''
+        mask = self.get_counting_mask()
+        weights = np.where(mask, self.columns["weight"], 0)
+        weighted_values = np.where(mask, self.columns["value"], 0) * weights
+        if by is None:
+            total_weight = weights.sum()
+            return float(weighted_values.sum() / total_weight) if total_weight > 0 else None
+
+        weight_sums = self._sum_by(by, weights)
+        value_sums = self._sum_by(by, weighted_values)
+        labels = [None] + list(self.categories[by])
+        return {label: float(value_sum / weight_sum) for label, value_sum, weight_sum in zip(labels, value_sums, weight_sums)
+                if weight_sum > 0}
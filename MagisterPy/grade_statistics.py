@@ -0,0 +1,211 @@
+from typing import Callable, Hashable, Iterable, Mapping, Optional, Union
+from .response_items import Grade
+from .frames import get_counting_mask
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, without it the averages are computed in pure python
+    np = None
+
+
+GROUP_COLUMNS = ("student", "subject", "period")
+
+
+class GradeStatistics():
+    '''
+    Computes weighted grade averages per student, subject and/or period for a lot of grades at once.
+
+    The grades are parsed once when the GradeStatistics is created. Only the grades that count towards the average are kept,
+    with the same rule as GradeFrame.get_counting_mask: grades that don't count (teltMee is False), grades the student is exempt from
+    (heeftVrijstelling), grades without a weight and grades that aren't a number (like "V") are left out.
+    The averages are computed with numpy.bincount when numpy is installed and in pure python otherwise.
+    The totals of every grouping are computed once and reused by the next calls.
+
+    Parameters:
+            grades (Union[Iterable[Grade], Mapping[Hashable, Iterable[Grade]]]): The grades of one student or a dict student -> grades
+
+            period_key (Callable[[Grade], Hashable]): Returns the period of a grade. Without it all of the grades are in period None
+
+            use_numpy (bool): Forces numpy on or off. Defaults to using numpy when it is installed
+
+    Example:
+        statistics = GradeStatistics({student: session.get_grades(top=500) for student, session in sessions.items()},
+                                     period_key=lambda grade: grade.get_entered_datetime().month > 7)
+        averages = statistics.get_averages(by=("student", "subject"))
+        needed = statistics.get_required_grade(5.5, weight=2, student="jan", subject="wi")
+    '''
+
+    def __init__(self, grades: Union[Iterable[Grade], Mapping[Hashable, Iterable[Grade]]],
+                 period_key: Optional[Callable[[Grade], Hashable]] = None, use_numpy: Optional[bool] = None):
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ImportError(
+                "use_numpy requires numpy. Install it using: pip install MagisterPy[frames]")
+        self.use_numpy = use_numpy
+
+        students = grades.items() if isinstance(grades, Mapping) else [(None, grades)]
+        rows, values, weights, counts, exempt = [], [], [], [], []
+        for student, student_grades in students:
+            for grade in student_grades:
+                value = grade.get_numeric_value()
+                rows.append((student, grade))
+                values.append(value if value is not None else float("nan"))
+                weights.append(grade.get_weighting_factor() or 0)
+                counts.append(grade.is_counted())
+                exempt.append(grade.has_exemption())
+
+        if use_numpy:
+            mask = get_counting_mask(np.array(values, dtype=np.float64), np.array(weights, dtype=np.float64),
+                                     np.array(counts, dtype=bool), np.array(exempt, dtype=bool))
+            kept_rows = np.flatnonzero(mask).tolist()
+        else:
+            kept_rows = [row for row in range(len(rows))
+                         if get_counting_mask(values[row], weights[row], counts[row], exempt[row])]
+
+        # column name -> label -> code. None is a regular label here
+        self.__label_codes = {name: {} for name in GROUP_COLUMNS}
+        codes = {name: [] for name in GROUP_COLUMNS}
+        for row in kept_rows:
+            student, grade = rows[row]
+            period = period_key(grade) if period_key is not None else None
+            for name, label in zip(GROUP_COLUMNS, (student, grade.get_lesson_code(), period)):
+                label_codes = self.__label_codes[name]
+                codes[name].append(label_codes.setdefault(label, len(label_codes)))
+        values = [values[row] for row in kept_rows]
+        weights = [weights[row] for row in kept_rows]
+
+        if use_numpy:
+            self.__codes = {name: np.array(column, dtype=np.int64) for name, column in codes.items()}
+            self.__values = np.array(values, dtype=np.float64)
+            self.__weights = np.array(weights, dtype=np.float64)
+        else:
+            self.__codes = codes
+            self.__values = values
+            self.__weights = weights
+        # by -> totals. The grades can't change, so the totals never go stale
+        self.__totals = {}
+
+    def __len__(self):
+        '''
+        the number of grades that count
+        '''
+        return len(self.__values)
+
+    def get_labels(self, name: str) -> list:
+        '''
+        returns the students, subjects or periods that have grades that count
+        '''
+        return list(self.__label_codes[name])
+
+    def __check_by(self, by: Union[str, tuple]) -> tuple:
+        by = (by,) if isinstance(by, str) else tuple(by)
+        for name in by:
+            if name not in GROUP_COLUMNS:
+                raise ValueError(
+                    f"Can't group by {name!r}, use one of {GROUP_COLUMNS}")
+        return by
+
+    def get_totals(self, by: Union[str, tuple] = ()) -> dict:
+        '''
+        returns the sum of the weighted values and the sum of the weights per group
+
+        params:
+        by -> "student", "subject", "period" or a tuple of them
+
+        returns:
+        dict -> group -> (sum of value * weight, sum of weights). The group is the label if by is a string, otherwise a tuple of labels
+        '''
+        single = isinstance(by, str)
+        totals = self.__get_totals(self.__check_by(by))
+        if single:
+            return {key[0]: total for key, total in totals.items()}
+        return dict(totals)
+
+    def __get_totals(self, by: tuple) -> dict:
+        totals = self.__totals.get(by)
+        if totals is None:
+            totals = self.__totals[by] = self.__compute_totals(by)
+        return totals
+
+    def __compute_totals(self, by: tuple) -> dict:
+        labels = [list(self.__label_codes[name]) for name in by]
+
+        if self.use_numpy:
+            shape = tuple(len(column_labels) for column_labels in labels)
+            groups = np.zeros(len(self.__values), dtype=np.int64)
+            for name, size in zip(by, shape):
+                groups = groups * size + self.__codes[name]
+            size = int(np.prod(shape)) if shape else 1
+            weight_sums = np.bincount(groups, weights=self.__weights, minlength=size)
+            value_sums = np.bincount(
+                groups, weights=self.__values * self.__weights, minlength=size)
+            totals = {}
+            for group in np.flatnonzero(weight_sums):
+                group_codes = np.unravel_index(group, shape) if shape else ()
+                key = tuple(column_labels[code] for column_labels, code in zip(labels, group_codes))
+                totals[key] = (float(value_sums[group]), float(weight_sums[group]))
+        else:
+            totals = {}
+            columns = [self.__codes[name] for name in by]
+            for row, (value, weight) in enumerate(zip(self.__values, self.__weights)):
+                key = tuple(column_labels[column[row]] for column_labels, column in zip(labels, columns))
+                value_sum, weight_sum = totals.get(key, (0.0, 0.0))
+                totals[key] = (value_sum + value * weight, weight_sum + weight)
+        return totals
+
+    def get_averages(self, by: Union[str, tuple] = ("student", "subject")) -> dict:
+        '''
+        returns the weighted average per group
+
+        params:
+        by -> "student", "subject", "period" or a tuple of them
+
+        returns:
+        dict -> group -> average. Groups without grades that count are left out
+        '''
+        return {key: value_sum / weight_sum for key, (value_sum, weight_sum) in self.get_totals(by).items()}
+
+    def __get_group_totals(self, student, subject, period) -> tuple:
+        filters = {name: label for name, label in zip(GROUP_COLUMNS, (student, subject, period))
+                   if label is not None}
+        totals = self.__get_totals(tuple(filters))
+        return totals.get(tuple(filters.values()), (0.0, 0.0))
+
+    def get_average(self, student: Optional[Hashable] = None, subject: Optional[Hashable] = None,
+                    period: Optional[Hashable] = None) -> Optional[float]:
+        '''
+        returns the weighted average of the grades that match all of the given labels. Labels that are None match everything
+
+        returns:
+        float -> the average
+        None -> if there are no grades that count
+        '''
+        value_sum, weight_sum = self.__get_group_totals(student, subject, period)
+        if weight_sum <= 0:
+            return None
+        return value_sum / weight_sum
+
+    def get_required_grade(self, target: float, weight: float, student: Optional[Hashable] = None,
+                           subject: Optional[Hashable] = None, period: Optional[Hashable] = None,
+                           minimum: float = 1.0, maximum: float = 10.0) -> Optional[float]:
+        '''
+        returns which grade is needed on the next test to get the target average
+
+        params:
+        target -> the average that should be reached, for example 5.5
+        weight -> the weight of the next test
+        student, subject, period -> the grades the average consists of (see get_average)
+        minimum, maximum -> the lowest and the highest possible grade
+
+        returns:
+        float -> the grade that is needed. minimum if any grade reaches the target
+        None -> if even the maximum grade doesn't reach the target
+        '''
+        if weight <= 0:
+            raise ValueError("weight must be greater than 0")
+        value_sum, weight_sum = self.__get_group_totals(student, subject, period)
+        required = (target * (weight_sum + weight) - value_sum) / weight
+        if required > maximum + 1e-9:  # leaves room for rounding errors
+            return None
+        return min(max(required, minimum), maximum)
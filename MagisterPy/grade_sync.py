@@ -0,0 +1,233 @@
+import abc
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Hashable, Optional
+from .response_items import Grade, parse_datetime
+
+# the entered time of the grades without an ingevoerdOp, they are older than all of the other grades
+_MIN_TIME = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _to_datetime(entered_time: Optional[str]) -> datetime:
+    return parse_datetime(entered_time) if entered_time else _MIN_TIME
+
+
+def _normalize(entered_time: Optional[str]) -> str:
+    '''
+    returns the entered time in UTC with a fixed precision, so the stored high water marks all look the same
+    no matter how many decimals Magister sent
+    '''
+    if not entered_time:
+        return ""
+    return _to_datetime(entered_time).astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+class GradeSyncState():
+    '''
+    What GradeSync remembers about one account
+
+    high_water_mark: the (ingevoerdOp, kolomId) of the most recently entered grade that has been seen. The ingevoerdOp is normalized to UTC
+    fingerprints: kolomId -> fingerprint of every grade that has been seen, used to detect changed grades
+    '''
+
+    def __init__(self, high_water_mark: Optional[tuple] = None, fingerprints: Optional[dict] = None):
+        self.high_water_mark = high_water_mark
+        self.fingerprints = fingerprints if fingerprints is not None else {}
+        # kolomIds whose fingerprint changed since the state was loaded, so stores only have to write those
+        self.changed_ids = set()
+
+    def update(self, grade: Grade, fingerprint: str) -> None:
+        self.fingerprints[grade.get_id()] = fingerprint
+        self.changed_ids.add(grade.get_id())
+        entered_time = _to_datetime(grade.get_entered_time())
+        # the timestamps are compared as datetimes, the strings of Magister don't always have the same precision
+        if self.high_water_mark is None or (entered_time, grade.get_id()) > (_to_datetime(self.high_water_mark[0]), self.high_water_mark[1]):
+            self.high_water_mark = (_normalize(grade.get_entered_time()), grade.get_id())
+
+    def get_high_water_time(self) -> Optional[datetime]:
+        '''
+        returns the entered time of the high water mark, or None if no grades have been seen yet
+        '''
+        if self.high_water_mark is None:
+            return None
+        return _to_datetime(self.high_water_mark[0])
+
+
+class GradeSyncStore(abc.ABC):
+    '''
+    Base class of the stores that keep the GradeSyncState of every account
+    '''
+
+    @abc.abstractmethod
+    def load(self, account_key: Hashable) -> GradeSyncState:
+        ...
+
+    @abc.abstractmethod
+    def save(self, account_key: Hashable, state: GradeSyncState) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, account_key: Hashable) -> None:
+        ...
+
+
+class InMemoryGradeSyncStore(GradeSyncStore):
+    '''
+    Keeps the sync state in memory. The state is lost when the process exits
+    '''
+
+    def __init__(self):
+        self.__states = {}
+        self.__lock = threading.Lock()
+
+    def load(self, account_key: Hashable) -> GradeSyncState:
+        with self.__lock:
+            state = self.__states.get(account_key)
+            if state is None:
+                return GradeSyncState()
+            return GradeSyncState(high_water_mark=state.high_water_mark, fingerprints=dict(state.fingerprints))
+
+    def save(self, account_key: Hashable, state: GradeSyncState) -> None:
+        with self.__lock:
+            self.__states[account_key] = GradeSyncState(
+                high_water_mark=state.high_water_mark, fingerprints=dict(state.fingerprints))
+        state.changed_ids = set()
+
+    def delete(self, account_key: Hashable) -> None:
+        with self.__lock:
+            self.__states.pop(account_key, None)
+
+
+class SQLiteGradeSyncStore(GradeSyncStore):
+    '''
+    Keeps the sync state in an SQLite database, so it survives restarts
+
+    Parameters:
+            path (str): The path of the database file. ":memory:" creates a temporary database
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS grade_sync_state ("
+                "account_key TEXT PRIMARY KEY, entered_time TEXT, kolom_id INTEGER)")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS grade_fingerprints ("
+                "account_key TEXT, kolom_id INTEGER, fingerprint TEXT, PRIMARY KEY (account_key, kolom_id))")
+
+    def load(self, account_key: Hashable) -> GradeSyncState:
+        account_key = str(account_key)
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT entered_time, kolom_id FROM grade_sync_state WHERE account_key = ?", (account_key,)).fetchone()
+            fingerprints = dict(self.__connection.execute(
+                "SELECT kolom_id, fingerprint FROM grade_fingerprints WHERE account_key = ?", (account_key,)))
+        return GradeSyncState(high_water_mark=tuple(row) if row else None, fingerprints=fingerprints)
+
+    def save(self, account_key: Hashable, state: GradeSyncState) -> None:
+        account_key = str(account_key)
+        with self.__lock, self.__connection:
+            if state.high_water_mark is not None:
+                self.__connection.execute(
+                    "INSERT OR REPLACE INTO grade_sync_state (account_key, entered_time, kolom_id) VALUES (?, ?, ?)",
+                    (account_key, *state.high_water_mark))
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO grade_fingerprints (account_key, kolom_id, fingerprint) VALUES (?, ?, ?)",
+                [(account_key, kolom_id, state.fingerprints[kolom_id]) for kolom_id in state.changed_ids])
+        state.changed_ids = set()
+
+    def delete(self, account_key: Hashable) -> None:
+        account_key = str(account_key)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM grade_sync_state WHERE account_key = ?", (account_key,))
+            self.__connection.execute(
+                "DELETE FROM grade_fingerprints WHERE account_key = ?", (account_key,))
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+
+class GradeSync():
+    '''
+    Finds the grades that are new or changed since the previous sync of an account.
+
+    Magister returns the grades sorted from the most recently entered to the oldest, so GradeSync only pages through
+    them until it reaches grades that were entered before the high water mark of the previous sync.
+
+    Parameters:
+            store (GradeSyncStore): Where the state of every account is kept. Defaults to an InMemoryGradeSyncStore
+
+            page_size (int): Number of grades fetched per request
+
+            prefetch (int): Number of pages fetched in the background (see MagisterSession.iter_grades)
+
+    Example:
+        grade_sync = GradeSync(store=SQLiteGradeSyncStore("grades.db"))
+        for grade in grade_sync.sync(session):
+            print("new grade:", grade.get_value())
+    '''
+
+    def __init__(self, store: Optional[GradeSyncStore] = None, page_size: int = 25, prefetch: int = 0):
+        self.store = store if store is not None else InMemoryGradeSyncStore()
+        self.page_size = page_size
+        self.prefetch = prefetch
+
+    @staticmethod
+    def get_fingerprint(grade: Grade) -> str:
+        '''
+        returns a hash of the grade json. It changes when anything about the grade changes
+        (compact grades need their whole json, so the session needs keep_raw_json=True)
+        '''
+        return hashlib.sha1(json.dumps(grade.json, sort_keys=True, default=str).encode()).hexdigest()
+
+    def sync(self, session, account_key: Optional[Hashable] = None, full_scan: bool = False) -> list[Grade]:
+        '''
+        fetches the grades of the session until it reaches the already seen grades
+
+        params:
+        session -> a logged in MagisterSession
+        account_key -> the key the state is stored under. Defaults to the account_id of the session
+        full_scan -> if True all of the grades are checked, instead of stopping at the high water mark
+
+        returns:
+        list[Grade] -> the new and changed grades, from the most recent to the oldest
+
+        raises FetchError if a page of the grades couldn't be fetched. The state is only saved after a scan that reached
+        the high water mark or the end of the grades, so the next sync returns the grades of the failed scan again
+        '''
+        if account_key is None:
+            account_key = session.account_id
+        state = self.store.load(account_key)
+        high_water_time = state.get_high_water_time()
+
+        new_grades = []
+        complete = False
+        grades = session.iter_grades(
+            page_size=self.page_size, prefetch=self.prefetch)
+        try:
+            for grade in grades:
+                entered_time = _to_datetime(grade.get_entered_time())
+                if not full_scan and high_water_time is not None and entered_time < high_water_time:
+                    # everything from here on was entered before the previous sync
+                    complete = True
+                    break
+                fingerprint = self.get_fingerprint(grade)
+                if state.fingerprints.get(grade.get_id()) != fingerprint:
+                    new_grades.append(grade)
+                    state.update(grade, fingerprint)
+            else:
+                complete = True
+        finally:
+            grades.close()
+
+        if new_grades and complete:
+            self.store.save(account_key, state)
+        return new_grades
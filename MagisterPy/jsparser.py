@@ -1,6 +1,21 @@
 import json
+import re
+from typing import Iterable, Optional, Union
 from .magister_errors import *
 
+# The authcode is obfuscated as two arrays right before this marker, for example:
+# (a=["6380e4","5e80d5bb","c0f3a31a","306157f0"],["0","1"].map((function(t){return a[...
+# The first array holds the parts of the authcode and the second one the indexes of the parts that are used.
+# All of the parsers use the first marker in the bundle
+_authcode_markers = {str: "].map((function(t)", bytes: b"].map((function(t)"}
+# both arrays, anchored at the end of the window that ends right before the marker
+_authcode_patterns = {
+    str: re.compile(r'\[([^\[\]]*)\],\s*\[([^\[\]]*)\Z'),
+    bytes: re.compile(rb'\[([^\[\]]*)\],\s*\[([^\[\]]*)\Z')
+}
+# how many characters before the marker are searched for the arrays
+AUTHCODE_WINDOW = 512
+
 
 class JsParser():
     def __init__(self):
@@ -17,7 +32,64 @@ class JsParser():
             return self.rfind_nth_instance(string, substring, n-1, index)
         return index
 
-    def get_authcode_from_js(self, js_content: str):
+    def get_authcode_fast(self, js_content: Union[str, bytes]) -> Optional[str]:
+        '''
+        Extracts the authcode with a precompiled regex that only looks at the bytes right before the marker.
+        Works on the raw bytes of the response, so the 240 KB bundle doesn't have to be decoded (response.text also guesses the encoding, which is slower than parsing)
+
+        returns:
+        str -> the authcode
+        None -> if the arrays were not found
+        '''
+        content_type = bytes if isinstance(js_content, (bytes, bytearray)) else str
+        end = js_content.find(_authcode_markers[content_type])
+        if end == -1:
+            return None
+        match = _authcode_patterns[content_type].search(
+            js_content, max(0, end - AUTHCODE_WINDOW), end)
+        if match is None:
+            return None
+        return self.build_authcode(match.group(1), match.group(2))
+
+    def build_authcode(self, random_chars: Union[str, bytes], indexes: Union[str, bytes]) -> str:
+        '''
+        builds the authcode from the contents (without the brackets) of the two arrays in front of the marker
+        '''
+        random_char_list = json.loads(b"[" + random_chars + b"]" if isinstance(
+            random_chars, bytes) else "[" + random_chars + "]")
+        index_list = json.loads(b"[" + indexes + b"]" if isinstance(
+            indexes, bytes) else "[" + indexes + "]")
+        return "".join(str(random_char_list[int(idx)]) for idx in index_list)
+
+    def get_authcode_from_stream(self, chunks: Iterable[bytes]) -> str:
+        '''
+        Extracts the authcode from the chunks of a bundle and stops reading the chunks once it has been found
+        '''
+        scanner = AuthcodeScanner()
+        for chunk in chunks:
+            scanner.feed(chunk)
+            if scanner.done:
+                break
+        return scanner.finish()
+
+    def get_authcode_from_js(self, js_content: Union[str, bytes]):
+        try:
+            authcode = self.get_authcode_fast(js_content)
+            if authcode:
+                return authcode
+        except KeyboardInterrupt:
+            raise KeyboardInterrupt()
+        except Exception:
+            pass
+        # falls back to the slower parser that is less strict about the surroundings of the arrays
+        if not isinstance(js_content, str):
+            js_content = bytes(js_content).decode("utf-8", errors="replace")
+        return self.get_authcode_slow(js_content)
+
+    def get_authcode_slow(self, js_content: str):
+        '''
+        Extracts the authcode by walking over the characters in front of the marker
+        '''
         try:
             line = 1131
 
@@ -64,3 +136,95 @@ class JsParser():
             raise KeyboardInterrupt()
         except Exception:
             raise AuthcodeError()
+
+
+class AuthcodeScanner():
+    '''
+    Finds the authcode in an account javascript bundle that is received in chunks, so the download can stop
+    as soon as the first marker has been received. Every chunk is only searched together with a bounded look-behind buffer
+    (the end of the previous chunks), which is large enough to hold both arrays and a marker that is split between two chunks.
+    If the arrays in front of the marker don't match the fast scan (or can't be read), only that window is kept for the slower parser.
+
+    Parameters:
+            keep_content (bool): Keeps all of the received chunks and uses the whole bundle for the slower parser. Defaults to False
+
+    Example:
+        scanner = AuthcodeScanner()
+        for chunk in response.iter_content(65536):
+            scanner.feed(chunk)
+            if scanner.done:
+                break
+        authcode = scanner.finish()
+    '''
+    LOOK_BEHIND = AUTHCODE_WINDOW + len(_authcode_markers[bytes]) - 1
+
+    def __init__(self, keep_content: bool = False):
+        self.keep_content = keep_content
+        self.authcode = None
+        self.bytes_received = 0
+        self.__buffer = b""
+        self.__chunks = []
+        # the end of the bundle up to the first marker, if the fast scan didn't find the arrays in front of it
+        self.__marker_window = None
+
+    @property
+    def done(self) -> bool:
+        '''
+        True once the first marker has been received, the rest of the bundle isn't needed
+        '''
+        return self.authcode is not None or self.__marker_window is not None
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        '''
+        scans the next chunk of the bundle
+
+        returns:
+        str -> the authcode, once it has been found
+        None -> if it hasn't been found yet
+        '''
+        if self.done:
+            return self.authcode
+        self.bytes_received += len(chunk)
+        if self.keep_content:
+            self.__chunks.append(chunk)
+
+        buffer = self.__buffer + chunk
+        marker = _authcode_markers[bytes]
+        end = buffer.find(marker)
+        if end == -1:
+            self.__buffer = buffer[-self.LOOK_BEHIND:]
+            return None
+
+        self.__buffer = b""
+        start = max(0, end - AUTHCODE_WINDOW)
+        match = _authcode_patterns[bytes].search(buffer, start, end)
+        if match is not None:
+            try:
+                self.authcode = JsParser().build_authcode(match.group(1), match.group(2))
+            except (ValueError, IndexError, TypeError):
+                # the arrays aren't valid json (for example [x,y]) or an index is out of range
+                pass
+        if self.authcode is None:
+            self.__marker_window = buffer[start:end + len(marker)]
+            return None
+        self.__chunks = []
+        return self.authcode
+
+    def finish(self) -> str:
+        '''
+        returns the authcode. Call it after the last chunk (or once done is True). If the fast scan found nothing the slower parser
+        is used on the window in front of the first marker (or on the whole bundle if keep_content is True).
+        Raises an AuthcodeError if the marker was never received or the slower parser fails too
+        '''
+        if self.authcode is not None:
+            return self.authcode
+        if self.keep_content:
+            content = b"".join(self.__chunks)
+        elif self.__marker_window is not None:
+            content = self.__marker_window
+        else:
+            raise AuthcodeError()
+        self.__chunks = []
+        self.authcode = JsParser().get_authcode_from_js(content)
+        return self.authcode
+
@@ -0,0 +1,177 @@
+'''
+Load tests MagisterSession against a MagisterSimulator and reports the logins per second and the latency of the fetches.
+
+    python -m MagisterPy.load_generator [--logins 100] [--concurrency 8] [--fetches 4] [--latency 0.005] [--server]
+
+First all of the sessions log in concurrently, after that every session fetches its schedule and grades fetches times.
+'''
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+from .magister_session import MagisterSession
+from .simulator import MagisterSimulator, SimulatorAdapter, SimulatorServer, SimulatorServerAdapter
+
+
+class LoadTestResult(NamedTuple):
+    '''
+    The result of run_load_test. The durations are in seconds
+
+    logins: the amount of successful logins
+    failed_logins: the amount of logins that failed
+    login_duration: how long the login phase took
+    login_p50, login_p99: the latency of one login
+    fetches: the amount of successful fetches
+    failed_fetches: the amount of fetches that failed
+    fetch_duration: how long the fetch phase took
+    fetch_p50, fetch_p99: the latency of one fetch
+    request_counts: how many requests the simulator got per endpoint
+    '''
+    logins: int
+    failed_logins: int
+    login_duration: float
+    login_p50: float
+    login_p99: float
+    fetches: int
+    failed_fetches: int
+    fetch_duration: float
+    fetch_p50: float
+    fetch_p99: float
+    request_counts: dict
+
+    @property
+    def logins_per_second(self) -> float:
+        return self.logins / self.login_duration if self.login_duration else 0.0
+
+    @property
+    def fetches_per_second(self) -> float:
+        return self.fetches / self.fetch_duration if self.fetch_duration else 0.0
+
+    def format(self) -> str:
+        '''
+        returns a human readable report
+        '''
+        return (f"logins:  {self.logins} ok, {self.failed_logins} failed, {self.logins_per_second:.1f} logins/sec, "
+                f"p50 {self.login_p50 * 1e3:.1f}ms, p99 {self.login_p99 * 1e3:.1f}ms\n"
+                f"fetches: {self.fetches} ok, {self.failed_fetches} failed, {self.fetches_per_second:.1f} fetches/sec, "
+                f"p50 {self.fetch_p50 * 1e3:.1f}ms, p99 {self.fetch_p99 * 1e3:.1f}ms")
+
+
+def percentile(values: list, percent: float) -> float:
+    '''
+    returns the nearest-rank percentile of the values (0.0 for an empty list)
+    '''
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def run_load_test(simulator: Optional[MagisterSimulator] = None, logins: int = 50, concurrency: int = 8, fetches_per_login: int = 4,
+                  use_server: bool = False, schedule_range: tuple = ("2024-11-04", "2024-11-08"), **session_kwargs) -> LoadTestResult:
+    '''
+    logs in logins sessions and lets every one of them fetch fetches_per_login times, using concurrency threads.
+    The fetches alternate between get_schedule(with_changes=True) and get_grades.
+
+    params:
+    simulator -> the simulator to test against. Defaults to a MagisterSimulator without latency
+    use_server -> if True the requests go through a SimulatorServer on localhost instead of being answered inside of the process
+    schedule_range -> the (_from, to) passed to get_schedule
+    **session_kwargs -> passed to every MagisterSession (for example enable_authcode_cache or request_retries)
+
+    returns:
+    LoadTestResult
+    '''
+    if simulator is None:
+        simulator = MagisterSimulator()
+    accounts = simulator.get_accounts()
+    session_kwargs.setdefault("delay_between_relogin_atempts", 0)
+
+    server = None
+    if use_server:
+        server = SimulatorServer(simulator).start()
+        http_adapter = SimulatorServerAdapter(server.url, pool_connections=concurrency, pool_maxsize=concurrency)
+    else:
+        http_adapter = SimulatorAdapter(simulator)
+
+    def login(index: int):
+        school_name, username, password = accounts[index % len(accounts)]
+        session = MagisterSession(http_adapter=http_adapter, **session_kwargs)
+        start = time.perf_counter()
+        try:
+            logged_in = session.login(school_name=school_name, username=username, password=password)
+        except Exception:
+            logged_in = False
+        return (session if logged_in else None), time.perf_counter() - start
+
+    def fetch(session: MagisterSession) -> list:
+        durations = []
+        for index in range(fetches_per_login):
+            start = time.perf_counter()
+            try:
+                if index % 2 == 0:
+                    result = session.get_schedule(*schedule_range, with_changes=True)
+                else:
+                    result = session.get_grades(top=25)
+            except Exception:
+                result = None
+            durations.append((result is not None, time.perf_counter() - start))
+        return durations
+
+    simulator.reset_request_counts()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            login_results = list(executor.map(login, range(logins)))
+            login_duration = time.perf_counter() - start
+
+            sessions = [session for session, _ in login_results if session is not None]
+            start = time.perf_counter()
+            fetch_results = [duration for durations in executor.map(fetch, sessions)
+                             for duration in durations]
+            fetch_duration = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.stop()
+
+    login_durations = [duration for session, duration in login_results if session is not None]
+    fetch_durations = [duration for succeeded, duration in fetch_results if succeeded]
+    return LoadTestResult(logins=len(sessions), failed_logins=logins - len(sessions), login_duration=login_duration,
+                          login_p50=percentile(login_durations, 50), login_p99=percentile(login_durations, 99),
+                          fetches=len(fetch_durations), failed_fetches=len(fetch_results) - len(fetch_durations),
+                          fetch_duration=fetch_duration, fetch_p50=percentile(fetch_durations, 50),
+                          fetch_p99=percentile(fetch_durations, 99), request_counts=dict(simulator.request_counts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fetches", type=int, default=4,
+                        help="fetches per logged in session")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds every simulated request takes")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-lifetime", type=float, default=3600)
+    parser.add_argument("--retries", type=int, default=0,
+                        help="request_retries of the sessions")
+    parser.add_argument("--no-authcode-cache", action="store_true",
+                        help="download and parse the bundle on every login")
+    parser.add_argument("--server", action="store_true",
+                        help="send the requests over http to a local server instead of answering them in the process")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    simulator = MagisterSimulator(latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+                                  token_lifetime=args.token_lifetime, seed=args.seed)
+    result = run_load_test(simulator, logins=args.logins, concurrency=args.concurrency, fetches_per_login=args.fetches,
+                           use_server=args.server, enable_authcode_cache=not args.no_authcode_cache,
+                           request_retries=args.retries)
+    print(result.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -41,3 +41,21 @@ class FetchError(BaseMagisterError):
     def __init__(self, message="\nThere was an error fetching the data. The session has probably expired. Run relogin on the session or enable automatic_relogin through the session parameters."):
         super().__init__(message)
         self.message = message
+
+
+class InvalidSessionState(BaseMagisterError):
+    def __init__(self, message="\nThe session state could not be read. It is either corrupted or the encryption key is incorrect"):
+        super().__init__(message)
+        self.message = message
+
+
+class CircuitOpenError(ConnectionError):
+    def __init__(self, message="\nToo many logins to this school have failed in a row. Magister is probably down, try again later"):
+        super().__init__(message)
+        self.message = message
+
+
+class DroppedFieldError(BaseMagisterError, KeyError):
+    def __init__(self, message="\nThe compact item didn't keep this field of its json. Create it with keep_raw=True to keep the whole json"):
+        super().__init__(message)
+        self.message = message
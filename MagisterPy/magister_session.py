@@ -1,11 +1,29 @@
+import functools
 import requests
 from urllib.parse import urlparse, parse_qs
 from .request_manager import LoginRequestsSender , AuthorizedRequestSender
-from typing import Optional
-from .error_handler import error_handler
+from typing import Iterator, Optional
+from collections import deque
+from .error_handler import error_handler, set_relogging_in, reset_relogging_in, collect_relogin_failures, reset_relogin_failures, report_server_failure
 from .magister_errors import *
 import time
+import json
+import logging
+import threading
 from .response_items import *
+from .compact_items import CompactLesson, CompactGrade, CompactPersonProfile, CompactAccountProfile
+from .authcode_cache import AuthcodeCache, default_authcode_cache
+from .retry_policy import RetryPolicy
+from .schedule_cache import ScheduleCache
+from .tracing import Tracer, trace_request
+from .metrics import MetricsRegistry, SessionMetrics, default_metrics_registry
+from .session_logging import log_session_message
+from concurrent.futures import ThreadPoolExecutor
+
+
+# used for sending the requests of a method concurrently (for example the two schedule requests of get_schedule)
+_request_executor = ThreadPoolExecutor(
+    max_workers=32, thread_name_prefix="MagisterPy-request")
 
 
 class MagisterSession():
@@ -13,7 +31,8 @@ class MagisterSession():
     Creates a session with Magister
 
     Parameters:
-            enable_logging (bool):  Used to display information in the standard output
+            enable_logging (bool):  Used to display information in the standard output. The messages are always logged to the
+            "MagisterPy.session" logger as well, with the tenant, account_id and correlation_id of the session (see MagisterPy.session_logging)
 
             automatically_handle_errors (bool): Used to automatically handle errors. If any function fails it returns None instead of raising an error
 
@@ -21,12 +40,64 @@ class MagisterSession():
 
             max_relogin_atempts (int): Specifies how many times the session will try to reconnect before throwing an error
 
-            delay_between_relogin_atempts (int) How many seconds should transpire between each atempt.
+            delay_between_relogin_atempts (int) The base delay in seconds between the relogin atempts. The delay grows exponentially with random jitter.
 
-    '''
+            retry_policy (RetryPolicy): Decides how long to wait between the relogin atempts and stops relogging in to a school that keeps failing. Defaults to a policy based on delay_between_relogin_atempts
+
+            enable_authcode_cache (bool): If set to True the authcode extracted from the account javascript is cached, so it doesn't get downloaded and parsed on every login
+
+            authcode_cache (AuthcodeCache): The cache used for the authcodes. Defaults to a cache that is shared by all of the sessions in the process
+
+            http_adapter (requests.adapters.HTTPAdapter): Adapter mounted for all of the https requests. Passing the same SharedHTTPAdapter to several sessions makes them share their connections
+
+            request_timeout (float): How many seconds to wait for the Magister API before giving up on a request. None waits forever
+
+            request_retries (int): How many times a request to the Magister API is retried after a connection error or a temporary server error.
+            POST requests are only retried when the connection couldn't be made
+
+            schedule_cache (ScheduleCache): If provided get_schedule only fetches the days that are not cached yet
+
+            cancellations_from_status (bool): If set to True get_schedule(with_changes=True) detects the cancelled lessons using their Status field,
+            which only needs one request instead of two
+
+            compact_items (bool): If set to True the methods return the compact items (CompactLesson, CompactGrade, ...) that only keep the fields
+            used by their getters. They use a lot less memory when a lot of items are kept around, but they are read only
+
+            keep_raw_json (bool): If set to True the compact items also keep their whole json (as compact bytes), so all of its fields can
+            still be read. Without it reading a field the getters don't use raises DroppedFieldError
+
+            tracer (Tracer): Gets called at the start and the end of every request with the phase of the login or fetch it belongs to
+            (see MagisterPy.tracing). Defaults to None, which skips the tracing completely
 
-    def __init__(self, enable_logging=False, automatically_handle_errors=True, max_relogin_atempts=5, enable_automatic_relogin=True, delay_between_relogin_atempts=2):
+            enable_metrics (bool): If set to True the session counts its calls, errors, relogins and cache lookups (see MagisterPy.metrics).
+            Defaults to None, which only turns them on if a metrics_registry is given. Without metrics they are skipped completely
 
+            metrics_registry (MetricsRegistry): The registry the metrics are reported into. Passing one turns the metrics on (unless enable_metrics is False).
+            Defaults to a registry that is shared by all of the sessions in the process
+
+    '''
+
+    def __init__(self, enable_logging=False, automatically_handle_errors=True, max_relogin_atempts=5, enable_automatic_relogin=True, delay_between_relogin_atempts=2,
+                 enable_authcode_cache=True, authcode_cache: Optional[AuthcodeCache] = None, retry_policy: Optional[RetryPolicy] = None, http_adapter: Optional[requests.adapters.HTTPAdapter] = None,
+                 request_timeout: Optional[float] = None, request_retries: int = 0, schedule_cache: Optional[ScheduleCache] = None,
+                 cancellations_from_status: bool = False, compact_items: bool = False, keep_raw_json: bool = False, tracer: Optional[Tracer] = None,
+                 enable_metrics: Optional[bool] = None, metrics_registry: Optional[MetricsRegistry] = None):
+
+        self.http_adapter = http_adapter
+        self.tracer = tracer
+        if enable_metrics is None:
+            # a session that is given a registry is meant to report into it
+            enable_metrics = metrics_registry is not None
+        if not enable_metrics:
+            self.metrics = None
+        else:
+            self.metrics = SessionMetrics(
+                metrics_registry if metrics_registry is not None else default_metrics_registry)
+        # a session can be shared between threads. Only one of them relogs in at a time, the others wait for it
+        self.__relogin_condition = threading.Condition()
+        self.__relogin_running = False
+        self.__last_relogin_result = False
+        self.token_generation = 0  # increases every time the session logs in and gets a new app_auth_token
         self.__set_vars()
 
         self.automatically_handle_errors = automatically_handle_errors
@@ -35,9 +106,35 @@ class MagisterSession():
         self.relogin_atempts = max_relogin_atempts
         self.enable_automatic_relogin = enable_automatic_relogin
         self.delay_between_relogin_atempts = delay_between_relogin_atempts
+        if retry_policy is None:
+            retry_policy = RetryPolicy(base_delay=delay_between_relogin_atempts)
+        self.retry_policy = retry_policy
 
         self.recieve_log = enable_logging
 
+        self.request_timeout = request_timeout
+        self.request_retries = request_retries
+        self.schedule_cache = schedule_cache
+        self.cancellations_from_status = cancellations_from_status
+        self.compact_items = compact_items
+        self.keep_raw_json = keep_raw_json
+        # the classes the responses are wrapped in
+        if compact_items:
+            self.lesson_class = functools.partial(CompactLesson, keep_raw=keep_raw_json)
+            self.grade_class = functools.partial(CompactGrade, keep_raw=keep_raw_json)
+            self.person_profile_class = functools.partial(CompactPersonProfile, keep_raw=keep_raw_json)
+            self.account_profile_class = functools.partial(CompactAccountProfile, keep_raw=keep_raw_json)
+        else:
+            self.lesson_class, self.grade_class = Lesson, Grade
+            self.person_profile_class, self.account_profile_class = PersonProfile, AccountProfile
+
+        if not enable_authcode_cache:
+            self.authcode_cache = None
+        elif authcode_cache is None:
+            self.authcode_cache = default_authcode_cache
+        else:
+            self.authcode_cache = authcode_cache
+
     def __set_vars(self, reset_credentials=None):
         '''
         Sets/resets all of the variables back to their original state.
@@ -45,11 +142,12 @@ class MagisterSession():
         if reset_credentials is None:
             reset_credentials = True
 
-        self.request_sender = LoginRequestsSender()
-        self.session = requests.Session()
+        self.request_sender = LoginRequestsSender(tracer=self.tracer)
+        self.session = self._new_http_session()
         # auth token for the redirect page (also called access_token)
         self.profile_auth_token = None
         self.app_auth_token = None  # auth token for the main app
+        self.app_auth_token_expiry = None  # unix timestamp at which the app_auth_token expires
         self.authcode = None  # gets randomly generated once every 3-7 days
         self.sessionid = None  # gets assigned when entering the login page
         self.returnurl = None  # used for some requests
@@ -64,6 +162,18 @@ class MagisterSession():
             self.__username = None
             self.__password = None
 
+    def _new_http_session(self) -> requests.Session:
+        '''
+        creates the requests session used for sending the requests
+        '''
+        session = requests.Session()
+        # the 5xx responses of a relogin count for the circuit breaker of the school
+        session.hooks["response"].append(
+            lambda response, *args, **kwargs: report_server_failure(self, response.status_code))
+        if self.http_adapter is not None:
+            session.mount("https://", self.http_adapter)
+        return session
+
     def clear(self, reset_credentials: bool = True) -> None:
         '''
         Closes the current session and resets all of the variables. 
@@ -99,17 +209,30 @@ class MagisterSession():
         try:
             self.session.close()
         except (AttributeError, NameError) as e:
-            self._logMessage(f"Error closing the session{e}")
+            self._logMessage("Error closing the session: %s", e, level=logging.WARNING)
+
+    def _logMessage(self, msg: str, *args, level: int = logging.INFO, exc_info=None):
+        '''
+        logs the message with the context of the session (see MagisterPy.session_logging). The args are only
+        merged into the message when it is emitted
+        '''
+        log_session_message(self, level, msg, args, exc_info=exc_info)
+
+    def _get_tenant(self) -> str:
+        '''
+        returns the name the metrics of the session are reported under: the host of the api or, before the first login, the school name
+        '''
+        if self.api_url:
+            return urlparse(self.api_url).netloc
+        return self.__school_name or "unknown"
 
-    def _logMessage(self, msg: str):
-        if self.recieve_log:
-            print(msg)
     def is_logged_in(self) -> bool:
         '''
         returns True -> user is logged in
                 False -> user still needs to log in
         '''
-        return self.app_auth_token and self.__school_name and self.__password and self.__username
+        # the password is only needed for relogging in, a session resumed from a state without it is still logged in
+        return self.app_auth_token and self.__school_name and self.__username
     @error_handler
     def input_school(self, school_name: str) -> Optional[requests.Response]:
         '''
@@ -131,20 +254,28 @@ class MagisterSession():
             session.input_school("MySchoolName")
         '''
         # clearing the session
-        self.session = requests.Session()
+        self.session = self._new_http_session()
         # Initializing the login session
         url_login_page = "https://accounts.magister.net/"
 
-        response = self.session.get(url_login_page, allow_redirects=False)
+        with trace_request(self.tracer, "login_start", "GET", url_login_page) as event:
+            response = self.session.get(url_login_page, allow_redirects=False)
+            event.set_response(response)
 
         redirect_url_1 = r"https://accounts.magister.net/connect/authorize?client_id=iam-profile&redirect_uri=https%3A%2F%2Faccounts.magister.net%2Fprofile%2Foidc%2Fredirect_callback.html&response_type=id_token%20token&scope=openid%20profile%20email%20magister.iam.profile&state=57dcb9c3b667407791ff32a7af41e703&nonce=ec78d557c0e44751bf573db6719445cd"
-        response = self.session.get(redirect_url_1, allow_redirects=False)
+        with trace_request(self.tracer, "authorize_redirect", "GET", redirect_url_1) as event:
+            response = self.session.get(redirect_url_1, allow_redirects=False)
+            event.set_response(response)
 
-        response = self.session.get(response.headers.get(
-            "location"), allow_redirects=False)
+        login_redirect_url = response.headers.get("location")
+        with trace_request(self.tracer, "login_redirect", "GET", login_redirect_url) as event:
+            response = self.session.get(login_redirect_url, allow_redirects=False)
+            event.set_response(response)
 
-        response = self.session.get(
-            "https://accounts.magister.net/" + response.headers.get("location"), allow_redirects=False)
+        login_page_url = "https://accounts.magister.net/" + response.headers.get("location")
+        with trace_request(self.tracer, "login_page", "GET", login_page_url) as event:
+            response = self.session.get(login_page_url, allow_redirects=False)
+            event.set_response(response)
 
         self.sessionid = parse_qs(urlparse(response.url).query).get(
             'sessionId', [None])[0]
@@ -155,12 +286,9 @@ class MagisterSession():
 
         javascript_redirect_url = self.request_sender.extract_redirect_url_from_html(
             response.text)
+        bundle_url = f"https://accounts.magister.net/{javascript_redirect_url}"
 
-        response = self.session.get(
-            f"https://accounts.magister.net/{javascript_redirect_url}")
-
-        self.authcode = self.request_sender.extract_dynamic_authcode(
-            response.text)
+        self.authcode, authcode_from_cache = self.__get_authcode(bundle_url)
 
         self.main_payload = {
             'authCode': self.authcode,
@@ -173,6 +301,17 @@ class MagisterSession():
         try:
             response = self.request_sender.set_school(
                 request_session=self.session, school_name=school_name, main_payload=self.main_payload)
+            if response.status_code != 200 and authcode_from_cache:
+                # the cached authcode might be stale, so the bundle gets downloaded again before giving up
+                self._logMessage(
+                    "The cached authcode was rejected, downloading the authcode again")
+                if self.metrics is not None:
+                    self.metrics.record_authcode_cache("stale")
+                self.authcode_cache.invalidate(bundle_url)
+                self.authcode, _ = self.__get_authcode(bundle_url)
+                self.main_payload["authCode"] = self.authcode
+                response = self.request_sender.set_school(
+                    request_session=self.session, school_name=school_name, main_payload=self.main_payload)
             if response.status_code != 200:
                 raise IncorrectCredentials(
                     f"Could not find school: {school_name}")
@@ -181,6 +320,31 @@ class MagisterSession():
         self.__school_name = school_name
         return response
 
+    def __get_authcode(self, bundle_url: str) -> tuple:
+        '''
+        returns the authcode of the account javascript bundle and whether it came from the authcode cache
+        '''
+        if self.authcode_cache is not None:
+            authcode = self.authcode_cache.get(bundle_url)
+            if self.metrics is not None:
+                self.metrics.record_authcode_cache(
+                    "miss" if authcode is None else "hit")
+            if authcode is not None:
+                return authcode, True
+
+        # the authcode is found before the end of the bundle, so the rest of it isn't downloaded
+        with trace_request(self.tracer, "bundle_download", "GET", bundle_url) as event:
+            response = self.session.get(bundle_url, stream=True)
+            event.set_response(response, read_content=False)
+            authcode = self.request_sender.extract_dynamic_authcode_streaming(
+                response)
+            # the compressed size of the part of the bundle that was read
+            event.set(bytes_received=response.raw.tell())
+
+        if self.authcode_cache is not None:
+            self.authcode_cache.set(bundle_url, authcode)
+        return authcode, False
+
     @error_handler
     def input_username(self, username: str) -> Optional[requests.Response]:
         '''
@@ -249,6 +413,8 @@ class MagisterSession():
             request_session=self.session, profile_auth_token=self.profile_auth_token)
         self.app_auth_token = self.request_sender.get_app_auth_token(
             request_session=self.session, api_url=self.api_url)
+        self.app_auth_token_expiry = self.request_sender.get_token_expiry(
+            self.app_auth_token)
         self.account_id = self.request_sender.get_accountid(
             request_session=self.session, app_auth_token=self.app_auth_token, api_url=self.api_url)
         self.person_id = self.request_sender.get_personid(
@@ -256,6 +422,8 @@ class MagisterSession():
 
         self._logMessage("you have successfully logged in!")
         self.__password = password
+        with self.__relogin_condition:
+            self.token_generation += 1
         return response
 
     @error_handler
@@ -272,51 +440,221 @@ class MagisterSession():
         username -> a string of a username (should be exact)
         password -> a string with the password of the user (should be exact)
         '''
-        # Inputting the school
-        input_school_response = self.input_school(school_name=school_name)
-
-        if not input_school_response:
-            return False
-
-        # username
-        input_username_response = self.input_username(username=username)
-        if not input_username_response:
-            return False
-        # password
-        input_password_response = self.input_password(password=password)
-        if not input_password_response:
-            return False
+        with trace_request(self.tracer, "login") as event:
+            event.set(success=False)
+            # Inputting the school
+            input_school_response = self.input_school(school_name=school_name)
+
+            if not input_school_response:
+                return False
+
+            # username
+            input_username_response = self.input_username(username=username)
+            if not input_username_response:
+                return False
+            # password
+            input_password_response = self.input_password(password=password)
+            if not input_password_response:
+                return False
+
+            event.set(success=True)
+            return True
+
+    def wait_for_relogin(self, timeout: Optional[float] = None) -> bool:
+        '''
+        waits until the relogin running in another thread is finished
 
-        return True
+        returns:
+        True -> if no relogin is running anymore
+        False -> if the timeout ran out first
+        '''
+        with self.__relogin_condition:
+            return self.__relogin_condition.wait_for(lambda: not self.__relogin_running, timeout=timeout)
 
-    def relogin(self):
+    def relogin(self, token_generation: Optional[int] = None):
         '''
         Tries to relogin using the previously provided credentials (for example using login or input_{...} methods)
         True -> if user logged in successfully
+        False -> if the session was resumed from a state without the password, so it can't relogin
 
         raises an error if all the relogin atempts were used up
 
+        If several threads call relogin at the same time only one of them relogs in, the others wait for it and get its result.
+        If token_generation is provided (the token_generation from before the failed call) and the session has already
+        relogged in since then, no new relogin is started.
+
         Keep in mind that the errors raised by this method are not handled automatically
         '''
+        with self.__relogin_condition:
+            if token_generation is not None and token_generation != self.token_generation:
+                # another thread has already relogged in after the failed call was made
+                return True
+            if self.__relogin_running:
+                self.__relogin_condition.wait_for(
+                    lambda: not self.__relogin_running)
+                return self.__last_relogin_result
+            self.__relogin_running = True
+            self.__last_relogin_result = False
+
+        relogging_in_token = set_relogging_in(self)
+        tenant = self._get_tenant()
+        if self.metrics is not None:
+            self.metrics.relogin_started(tenant)
+        try:
+            self.__last_relogin_result = self.__relogin()
+            return self.__last_relogin_result
+        finally:
+            reset_relogging_in(relogging_in_token)
+            if self.metrics is not None:
+                self.metrics.relogin_finished(
+                    tenant, self.__last_relogin_result)
+            with self.__relogin_condition:
+                self.__relogin_running = False
+                self.__relogin_condition.notify_all()
+
+    def __relogin(self):
         self._logMessage("Atempting to relogin...")
-        if None in (self.__school_name, self.__password, self.__username):
+        if None in (self.__school_name, self.__username):
             raise NotLoggedInError()
-        while self.relogin_atempts > 0:
-            self._logMessage(f"Atempts left: {self.relogin_atempts}")
-            self.relogin_atempts -= 1
-            result = self.login(school_name=self.__school_name,
-                                username=self.__username,
-                                password=self.__password)
-            if result:
-                self.relogin_atempts = self.max_relogin_atempts
-                return True
-
-            time.sleep(self.delay_between_relogin_atempts)
+        if self.__password is None:
+            # a session resumed from a state without the password can't relogin, the caller handles it like a failed relogin
+            self._logMessage("Can't relogin without the password", level=logging.WARNING)
+            return False
+        circuit_breaker = self.retry_policy.get_circuit_breaker(
+            urlparse(self.api_url).netloc if self.api_url else self.__school_name)
+        try:
+            atempt = 0
+            while self.relogin_atempts > 0:
+                if not circuit_breaker.allow_request():
+                    raise CircuitOpenError()
+                self._logMessage("Atempts left: %s", self.relogin_atempts)
+                self.relogin_atempts -= 1
+                # only connection errors and server errors count for the circuit breaker that is shared by the whole school,
+                # incorrect credentials only use up the atempts of this session
+                failures = []
+                failures_token = collect_relogin_failures(failures)
+                result = False
+                try:
+                    result = self.login(school_name=self.__school_name,
+                                        username=self.__username,
+                                        password=self.__password)
+                except Exception as e:
+                    report_server_failure(self, e)
+                    raise
+                finally:
+                    reset_relogin_failures(failures_token)
+                    # also runs for a NotLoggedInError or a KeyboardInterrupt, so a trial atempt is always finished
+                    if result:
+                        circuit_breaker.record_success()
+                    elif failures:
+                        circuit_breaker.record_failure()
+                    else:
+                        circuit_breaker.release()
+                    if self.metrics is not None:
+                        self.metrics.record_relogin_attempt(
+                            self._get_tenant(), bool(result))
+                if result:
+                    return True
+
+                if self.relogin_atempts > 0:
+                    time.sleep(self.retry_policy.get_delay(atempt))
+                atempt += 1
+        finally:
+            # the atempts are reset even if the relogin failed, so the session can relogin again later
+            self.relogin_atempts = self.max_relogin_atempts
         raise ConnectionError(
             "\nCould not reconect to your account after all of the atempts")
 
+    def export_state(self, encryption_key: Optional[bytes] = None, include_credentials: bool = False,
+                     allow_plaintext_credentials: bool = False) -> str:
+        '''
+        Serializes the logged in state of the session, so it can be resumed later using MagisterSession.from_state()
+        without logging in again (for example after restarting a worker).
+
+        params:
+        encryption_key (bytes) -> if provided the state gets encrypted using Fernet (requires the cryptography package). Create a key using cryptography.fernet.Fernet.generate_key()
+        include_credentials (bool) -> if True the password is stored as well, so the resumed session can still relogin.
+        Without an encryption_key this raises a ValueError, unless allow_plaintext_credentials is True
+        allow_plaintext_credentials (bool) -> allows storing the password without encrypting it
+
+        returns:
+        str -> the serialized state
+        '''
+        if not self.is_logged_in():
+            raise NotLoggedInError()
+        if include_credentials and encryption_key is None and not allow_plaintext_credentials:
+            raise ValueError(
+                "The password would be stored in plaintext. Pass an encryption_key or set allow_plaintext_credentials to True")
+
+        state = {
+            "version": 1,
+            "app_auth_token": self.app_auth_token,
+            "app_auth_token_expiry": self.app_auth_token_expiry,
+            "api_url": self.api_url,
+            "person_id": self.person_id,
+            "account_id": self.account_id,
+            "cookies": [{"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path,
+                         "secure": cookie.secure, "expires": cookie.expires}
+                        for cookie in self.session.cookies]
+        }
+        state["credentials"] = {
+            "school_name": self.__school_name,
+            "username": self.__username
+        }
+        if include_credentials:
+            state["credentials"]["password"] = self.__password
+
+        state = json.dumps(state)
+        if encryption_key is not None:
+            state = _get_fernet(encryption_key).encrypt(
+                state.encode()).decode()
+        return state
+
+    @classmethod
+    def from_state(cls, state: str, encryption_key: Optional[bytes] = None, **kwargs) -> "MagisterSession":
+        '''
+        Creates a logged in session from a state created by export_state(). No requests are sent.
+
+        params:
+        state (str) -> the state returned by export_state()
+        encryption_key (bytes) -> the key the state was encrypted with
+        **kwargs -> passed to the MagisterSession constructor
+
+        Keep in mind that the app_auth_token stored in the state can already be expired. If the password
+        wasn't included in the state the session can't relogin.
+        '''
+        try:
+            if encryption_key is not None:
+                state = _get_fernet(encryption_key).decrypt(
+                    state.encode() if isinstance(state, str) else state)
+            state = json.loads(state)
+        except ImportError:
+            raise
+        except Exception as e:
+            raise InvalidSessionState() from e
+
+        # errors of the kwargs aren't caused by the state, so they are raised as they are
+        session = cls(**kwargs)
+        try:
+            session.app_auth_token = state["app_auth_token"]
+            session.app_auth_token_expiry = state.get("app_auth_token_expiry")
+            session.api_url = state["api_url"]
+            session.person_id = state["person_id"]
+            session.account_id = state["account_id"]
+            for cookie in state.get("cookies", []):
+                session.session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"],
+                                            secure=cookie["secure"], expires=cookie["expires"])
+            credentials = state.get("credentials", {})
+        except Exception as e:
+            raise InvalidSessionState() from e
+
+        session.__school_name = credentials.get("school_name")
+        session.__username = credentials.get("username")
+        session.__password = credentials.get("password")
+        return session
+
     @error_handler
-    def get_schedule(self, _from: str, to: str, with_changes=False) -> list[Lesson]:
+    def get_schedule(self, _from: str, to: str, with_changes=False, force_refresh=False) -> list[Lesson]:
         '''
     Retrieves the user’s schedule within a specified date range.
 
@@ -328,6 +666,7 @@ class MagisterSession():
     - to (str): End date of the schedule period in "YYYY-MM-DD" format.
     - with_changes: Retrieves a schedule including the cancelled lessons. The cancelled lessons will be marked as cancelled. 
       You can check if the lesson is cancelled by running is_cancelled method on the returned Lesson object inside of the list
+    - force_refresh: Fetches the whole range again even if it is stored in the schedule_cache of the session
     Returns:
     - list[Lesson]: A list of dictionaries representing schedule items, each with detailed fields. 
       The schedule items are sorted chronologically from earliest to latest.
@@ -369,28 +708,71 @@ class MagisterSession():
     session.get_schedule(_from="2024-11-10", to="2024-11-11")
     ```
     '''
-        response_original_schedule = None
         if not self.app_auth_token:
-            self._logMessage("You have not logged in yet")
+            self._logMessage("You have not logged in yet", level=logging.WARNING)
             return
 
+        if self.schedule_cache is None:
+            return self.__fetch_schedule(_from=_from, to=to, with_changes=with_changes)
+
+        if force_refresh:
+            missing_ranges = [(_from, to)]
+        else:
+            missing_ranges = self.schedule_cache.get_missing_ranges(
+                self.person_id, _from=_from, to=to, with_changes=with_changes)
+        if self.metrics is not None:
+            self.metrics.record_schedule_cache(
+                "refresh" if force_refresh else "miss" if missing_ranges else "hit")
+        for missing_from, missing_to in missing_ranges:
+            lessons = self.__fetch_schedule(
+                _from=str(missing_from), to=str(missing_to), with_changes=with_changes)
+            self.schedule_cache.store(self.person_id, _from=missing_from, to=missing_to,
+                                      lessons=lessons, with_changes=with_changes)
+        return self.schedule_cache.get(self.person_id, _from=_from, to=to, with_changes=with_changes)
+
+    def __fetch_schedule(self, _from: str, to: str, with_changes: bool) -> list[Lesson]:
+        '''
+        fetches the schedule from Magister. See get_schedule
+        '''
+        response_original_schedule = None
         params = {
             "status": 1,
             "tot": to,
             "van": _from
         }
-        headers = {"authorization": self.app_auth_token}
+        # without the status parameter the cancelled lessons are included
+        params_with_cancelled = {
+            "tot": to,
+            "van": _from
+        }
+        url = f"{self.api_url}/personen/{self.person_id}/afspraken"
+
+        if with_changes and self.cancellations_from_status:
+            # the Status field tells which lessons are cancelled, so the schedule without the cancelled lessons isn't needed
+            response = AuthorizedRequestSender.send_authorized_request(
+                magister_session=self, url=url, method="GET", params=params_with_cancelled, phase="schedule")
+            if response.status_code != 200:
+                raise FetchError()
+            response_json = response.json().get("Items")
+            if response_json is None:
+                raise FetchError()
+            lessons = [self.lesson_class(lesson) for lesson in response_json]
+            for lesson in lessons:
+                lesson.cancelled = lesson.has_cancelled_status()
+            return lessons
+
+        # gets the schedule with cancelled lessons at the same time as the schedule without them
+        if with_changes:
+            future_original_schedule = _request_executor.submit(AuthorizedRequestSender.send_authorized_request,
+                                                                magister_session=self, url=url, method="GET", params=params_with_cancelled,
+                                                                phase="schedule")
 
         # gets the schedule without the cancelled lessons
-        url = f"{self.api_url}/personen/{self.person_id}/afspraken"
-        response = self.session.get(url=url, params=params, headers=headers)
+        response = AuthorizedRequestSender.send_authorized_request(
+            magister_session=self, url=url, method="GET", params=params, phase="schedule")
 
-        # gets the schedule with cancelled lessons
         if with_changes:
-            del params["status"]
-            url = f"{self.api_url}/personen/{self.person_id}/afspraken"
-            response_original_schedule = self.session.get(
-                url=url, params=params, headers=headers)
+            response_original_schedule = future_original_schedule.result()
             if response_original_schedule.status_code == 200:
                 response_original_schedule = response_original_schedule.json().get("Items")
             else:
@@ -403,11 +785,11 @@ class MagisterSession():
                 raise FetchError()
             if not response_original_schedule is None and with_changes:
                 # check for cancelled lessons by finding id's that don't exist in both responses and setting cancelled parameter to true if they are
-                response_json_ids = {Lesson(lesson).get_id()
+                response_json_ids = {lesson.get("Id")
                                      for lesson in response_json}
 
                 response_original_schedule = [
-                    Lesson(lesson) for lesson in response_original_schedule]
+                    self.lesson_class(lesson) for lesson in response_original_schedule]
                 response_original_schedule_ids = {
                     lesson.get_id() for lesson in response_original_schedule}
 
@@ -418,7 +800,7 @@ class MagisterSession():
                         lesson.cancelled = True
                 return response_original_schedule
             # return schedule without cancelled items
-            return [Lesson(lesson) for lesson in response_json]
+            return [self.lesson_class(lesson) for lesson in response_json]
         raise FetchError()
 
     @error_handler
@@ -463,25 +845,79 @@ class MagisterSession():
     ```
     '''
         if not self.app_auth_token:
-            self._logMessage("You have not logged in yet")
+            self._logMessage("You have not logged in yet", level=logging.WARNING)
             return
 
         params = {
             "top": top,
             "skip": skip
         }
-        headers = {"authorization": self.app_auth_token}
         url = f"{self.api_url}/personen/{self.person_id}/cijfers/laatste"
-        response = self.session.get(url=url, params=params, headers=headers)
+        response = AuthorizedRequestSender.send_authorized_request(
+            magister_session=self, url=url, method="GET", params=params, phase="grades")
 
         if response.status_code == 200:
 
             response_json = response.json().get("items")
             if response_json is None:
                 raise FetchError()
-            return [Grade(grade) for grade in response_json]
+            return [self.grade_class(grade) for grade in response_json]
 
         raise FetchError()
+
+    def iter_grades(self, page_size: int = 100, prefetch: int = 1) -> Iterator[Grade]:
+        '''
+    Iterates over all of the grades of the user, from the most recent to the oldest.
+
+    The grades are fetched lazily one page at a time using get_grades, while the next pages are already being
+    fetched in the background. The iteration stops at the first page that isn't full, so only the pages that
+    are needed get fetched and only a few pages are kept in memory.
+
+    Parameters:
+    - page_size (int): Number of grades fetched per request (default is 100).
+    - prefetch (int): Number of pages fetched in the background ahead of the current one (default is 1).
+
+    Returns:
+    - Iterator[Grade]: The grades, sorted from the most recent to the oldest.
+
+    Raises FetchError when a page couldn't be fetched (also when the errors are handled automatically),
+    so a failed page is never mistaken for the end of the grades.
+
+    Example Usage:
+    ```python
+    for grade in session.iter_grades(page_size=50):
+        print(grade.get_value())
+    ```
+    '''
+        pending_pages = deque()
+        next_skip = 0
+
+        def fetch_next_page():
+            nonlocal next_skip
+            pending_pages.append(_request_executor.submit(
+                self.get_grades, top=page_size, skip=next_skip))
+            next_skip += page_size
+
+        try:
+            for _ in range(prefetch + 1):
+                fetch_next_page()
+            while pending_pages:
+                page = pending_pages.popleft().result()
+                if page is None:
+                    # get_grades handled an error, stopping here would look like the end of the grades
+                    raise FetchError("\nCould not fetch a page of the grades")
+                if not page:
+                    return
+                if len(page) < page_size:
+                    # a page that isn't full is the last page
+                    yield from page
+                    return
+                fetch_next_page()
+                yield from page
+        finally:
+            for future in pending_pages:
+                future.cancel()
+
     @error_handler
     def get_person_profile(self) -> PersonProfile:
         '''
@@ -537,10 +973,11 @@ class MagisterSession():
 
         if not api_endpoint is None:
             response = AuthorizedRequestSender.send_authorized_request(magister_session=self,
-                                                                        url=f"{self.api_url}/{api_endpoint[4:]}",method="GET")
+                                                                        url=f"{self.api_url}/{api_endpoint[4:]}",method="GET",
+                                                                        phase="person_profile")
 
             if response.status_code == 200:
-                return PersonProfile(response.json())
+                return self.person_profile_class(response.json())
         raise FetchError()
 
     
@@ -567,10 +1004,11 @@ class MagisterSession():
         if not self.is_logged_in():
             raise NotLoggedInError()
         response = AuthorizedRequestSender.send_authorized_request(magister_session=self,
-                                                                   url=f"{self.api_url}/accounts/{self.account_id}",method="GET")
+                                                                   url=f"{self.api_url}/accounts/{self.account_id}",method="GET",
+                                                                   phase="account_profile")
         
         if response.status_code == 200:
-            return AccountProfile(response.json())
+            return self.account_profile_class(response.json())
         raise FetchError()
     @error_handler
     def get_photo(self) -> bytes:
@@ -584,7 +1022,17 @@ class MagisterSession():
         if photo_api_endpoint is None or len(photo_api_endpoint) <=4:
             raise FetchError()
         response = AuthorizedRequestSender.send_authorized_request(magister_session=self,
-                                                                    url=f"{self.api_url}/{photo_api_endpoint[4:]}",method="GET")
+                                                                    url=f"{self.api_url}/{photo_api_endpoint[4:]}",method="GET",
+                                                                    phase="photo")
         if response.status_code ==200:
             return response.content
         raise FetchError()
+
+
+def _get_fernet(encryption_key: bytes):
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        raise ImportError(
+            "Encrypting the session state requires cryptography. Install it using: pip install MagisterPy[encryption]")
+    return Fernet(encryption_key)
@@ -0,0 +1,395 @@
+'''
+Counters, gauges and histograms that the sessions report into, and a Prometheus text exposition of them.
+
+A session created with enable_metrics=True reports into the metrics registry it was given (by default the registry shared by
+all of the sessions in the process). Passing a metrics_registry turns the metrics on as well.
+Without them the session has no metrics and doesn't take any of their locks:
+
+    magister_calls_total{tenant, method, result}            the calls of the methods with error handling (login, input_*, get_*).
+                                                            result is ok, error or relogin. A call that relogs in is counted with
+                                                            result relogin, its rerun is counted as another call
+    magister_call_duration_seconds{tenant, method}          how long the calls that ended with ok or error took
+    magister_errors_total{tenant, method, error}            the errors caught by the error handler, by the name of their class (FetchError, ...)
+    magister_session_expirations_total{tenant}              the errors that made the session relog in (an expired token or a lost connection)
+    magister_relogins_total{tenant, result}                 the finished relogins, result is success or failure
+    magister_relogin_attempts_total{tenant, result}         the logins tried by the relogins, result is success or failure
+    magister_relogins_in_progress{tenant}                   the relogins that are running right now
+    magister_authcode_cache_total{result}                   the lookups in the authcode cache, result is hit, miss or stale
+    magister_schedule_cache_total{result}                   the get_schedule calls with a schedule cache, result is hit, miss or refresh
+
+The tenant is the host of the Magister API of the school (like school.magister.net) or, before the first login, the school name.
+
+Example:
+    server = MetricsServer(port=9100).start()  # serves default_metrics_registry on http://127.0.0.1:9100/metrics
+    session = MagisterSession(enable_metrics=True)
+'''
+import bisect
+import math
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NAME_PATTERN = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+_LABEL_PATTERN = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str, escape_quotes: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if escape_quotes else value
+
+
+def _format_labels(labels: list) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Metric():
+    '''
+    the base class of the metrics. The values are stored per combination of label values
+    '''
+    type_name = None
+
+    def __init__(self, name: str, description: str = "", label_names: tuple = ()):
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid metric name: {name}")
+        for label_name in label_names:
+            if not _LABEL_PATTERN.match(label_name) or label_name.startswith("__"):
+                raise ValueError(f"Invalid label name: {label_name}")
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}  # tuple of label values -> value
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.label_names):
+            raise ValueError(
+                f"{self.name} expects the labels {self.label_names}, got {tuple(labels)}")
+        try:
+            return tuple(str(labels[name]) for name in self.label_names)
+        except KeyError:
+            raise ValueError(
+                f"{self.name} expects the labels {self.label_names}, got {tuple(labels)}")
+
+    def _samples(self) -> list:
+        '''
+        returns (suffix, [(label name, label value), ...], value) for every value of the metric
+        '''
+        with self._lock:
+            values = list(self._values.items())
+        return [("", list(zip(self.label_names, key)), value) for key, value in values]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    '''
+    A value that only goes up, like the amount of errors
+    '''
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    '''
+    A value that goes up and down, like the amount of relogins that are running
+    '''
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    '''
+    Counts the observed values (like durations in seconds) in buckets, together with their sum and count
+
+    Parameters:
+            buckets (tuple): The upper bounds of the buckets. A +Inf bucket is always added
+    '''
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str = "", label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        if "le" in label_names:
+            raise ValueError("le is reserved for the buckets of a histogram")
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets
+                                    if not math.isinf(bucket)))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                # [counts per bucket (the last one is +Inf), sum, count]
+                values = self._values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0]
+            values[0][bucket_index] += 1
+            values[1] += value
+            values[2] += 1
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return values[2] if values else 0
+
+    def get_sum(self, **labels) -> float:
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return values[1] if values else 0.0
+
+    def _samples(self) -> list:
+        with self._lock:
+            values = [(key, list(counts), total, count)
+                      for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in values:
+            labels = list(zip(self.label_names, key))
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append(
+                    ("_bucket", labels + [("le", _format_value(upper_bound))], cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+
+class MetricsRegistry():
+    '''
+    Holds the metrics by their name. Asking for a metric that already exists returns the existing one,
+    so every session can ask for the metrics it reports into
+
+    Example:
+        registry = MetricsRegistry()
+        session = MagisterSession(metrics_registry=registry)
+        ...
+        print(registry.to_prometheus_text())
+    '''
+
+    def __init__(self):
+        self.__metrics = {}
+        self.__lock = threading.Lock()
+
+    def __get_or_create(self, metric_class, name: str, description: str, label_names: tuple, **kwargs):
+        with self.__lock:
+            metric = self.__metrics.get(name)
+            if metric is None:
+                metric = self.__metrics[name] = metric_class(
+                    name, description, tuple(label_names), **kwargs)
+            elif type(metric) is not metric_class or metric.label_names != tuple(label_names):
+                raise ValueError(
+                    f"{name} is already registered as a {metric.type_name} with the labels {metric.label_names}")
+            return metric
+
+    def counter(self, name: str, description: str = "", label_names: tuple = ()) -> Counter:
+        return self.__get_or_create(Counter, name, description, label_names)
+
+    def gauge(self, name: str, description: str = "", label_names: tuple = ()) -> Gauge:
+        return self.__get_or_create(Gauge, name, description, label_names)
+
+    def histogram(self, name: str, description: str = "", label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.__get_or_create(Histogram, name, description, label_names, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        with self.__lock:
+            return self.__metrics.get(name)
+
+    def get_metrics(self) -> list:
+        with self.__lock:
+            return list(self.__metrics.values())
+
+    def clear(self) -> None:
+        '''
+        resets the values of all of the metrics
+        '''
+        for metric in self.get_metrics():
+            metric.clear()
+
+    def to_prometheus_text(self) -> str:
+        '''
+        returns all of the metrics in the Prometheus text exposition format (version 0.0.4)
+        '''
+        lines = []
+        for metric in sorted(self.get_metrics(), key=lambda metric: metric.name):
+            if metric.description:
+                lines.append(
+                    f"# HELP {metric.name} {_escape(metric.description, escape_quotes=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for suffix, labels, value in metric._samples():
+                lines.append(
+                    f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+# the registry used by the sessions that don't get one
+default_metrics_registry = MetricsRegistry()
+
+
+class SessionMetrics():
+    '''
+    The metrics a session reports into (see the list at the top of this module)
+
+    Parameters:
+            registry (MetricsRegistry): The registry the metrics are stored in
+    '''
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.calls = registry.counter("magister_calls_total", "Calls of the session methods with error handling",
+                                      ("tenant", "method", "result"))
+        self.call_duration = registry.histogram("magister_call_duration_seconds", "Duration of the session method calls in seconds",
+                                                ("tenant", "method"))
+        self.errors = registry.counter("magister_errors_total", "Errors caught by the error handler",
+                                       ("tenant", "method", "error"))
+        self.session_expirations = registry.counter("magister_session_expirations_total", "Errors that made the session relog in",
+                                                    ("tenant",))
+        self.relogins = registry.counter("magister_relogins_total", "Finished relogins",
+                                         ("tenant", "result"))
+        self.relogin_attempts = registry.counter("magister_relogin_attempts_total", "Logins tried by the relogins",
+                                                 ("tenant", "result"))
+        self.relogins_in_progress = registry.gauge("magister_relogins_in_progress", "Relogins that are running",
+                                                   ("tenant",))
+        self.authcode_cache = registry.counter("magister_authcode_cache_total", "Lookups in the authcode cache",
+                                               ("result",))
+        self.schedule_cache = registry.counter("magister_schedule_cache_total", "get_schedule calls with a schedule cache",
+                                               ("result",))
+
+    def record_call(self, tenant: str, method: str, result: str, duration: float) -> None:
+        self.calls.inc(tenant=tenant, method=method, result=result)
+        if result != "relogin":
+            # the rerun after the relogin is observed on its own
+            self.call_duration.observe(duration, tenant=tenant, method=method)
+
+    def record_error(self, tenant: str, method: str, error: BaseException) -> None:
+        self.errors.inc(tenant=tenant, method=method,
+                        error=type(error).__name__)
+
+    def record_session_expired(self, tenant: str) -> None:
+        self.session_expirations.inc(tenant=tenant)
+
+    def relogin_started(self, tenant: str) -> None:
+        self.relogins_in_progress.inc(tenant=tenant)
+
+    def relogin_finished(self, tenant: str, success: bool) -> None:
+        self.relogins_in_progress.dec(tenant=tenant)
+        self.relogins.inc(tenant=tenant, result="success" if success else "failure")
+
+    def record_relogin_attempt(self, tenant: str, success: bool) -> None:
+        self.relogin_attempts.inc(tenant=tenant, result="success" if success else "failure")
+
+    def record_authcode_cache(self, result: str) -> None:
+        self.authcode_cache.inc(result=result)
+
+    def record_schedule_cache(self, result: str) -> None:
+        self.schedule_cache.inc(result=result)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.to_prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _MetricsHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, registry: MetricsRegistry):
+        self.registry = registry
+        super().__init__(server_address, _MetricsRequestHandler)
+
+
+class MetricsServer():
+    '''
+    Serves the metrics of a registry at /metrics in a background thread, so Prometheus can scrape them
+
+    Parameters:
+            registry (MetricsRegistry): The registry that is served. Defaults to default_metrics_registry
+
+            host (str): The address the server listens on. Use "0.0.0.0" to accept scrapes from other machines
+
+            port (int): The port the server listens on. 0 picks a free port
+    '''
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, host: str = "127.0.0.1", port: int = 0):
+        self.registry = registry if registry is not None else default_metrics_registry
+        self.__server = _MetricsHTTPServer((host, port), self.registry)
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__server.serve_forever, name="MagisterPy-metrics",
+                                             daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -1,14 +1,89 @@
 import requests
+import base64
+import json
+import threading
+import time
+import urllib3
+from html.parser import HTMLParser
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, parse_qs
-from bs4 import BeautifulSoup
 from .jsparser import *
+from .tracing import Tracer, trace_request, record_phase
+from .retry_policy import RetryPolicy
 from typing import Optional
 
 
-class LoginRequestsSender():
+class _StopParsing(Exception):
+    pass
+
+
+class _DeferredScriptFinder(HTMLParser):
+    '''
+    Finds the first <script defer="defer"> tag and stops parsing the rest of the page
+    '''
 
     def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found = False
+        self.src = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "script":
+            return
+        attrs = dict(attrs)
+        if attrs.get("defer") == "defer":
+            self.found = True
+            self.src = attrs.get("src")
+            raise _StopParsing()
+
+
+def find_deferred_script_src(html_content: str) -> Optional[str]:
+    '''
+    returns the src of the first <script defer="defer"> tag using the html.parser of the standard library
+
+    returns:
+    str -> the src
+    None -> if there is no such tag or it has no src
+    '''
+    finder = _DeferredScriptFinder()
+    try:
+        finder.feed(html_content)
+        finder.close()
+    except _StopParsing:
         pass
+    return finder.src
+
+
+def find_deferred_script_src_bs4(html_content: str) -> Optional[str]:
+    '''
+    The same as find_deferred_script_src but using BeautifulSoup, which is only imported when this is called.
+    Returns None if bs4 is not installed (pip install MagisterPy[html])
+    '''
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        return None
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Find the script tag with defer attribute
+    script_tag = soup.find('script', {'defer': 'defer'})
+
+    # Extract the src attribute
+    if script_tag and 'src' in script_tag.attrs:
+        return script_tag['src']
+    return None
+
+
+class LoginRequestsSender():
+    '''
+    Sends the requests of the login sequence.
+
+    Parameters:
+            tracer (Tracer): Optional tracer the requests are reported to (see MagisterPy.tracing)
+    '''
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.tracer = tracer
 
     def get_subdomain(self, url):
 
@@ -30,8 +105,10 @@ class LoginRequestsSender():
         headers = {
             "authorization": app_auth_token
         }
-        response = request_session.get(
-            url, headers=headers, cookies=request_session.cookies)
+        with trace_request(self.tracer, "account_id", "GET", url) as event:
+            response = request_session.get(
+                url, headers=headers, cookies=request_session.cookies)
+            event.set_response(response)
         if response.status_code == 200:
             response_link = response.json()["links"]["account"]["href"]
             account_id = response_link[response_link.rfind("/")+1:]
@@ -46,7 +123,9 @@ class LoginRequestsSender():
             "authorization": app_auth_token
         }
 
-        response = request_session.get(url=url, headers=headers)
+        with trace_request(self.tracer, "person_id", "GET", url) as event:
+            response = request_session.get(url=url, headers=headers)
+            event.set_response(response)
 
         if response.status_code == 200:
             response_link = response.json()["links"]["leerling"]["href"]
@@ -69,9 +148,30 @@ class LoginRequestsSender():
         else:
             return None
 
+    def get_token_expiry(self, auth_token: str) -> Optional[float]:
+        '''
+        returns the unix timestamp at which the access token expires or None if it can't be read from the token
+        '''
+        if not auth_token:
+            return None
+        if auth_token.startswith("Bearer "):
+            auth_token = auth_token[len("Bearer "):]
+        try:
+            # the access token is a JWT. The expiry is stored in the exp claim of the payload
+            payload = auth_token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            expiry = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        except (IndexError, ValueError, AttributeError):
+            return None
+        if isinstance(expiry, (int, float)):
+            return float(expiry)
+        return None
+
     def get_profile_auth_token(self, request_session: requests.Session) -> str:
         url = r"https://accounts.magister.net/connect/authorize?client_id=iam-profile&redirect_uri=https%3A%2F%2Faccounts.magister.net%2Fprofile%2Foidc%2Fredirect_callback.html&response_type=id_token%20token&scope=openid%20profile%20email%20magister.iam.profile&state=57dcb9c3b667407791ff32a7af41e703&nonce=ec78d557c0e44751bf573db6719445cd"
-        response = request_session.get(url, allow_redirects=False)
+        with trace_request(self.tracer, "profile_token", "GET", url) as event:
+            response = request_session.get(url, allow_redirects=False)
+            event.set_response(response)
 
         url = response.headers["Location"]
         return "Bearer " + self.extract_auth_token(url)
@@ -93,24 +193,30 @@ class LoginRequestsSender():
             "acr_values": f"tenant:{subdomain}.magister.net"
         }
 
-        response = request_session.get(
-            url, params=params, allow_redirects=False)
+        with trace_request(self.tracer, "app_token", "GET", url) as event:
+            response = request_session.get(
+                url, params=params, allow_redirects=False)
+            event.set_response(response)
         url = response.headers["Location"]
         return "Bearer " + self.extract_auth_token(url)
 
     def get_api_url(self, request_session: requests.Session, profile_auth_token) -> str:
         headers = {"authorization": profile_auth_token}
 
-        response = request_session.get(
-            "https://magister.net/.well-known/host-meta.json", headers=headers)
+        url = "https://magister.net/.well-known/host-meta.json"
+        with trace_request(self.tracer, "host_meta", "GET", url) as event:
+            response = request_session.get(url, headers=headers)
+            event.set_response(response)
 
         items = response.json()
         main_page = items["links"][0]["href"]
         return main_page
 
     def search_for_tenant_id(self, request_session: requests.Session, school_name, session_id) -> str:
-        response = request_session.get(
-            f"https://accounts.magister.net/challenges/tenant/search?sessionId={session_id}&key={school_name}")
+        url = f"https://accounts.magister.net/challenges/tenant/search?sessionId={session_id}&key={school_name}"
+        with trace_request(self.tracer, "tenant_search", "GET", url) as event:
+            response = request_session.get(url)
+            event.set_response(response)
         return response.json()[0]["id"]
 
     def set_school(self, request_session: requests.Session, school_name, main_payload) -> requests.Response:
@@ -120,22 +226,22 @@ class LoginRequestsSender():
         main_payload["tenant"] = tenant_id
 
         response = self.send_post_request(
-            request_session, main_payload, "https://accounts.magister.net/challenges/tenant")
+            request_session, main_payload, "https://accounts.magister.net/challenges/tenant", phase="tenant_challenge")
         return response
 
     def set_password(self, request_session, password, main_payload) -> requests.Response:
         main_payload["password"] = password
         main_payload["userWantsToPairSoftToken"] = False
-        return self.send_post_request(request_session, main_payload, "https://accounts.magister.net/challenges/password")
+        return self.send_post_request(request_session, main_payload, "https://accounts.magister.net/challenges/password", phase="password_challenge")
 
     def set_username(self, request_session, username, main_payload) -> requests.Response:
 
         main_payload["username"] = username
         response = self.send_post_request(
-            request_session, main_payload, "https://accounts.magister.net/challenges/username")
+            request_session, main_payload, "https://accounts.magister.net/challenges/username", phase="username_challenge")
         return response
 
-    def send_post_request(self, request_session: requests.Session, payload, url, auth_token=None) -> requests.Response:
+    def send_post_request(self, request_session: requests.Session, payload, url, auth_token=None, phase: str = "challenge") -> requests.Response:
 
         headers = {
             "accept": "application/json",
@@ -145,29 +251,175 @@ class LoginRequestsSender():
             "x-xsrf-token": request_session.cookies.get("XSRF-TOKEN")
         }
 
-        response = request_session.post(
-            url=url, json=payload, headers=headers, cookies=request_session.cookies)
+        with trace_request(self.tracer, phase, "POST", url) as event:
+            response = request_session.post(
+                url=url, json=payload, headers=headers, cookies=request_session.cookies)
+            event.set_response(response)
         return response
 
     def extract_redirect_url_from_html(self, html_content: str) -> str:
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Find the script tag with defer attribute
-        script_tag = soup.find('script', {'defer': 'defer'})
-
-        # Extract the src attribute
-        if script_tag and 'src' in script_tag.attrs:
-            script_src = script_tag['src']
-            return script_src
-        else:
-            return None
+        '''
+        returns the src of the <script defer="defer"> tag of the login page. Falls back to BeautifulSoup (if it is installed) when the fast scan finds nothing
+        '''
+        script_src = find_deferred_script_src(html_content)
+        if script_src is None:
+            script_src = find_deferred_script_src_bs4(html_content)
+        return script_src
 
     def extract_dynamic_authcode(self, js_content):
+        '''
+        extracts the authcode from the account javascript bundle. Pass the raw bytes (response.content) to skip decoding the bundle
+        '''
         return JsParser().get_authcode_from_js(js_content=js_content)
+
+    def extract_dynamic_authcode_streaming(self, response: requests.Response, chunk_size: int = 16384) -> str:
+        '''
+        extracts the authcode from a response that was sent with stream=True. The response is read in chunks
+        and closed as soon as the marker of the authcode has been received, so the rest of the bundle is never downloaded
+        '''
+        scanner = AuthcodeScanner()
+        # the parsing is spread over the chunks, so its time is added up to report it separately from the download
+        parse_seconds = 0.0
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                start = time.perf_counter()
+                scanner.feed(chunk)
+                parse_seconds += time.perf_counter() - start
+                if scanner.done:
+                    break
+            start = time.perf_counter()
+            authcode = scanner.finish()
+            parse_seconds += time.perf_counter() - start
+            return authcode
+        finally:
+            response.close()
+            record_phase(self.tracer, "authcode_parse", parse_seconds,
+                         bytes_received=scanner.bytes_received)
+
+
+class RateLimiter():
+    '''
+    A thread safe token bucket.
+
+    Parameters:
+            rate (float): How many tokens get added every second
+
+            burst (int): The maximum amount of tokens that can be stored. Defaults to one second worth of tokens
+    '''
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.__tokens = float(self.burst)
+        self.__last_update = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        '''
+        waits until a token is available and takes it
+        '''
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(
+                    self.burst, self.__tokens + (now - self.__last_update) * self.rate)
+                self.__last_update = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait_time = (1 - self.__tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class SharedHTTPAdapter(HTTPAdapter):
+    '''
+    An HTTPAdapter that is meant to be mounted on a lot of sessions at once, so that they share their connections.
+    Closing one of the sessions doesn't close the shared connections, use shutdown() for that.
+
+    Parameters:
+            requests_per_second_per_host (float): Optional limit on the amount of requests per second sent to each host (every school has its own host).
+            The logins of all of the schools go to accounts.magister.net, so they share one limit. A request that has to wait for the limit
+            sleeps in the thread that sends it
+
+            All of the other parameters are passed to HTTPAdapter
+    '''
+
+    def __init__(self, requests_per_second_per_host: Optional[float] = None, **kwargs):
+        self.requests_per_second_per_host = requests_per_second_per_host
+        self.__rate_limiters = {}
+        self.__rate_limiters_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def __get_rate_limiter(self, host: str) -> RateLimiter:
+        with self.__rate_limiters_lock:
+            rate_limiter = self.__rate_limiters.get(host)
+            if rate_limiter is None:
+                rate_limiter = RateLimiter(self.requests_per_second_per_host)
+                self.__rate_limiters[host] = rate_limiter
+            return rate_limiter
+
+    def send(self, request, **kwargs):
+        if self.requests_per_second_per_host:
+            self.__get_rate_limiter(urlparse(request.url).netloc).acquire()
+        return super().send(request, **kwargs)
+
+    def close(self):
+        # the connections are still used by the other sessions
+        pass
+
+    def shutdown(self):
+        '''
+        closes all of the shared connections
+        '''
+        super().close()
+
+
+def _reached_the_server(error: requests.exceptions.RequestException) -> bool:
+    '''
+    returns False if the request failed while connecting, so the server never got it
+    '''
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    # requests wraps the MaxRetryError of urllib3, whose reason is the error of the last atempt
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return not isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
 class AuthorizedRequestSender():
+    # status codes that are worth retrying because they are usually caused by a temporary problem on the server
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    # sending these again has the same effect as sending them once. The other methods (POST) are only retried
+    # when the connection couldn't be made, because the server might already have handled the first request
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+    # the delays between the retries are jittered, so sessions that fail at the same moment don't retry in lockstep
+    RETRY_POLICY = RetryPolicy(base_delay=0.5, max_delay=8)
+
     def __init__(self):
         ...
-    def send_authorized_request(magister_session, url:str,url_replacements:dict = None,method = "POST",params = None,extra_headers = None) -> requests.Response:
+
+    @staticmethod
+    def send_authorized_request(magister_session, url: str, url_replacements: dict = None, method="GET", params=None, extra_headers=None,
+                                json=None, data=None, stream=False, timeout=None, retries=None, phase: str = "api_request") -> requests.Response:
+        '''
+        Sends exactly one request (plus retries if they are needed) to the Magister API using the app auth token of the session.
+
+        params:
+        magister_session -> the logged in MagisterSession
+        url -> the url of the request
+        url_replacements -> a dict of substrings in the url that should be replaced (for example {"{person_id}": "123"})
+        method -> the http method
+        params -> the query parameters
+        extra_headers -> headers that are sent along with the authorization header
+        json, data -> the body of the request
+        stream -> if True the body of the response is not downloaded right away. Use response.iter_content() and close the response afterwards
+        timeout -> how many seconds to wait for the server. Defaults to the request_timeout of the session
+        retries -> how many times the request is retried on a connection error or a temporary server error. Defaults to the request_retries of the session.
+        Requests that are not idempotent (POST) are only retried if the connection couldn't be made
+        phase -> the name the request is reported to the tracer of the session with
+
+        returns:
+        requests.Response -> the response of the last atempt
+        '''
 
         if url_replacements is None:
             url_replacements = dict()
@@ -177,15 +429,35 @@ class AuthorizedRequestSender():
 
         if extra_headers is None:
             extra_headers = {}
+
+        if timeout is None:
+            timeout = getattr(magister_session, "request_timeout", None)
+
+        if retries is None:
+            retries = getattr(magister_session, "request_retries", 0)
+
         for replacement in url_replacements:
-            url = url.replace(replacement,url_replacements.get(replacement))
-        
-        headers = {"authorization": magister_session.app_auth_token} | extra_headers
-        
-        response = magister_session.session.get(url=url, params=params, headers=headers)
-        magister_session.session.request(method=method,url=url)
-        
+            url = url.replace(replacement, url_replacements.get(replacement))
 
-            
-        return response
-    
\ No newline at end of file
+        headers = {"authorization": magister_session.app_auth_token} | extra_headers
+        idempotent = method.upper() in AuthorizedRequestSender.IDEMPOTENT_METHODS
+
+        with trace_request(getattr(magister_session, "tracer", None), phase, method, url) as event:
+            atempt = 0
+            while True:
+                try:
+                    response = magister_session.session.request(method=method, url=url, params=params, headers=headers,
+                                                                json=json, data=data, stream=stream, timeout=timeout)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if atempt >= retries or (not idempotent and _reached_the_server(e)):
+                        event.set(retries=atempt)
+                        raise
+                else:
+                    if response.status_code not in AuthorizedRequestSender.RETRY_STATUS_CODES or atempt >= retries or not idempotent:
+                        event.set(retries=atempt)
+                        event.set_response(response, read_content=not stream)
+                        return response
+                    response.close()
+
+                time.sleep(AuthorizedRequestSender.RETRY_POLICY.get_delay(atempt))
+                atempt += 1
@@ -1,4 +1,83 @@
-from typing import Union
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, Optional, Union
+
+__all__ = ["parse_datetime", "parse_datetimes", "parse_grade_value", "JsonResponseItem",
+           "Lesson", "Grade", "PersonProfile", "AccountProfile"]
+
+# matches the timestamps used by Magister, for example 2024-04-02T06:00:00.0000000Z
+_datetime_pattern = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d+))?)?)?\s*(Z|[+-]\d{2}:?\d{2})?")
+
+
+@lru_cache(maxsize=8192)
+def parse_datetime(value: str) -> datetime:
+    '''
+    Parses a timestamp returned by Magister to a timezone aware datetime.
+    Timestamps without a timezone are in UTC, just like the ones that end with Z.
+    The results are memoized, so the start and end times that a lot of lessons share are only parsed once
+
+    params:
+    value -> the timestamp, for example "2024-04-02T06:00:00.0000000Z" or "2024-04-02"
+
+    returns:
+    datetime -> the timezone aware datetime
+    '''
+    match = _datetime_pattern.fullmatch(value.strip())
+    if match is None:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+
+    tzinfo = timezone.utc
+    if offset is not None and offset != "Z":
+        offset = offset.replace(":", "")
+        delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+        tzinfo = timezone(-delta if offset[0] == "-" else delta)
+
+    # Magister sends 7 digits, datetime only supports microseconds
+    microsecond = int(fraction[:6].ljust(6, "0")) if fraction else 0
+    return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                    microsecond, tzinfo=tzinfo)
+
+
+@lru_cache(maxsize=1024)
+def parse_grade_value(value: str) -> Optional[float]:
+    '''
+    Parses a grade value returned by Magister ("7,5", "8.0", "10") to a float.
+
+    params:
+    value -> the value of the grade
+
+    returns:
+    float -> the grade
+    None -> if the value is not a number (for example "V" or "G")
+    '''
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value.strip().replace(",", "."))
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_datetimes(items: Iterable) -> list:
+    '''
+    Parses the timestamps of all of the items at once (for example the lessons returned by get_schedule),
+    so the datetime getters of the items don't have to parse anything anymore.
+
+    params:
+    items -> Lessons, Grades or their compact versions
+
+    returns:
+    list -> the items
+    '''
+    items = list(items)
+    memo = {}  # every distinct timestamp of the batch is only parsed once
+    for item in items:
+        for key in item.DATETIME_KEYS:
+            item._get_datetime(key, memo)
+    return items
 
 
 class JsonResponseItem():
@@ -6,15 +85,38 @@ class JsonResponseItem():
     Base class for all of the response Items
     Makes sure that all of the dunder methods and all other methods that were not assigned are being applied to the inner json
     '''
+    # the keys of the json that contain timestamps
+    DATETIME_KEYS = ()
 
     def __init__(self, json: Union[list, dict]):
         self.json = json
+        self._datetimes = {}  # key -> (timestamp, parsed datetime)
+
+    def _get_datetime(self, key: str, memo: Optional[dict] = None) -> Optional[datetime]:
+        '''
+        returns the parsed timestamp of the key. The datetime is cached until the timestamp in the json changes
+        '''
+        value = self.json.get(key)
+        cached = self._datetimes.get(key)
+        if cached is not None and cached[0] == value:
+            return cached[1]
+        if value is None:
+            return None
+        if memo is None:
+            parsed = parse_datetime(value)
+        else:
+            parsed = memo.get(value)
+            if parsed is None:
+                parsed = memo[value] = parse_datetime(value)
+        self._datetimes[key] = (value, parsed)
+        return parsed
     # Apply all other methods to the original json
 
     def __getattr__(self, name):
-        def wrapper(*args, **kwargs):
-            return getattr(self.json, name)(*args, **kwargs)
-        return wrapper
+        if name == "json":
+            # json is not set yet (for example while unpickling)
+            raise AttributeError(name)
+        return getattr(self.json, name)
 
     def __getitem__(self, key):
         return self.json[key]
@@ -42,6 +144,9 @@ class Lesson(JsonResponseItem):
     '''
     A helper object that helps you interact with the retrieved lessons from the schedule.
     '''
+    # values of the Status field of cancelled lessons (4: cancelled manually, 5: cancelled automatically)
+    CANCELLED_STATUSES = {4, 5}
+    DATETIME_KEYS = ("Start", "Einde")
 
     def __init__(self, json: dict, cancelled=False):
         '''
@@ -84,6 +189,25 @@ class Lesson(JsonResponseItem):
         '''
         return self.cancelled
 
+    def has_cancelled_status(self) -> bool:
+        '''
+        Checks if the Status field of the lesson says that it is cancelled.
+
+        Returns:
+            bool: True if the lesson has a cancelled status, False otherwise.
+        '''
+        return self.json.get("Status") in self.CANCELLED_STATUSES
+
+    def get_status(self) -> Union[None, int]:
+        '''
+        Retrieves the Status field of the lesson.
+
+        Returns:
+            int: The status if available.
+            None: If the status is missing.
+        '''
+        return self.json.get("Status")
+
     def get_id(self) -> Union[None, int]:
         '''
         Retrieves the unique lesson ID.
@@ -124,6 +248,26 @@ class Lesson(JsonResponseItem):
         '''
         return self.json.get("Einde")
 
+    def get_start_datetime(self) -> Union[None, datetime]:
+        '''
+        Retrieves the lesson's start time as a timezone aware datetime. It is only parsed once.
+
+        Returns:
+            datetime: The start time if available.
+            None: If the start time is missing.
+        '''
+        return self._get_datetime("Start")
+
+    def get_end_datetime(self) -> Union[None, datetime]:
+        '''
+        Retrieves the lesson's end time as a timezone aware datetime. It is only parsed once.
+
+        Returns:
+            datetime: The end time if available.
+            None: If the end time is missing.
+        '''
+        return self._get_datetime("Einde")
+
     def get_teacher_names(self) -> Union[None, list[dict]]:
         '''
         Retrieves the list of teachers associated with the lesson.
@@ -179,6 +323,7 @@ class Grade(JsonResponseItem):
     '''
     A helper object that helps you interact with retrieved grade data.
     '''
+    DATETIME_KEYS = ("ingevoerdOp",)
 
     def __init__(self, json: Union[list, dict]):
         '''
@@ -227,6 +372,19 @@ class Grade(JsonResponseItem):
         '''
         return self.json.get("waarde")
 
+    def get_numeric_value(self) -> Union[None, float]:
+        '''
+        Retrieves the grade value as a number ("7,5" -> 7.5).
+
+        Returns:
+            float: The grade as a number.
+            None: If the value is missing or not a number (for example "V").
+        '''
+        value = self.json.get("waarde")
+        if value is None:
+            return None
+        return parse_grade_value(value)
+
     def get_lesson_code(self) -> Union[None, str]:
         '''
         Retrieves the subject code associated with the grade.
@@ -267,6 +425,16 @@ class Grade(JsonResponseItem):
         '''
         return self.json.get("ingevoerdOp")
 
+    def get_entered_datetime(self) -> Union[None, datetime]:
+        '''
+        Retrieves the time when the grade was entered as a timezone aware datetime. It is only parsed once.
+
+        Returns:
+            datetime: The time the grade was recorded.
+            None: If the timestamp is missing.
+        '''
+        return self._get_datetime("ingevoerdOp")
+
     def get_weighting_factor(self) -> Union[None, int]:
         '''
         Retrieves the weighting factor of the grade.
@@ -276,6 +444,24 @@ class Grade(JsonResponseItem):
             None: If the weighting factor is missing.
         '''
         return self.json.get("weegfactor")
+
+    def is_counted(self) -> bool:
+        '''
+        Checks if the grade counts towards the average (teltMee). Grades without the field count.
+
+        Returns:
+            bool: True if the grade counts, False otherwise.
+        '''
+        return self.json.get("teltMee") is not False
+
+    def has_exemption(self) -> bool:
+        '''
+        Checks if the student is exempt from the grade (heeftVrijstelling).
+
+        Returns:
+            bool: True if the student is exempt, False otherwise.
+        '''
+        return bool(self.json.get("heeftVrijstelling"))
     
 class PersonProfile(JsonResponseItem):
     def __init__(self, json: dict):
@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from typing import Optional
+
+
+class CircuitBreaker():
+    '''
+    Stops sending logins to a host that keeps failing.
+
+    After failure_threshold failures in a row the circuit opens and all of the atempts fail right away.
+    After reset_timeout seconds one trial atempt is let through (half open). If it succeeds the circuit closes again,
+    if it fails the circuit stays open for another reset_timeout seconds.
+
+    Parameters:
+            failure_threshold (int): How many failures in a row open the circuit
+
+            reset_timeout (float): How many seconds the circuit stays open before a trial atempt is allowed
+    '''
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial_running = False
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.__lock:
+            return self.__get_state()
+
+    def __get_state(self) -> str:
+        if self.__opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.__opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        '''
+        returns True if an atempt can be made
+        '''
+        with self.__lock:
+            state = self.__get_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.__trial_running:
+                self.__trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.__failures = 0
+            self.__opened_at = None
+            self.__trial_running = False
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            if self.__trial_running or self.__failures >= self.failure_threshold:
+                self.__opened_at = time.monotonic()
+            self.__trial_running = False
+
+    def release(self) -> None:
+        '''
+        ends the atempt without counting it as a success or a failure (for example when it failed because of the credentials),
+        so the next atempt can be the trial atempt
+        '''
+        with self.__lock:
+            self.__trial_running = False
+
+
+class CircuitBreakerRegistry():
+    '''
+    Keeps one CircuitBreaker per host. All of the sessions of the same school share the breaker of that school
+
+    Parameters:
+            failure_threshold (int): Passed to every CircuitBreaker
+
+            reset_timeout (float): Passed to every CircuitBreaker
+    '''
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__circuit_breakers = {}
+        self.__lock = threading.Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self.__lock:
+            circuit_breaker = self.__circuit_breakers.get(host)
+            if circuit_breaker is None:
+                circuit_breaker = CircuitBreaker(
+                    failure_threshold=self.failure_threshold, reset_timeout=self.reset_timeout)
+                self.__circuit_breakers[host] = circuit_breaker
+            return circuit_breaker
+
+
+# shared by all of the retry policies that don't get their own registry
+default_circuit_breakers = CircuitBreakerRegistry()
+
+
+class RetryPolicy():
+    '''
+    Decides how long a session waits between relogin atempts and whether it should try at all.
+
+    The delays grow exponentially and use full jitter (a random delay between 0 and the exponential delay),
+    so sessions that fail at the same moment don't retry in lockstep.
+
+    Parameters:
+            base_delay (float): The maximum delay in seconds before the first retry
+
+            max_delay (float): The upper limit of the delay in seconds
+
+            multiplier (float): How much the maximum delay grows after every atempt
+
+            jitter (bool): If set to False the delays are exactly exponential
+
+            circuit_breakers (CircuitBreakerRegistry): The circuit breakers per host. Defaults to a registry that is shared by the whole process
+    '''
+
+    def __init__(self, base_delay: float = 2, max_delay: float = 60, multiplier: float = 2, jitter: bool = True,
+                 circuit_breakers: Optional[CircuitBreakerRegistry] = None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.circuit_breakers = circuit_breakers if circuit_breakers is not None else default_circuit_breakers
+
+    def get_delay(self, atempt: int) -> float:
+        '''
+        returns how many seconds to wait after the atempt (starting at 0) failed
+        '''
+        delay = min(self.max_delay, self.base_delay *
+                    self.multiplier ** atempt)
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def get_circuit_breaker(self, host: str) -> CircuitBreaker:
+        return self.circuit_breakers.get(host)
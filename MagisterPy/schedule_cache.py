@@ -0,0 +1,168 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Hashable, Iterable, Optional, Union
+from .response_items import Lesson
+
+
+def _to_date(value: Union[str, date]) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
+
+
+def _local_date(value: datetime) -> date:
+    '''
+    returns the local date of a timestamp of Magister. The timestamps are in UTC, so a lesson early in the morning
+    can have the UTC date of the day before
+    '''
+    return value.astimezone().date()
+
+
+def _days(_from: date, to: date) -> Iterable[date]:
+    for offset in range((to - _from).days + 1):
+        yield _from + timedelta(days=offset)
+
+
+class _CachedSchedule():
+    '''
+    The cached lessons of one person. Every fetched day remembers when it was fetched,
+    every lesson is stored once by its Id and indexed by the days it takes place on.
+    '''
+
+    def __init__(self):
+        self.fetched_at = {}  # day -> time the day was fetched
+        self.lessons = {}  # lesson id -> Lesson
+        self.lesson_days = {}  # lesson id -> set of days the lesson is indexed under
+        self.day_index = {}  # day -> set of lesson ids
+
+    def clear_day(self, day: date) -> None:
+        for lesson_id in self.day_index.pop(day, ()):
+            days = self.lesson_days[lesson_id]
+            days.discard(day)
+            if not days:
+                del self.lesson_days[lesson_id]
+                del self.lessons[lesson_id]
+
+
+class ScheduleCache():
+    '''
+    Caches the lessons returned by MagisterSession.get_schedule per person and remembers which days it holds.
+    A request for days that are already cached is served from memory, only the missing days get fetched.
+    The lessons are indexed by their local date. The expired days are removed whenever new lessons are stored.
+
+    Parameters:
+            ttl (float): How many seconds a fetched day stays valid. None keeps the days until they are invalidated
+
+    Example:
+        session = MagisterSession(schedule_cache=ScheduleCache(ttl=600))
+    '''
+
+    def __init__(self, ttl: Optional[float] = 300):
+        self.ttl = ttl
+        self.__schedules = {}  # (person_id, with_changes) -> _CachedSchedule
+        self.__lock = threading.Lock()
+
+    def __get_schedule(self, person_id: Hashable, with_changes: bool) -> _CachedSchedule:
+        key = (person_id, with_changes)
+        schedule = self.__schedules.get(key)
+        if schedule is None:
+            schedule = _CachedSchedule()
+            self.__schedules[key] = schedule
+        return schedule
+
+    def __is_fresh(self, fetched_at: Optional[float], now: float) -> bool:
+        return fetched_at is not None and (self.ttl is None or now - fetched_at < self.ttl)
+
+    def __evict_expired(self, key: tuple, now: float) -> None:
+        '''
+        removes the expired days of the schedule, so the days that are never requested again don't stay in memory
+        '''
+        schedule = self.__schedules.get(key)
+        if self.ttl is None or schedule is None:
+            return
+        expired_days = [day for day, fetched_at in schedule.fetched_at.items()
+                        if not self.__is_fresh(fetched_at, now)]
+        for day in expired_days:
+            schedule.clear_day(day)
+            del schedule.fetched_at[day]
+        if not schedule.fetched_at:
+            del self.__schedules[key]
+
+    def get_missing_ranges(self, person_id: Hashable, _from: Union[str, date], to: Union[str, date], with_changes: bool = False) -> list[tuple[date, date]]:
+        '''
+        returns the (from, to) date ranges (both inclusive) that are not cached or have expired
+        '''
+        _from, to = _to_date(_from), _to_date(to)
+        now = time.time()
+        missing_ranges = []
+        with self.__lock:
+            schedule = self.__schedules.get((person_id, with_changes))
+            fetched_at = schedule.fetched_at if schedule is not None else {}
+            range_start = None
+            for day in _days(_from, to):
+                if not self.__is_fresh(fetched_at.get(day), now):
+                    if range_start is None:
+                        range_start = day
+                elif range_start is not None:
+                    missing_ranges.append((range_start, day - timedelta(days=1)))
+                    range_start = None
+        if range_start is not None:
+            missing_ranges.append((range_start, to))
+        return missing_ranges
+
+    def store(self, person_id: Hashable, _from: Union[str, date], to: Union[str, date], lessons: Iterable[Lesson], with_changes: bool = False) -> None:
+        '''
+        stores the lessons fetched for the date range. The lessons that were cached for the range before are replaced
+        and the expired days of all of the people are removed
+        '''
+        _from, to = _to_date(_from), _to_date(to)
+        now = time.time()
+        with self.__lock:
+            for key in list(self.__schedules):
+                self.__evict_expired(key, now)
+            schedule = self.__get_schedule(person_id, with_changes)
+            for day in _days(_from, to):
+                schedule.clear_day(day)
+                schedule.fetched_at[day] = now
+
+            for lesson in lessons:
+                lesson_id = lesson.get_id()
+                start, end = lesson.get_start_datetime(), lesson.get_end_datetime()
+                first_day = max(_local_date(start), _from) if start else _from
+                if end is not None and start is not None and end > start:
+                    # a lesson that ends at midnight doesn't take place on the next day
+                    end -= timedelta(microseconds=1)
+                last_day = min(_local_date(end), to) if end else first_day
+                schedule.lessons[lesson_id] = lesson
+                days = schedule.lesson_days.setdefault(lesson_id, set())
+                for day in _days(first_day, max(first_day, last_day)):
+                    days.add(day)
+                    schedule.day_index.setdefault(day, set()).add(lesson_id)
+
+    def get(self, person_id: Hashable, _from: Union[str, date], to: Union[str, date], with_changes: bool = False) -> list[Lesson]:
+        '''
+        returns the cached lessons of the date range sorted by their start time
+        '''
+        _from, to = _to_date(_from), _to_date(to)
+        with self.__lock:
+            schedule = self.__schedules.get((person_id, with_changes))
+            if schedule is None:
+                return []
+            lesson_ids = set()
+            for day in _days(_from, to):
+                lesson_ids.update(schedule.day_index.get(day, ()))
+            lessons = [schedule.lessons[lesson_id] for lesson_id in lesson_ids]
+        lessons.sort(key=lambda lesson: lesson.get_start_time() or "")
+        return lessons
+
+    def invalidate(self, person_id: Optional[Hashable] = None) -> None:
+        '''
+        removes the cached schedule of the person or of everyone if person_id is None
+        '''
+        with self.__lock:
+            if person_id is None:
+                self.__schedules = {}
+                return
+            for with_changes in (False, True):
+                self.__schedules.pop((person_id, with_changes), None)
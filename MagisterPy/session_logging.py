@@ -0,0 +1,179 @@
+'''
+Logging of the sessions.
+
+The sessions log through the logging module, under the "MagisterPy.session" logger. Every record gets the context of the session it came from:
+
+    tenant          the host of the Magister API of the school or, before the first login, the school name (the same as in the metrics)
+    account_id      the account id of the session, None before the login
+    correlation_id  the X-Correlation-ID of the login (x_correlation_id), None before the login
+
+The messages are only formatted when a handler emits them, so disabled log levels cost next to nothing.
+
+Example:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(tenant)s %(account_id)s %(correlation_id)s %(message)s"))
+    logging.getLogger("MagisterPy").addHandler(handler)
+    logging.getLogger("MagisterPy").setLevel(logging.INFO)
+
+A session created with enable_logging=True also prints its messages to the standard output, like it used to.
+QueueLogging moves the handlers onto a background thread, so a slow handler never makes a request thread wait.
+'''
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+package_logger = logging.getLogger("MagisterPy")
+# without any logging configuration the records are dropped instead of going to the last resort handler
+package_logger.addHandler(logging.NullHandler())
+session_logger = logging.getLogger("MagisterPy.session")
+
+
+class _StdoutHandler(logging.StreamHandler):
+    '''
+    prints the messages of the sessions with enable_logging. sys.stdout is looked up on every message, so redirecting it still works
+    '''
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.stream = sys.stdout
+        super().emit(record)
+
+
+_stdout_handler = _StdoutHandler()
+
+
+def get_session_context(session) -> dict:
+    '''
+    returns the fields that are added to the log records of the session
+    '''
+    try:
+        tenant = session._get_tenant()
+    except AttributeError:
+        # the __init__ of the session didn't finish (this is logged from __del__)
+        tenant = "unknown"
+    return {"tenant": tenant, "account_id": getattr(session, "account_id", None),
+            "correlation_id": getattr(session, "x_correlation_id", None)}
+
+
+def log_session_message(session, level: int, msg: str, args: tuple, exc_info=None) -> None:
+    '''
+    logs the message with the context of the session. Nothing is done (or formatted) if neither the logger
+    nor the enable_logging of the session wants the message
+    '''
+    enabled = session_logger.isEnabledFor(level)
+    echo = getattr(session, "recieve_log", False)
+    if not enabled and not echo:
+        return
+    context = get_session_context(session)
+    if enabled:
+        # stacklevel 3 is the method that called _logMessage
+        session_logger.log(level, msg, *args, exc_info=exc_info,
+                           extra=context, stacklevel=3)
+    if echo:
+        _stdout_handler.handle(session_logger.makeRecord(
+            session_logger.name, level, "(unknown file)", 0, msg, args, exc_info, extra=context))
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    '''
+    Puts the records on a queue without waiting. The records are not formatted here but by the handlers
+    on the other side of the queue, so the arguments of the messages shouldn't be changed after logging them.
+    If the queue is full the record is dropped and counted in dropped
+    '''
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class QueueLogging():
+    '''
+    Hands the log records to the handlers from a background thread. Logging only puts the record on a queue,
+    so the request threads never wait for a slow handler (like a file or the standard output)
+
+    While it runs the records aren't passed on to the parent loggers, the handlers get all of them.
+
+    Parameters:
+            handlers (logging.Handler): The handlers the records are sent to. Defaults to the handlers the logger has when it is started,
+            which are moved onto the background thread, or to the handlers of the root logger if it has none
+
+            logger (logging.Logger): The logger whose records go through the queue. Defaults to the "MagisterPy" logger
+
+            max_queue_size (int): How many records can wait in the queue. When it is full new records are dropped. 0 doesn't limit the queue
+
+    Example:
+        with QueueLogging(logging.FileHandler("magister.log")):
+            ...
+    '''
+
+    def __init__(self, *handlers: logging.Handler, logger: Optional[logging.Logger] = None, max_queue_size: int = 0):
+        self.handlers = handlers
+        self.logger = logger if logger is not None else package_logger
+        self.max_queue_size = max_queue_size
+        self.queue_handler = None
+        self.__listener = None
+        self.__moved_handlers = []
+        self.__propagate = None
+
+    @property
+    def dropped(self) -> int:
+        '''
+        how many records were dropped because the queue was full
+        '''
+        return self.queue_handler.dropped if self.queue_handler is not None else 0
+
+    def start(self) -> "QueueLogging":
+        if self.__listener is not None:
+            return self
+        handlers = self.handlers
+        if not handlers:
+            self.__moved_handlers = [handler for handler in self.logger.handlers
+                                     if not isinstance(handler, logging.NullHandler)]
+            for handler in self.__moved_handlers:
+                self.logger.removeHandler(handler)
+            # without handlers of its own the logger used the handlers of the root logger (like the ones of logging.basicConfig)
+            handlers = self.__moved_handlers or logging.getLogger().handlers[:]
+
+        record_queue = queue.Queue(self.max_queue_size)
+        self.queue_handler = NonBlockingQueueHandler(record_queue)
+        self.__listener = logging.handlers.QueueListener(
+            record_queue, *handlers, respect_handler_level=True)
+        self.__listener.start()
+        self.__propagate = self.logger.propagate
+        self.logger.propagate = False
+        self.logger.addHandler(self.queue_handler)
+        return self
+
+    def stop(self) -> None:
+        '''
+        stops the background thread after it has handled the records that are still in the queue
+        '''
+        if self.__listener is None:
+            return
+        self.logger.removeHandler(self.queue_handler)
+        self.logger.propagate = self.__propagate
+        self.__listener.stop()
+        self.__listener = None
+        for handler in self.__moved_handlers:
+            self.logger.addHandler(handler)
+        self.__moved_handlers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,185 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Hashable, Iterable, Iterator, NamedTuple, Optional, Union
+from .magister_session import MagisterSession
+from .request_manager import SharedHTTPAdapter
+from .token_refresher import TokenRefresher
+
+
+class PoolResult(NamedTuple):
+    '''
+    The result of a call made through MagisterSessionPool
+
+    key: the key of the session the call was made with
+    value: the value returned by the call (None if the call raised an error)
+    error: the error raised by the call (None if the call succeeded)
+    '''
+    key: Hashable
+    value: object
+    error: Optional[BaseException]
+
+
+class MagisterSessionPool():
+    '''
+    Holds a lot of logged in sessions and runs calls on them concurrently.
+    All of the sessions share one connection pool, so the connections to the Magister hosts get reused between the accounts.
+
+    Parameters:
+            max_concurrency (int): How many calls can run at the same time
+
+            requests_per_second_per_tenant (float): Optional limit on the amount of requests per second sent to each school.
+            The limit is kept per host, so the logins of all of the accounts share the limit of accounts.magister.net.
+            A call that waits for the limit keeps its worker busy, so it counts towards max_concurrency while it waits
+
+            refresh_tokens (bool): If set to True the sessions are relogged in by a TokenRefresher shortly before their token expires
+
+            **session_kwargs: Passed to every MagisterSession created by the pool (for example automatically_handle_errors)
+
+    Example:
+        with MagisterSessionPool(max_concurrency=32, requests_per_second_per_tenant=20) as pool:
+            for result in pool.login_all(accounts):
+                ...
+            for result in pool.map("get_grades", top=25):
+                print(result.key, result.value)
+    '''
+
+    def __init__(self, max_concurrency: int = 16, requests_per_second_per_tenant: Optional[float] = None, refresh_tokens: bool = False, **session_kwargs):
+        self.max_concurrency = max_concurrency
+        self.session_kwargs = session_kwargs
+        self.http_adapter = SharedHTTPAdapter(requests_per_second_per_host=requests_per_second_per_tenant,
+                                              pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.sessions = {}
+        self.__sessions_lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.token_refresher = None
+        if refresh_tokens:
+            self.token_refresher = TokenRefresher()
+            self.token_refresher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, key):
+        return key in self.sessions
+
+    def __getitem__(self, key) -> MagisterSession:
+        return self.sessions[key]
+
+    def create_session(self, key: Hashable) -> MagisterSession:
+        '''
+        creates a session that uses the shared connections of the pool and stores it under the key
+        '''
+        session = MagisterSession(
+            http_adapter=self.http_adapter, **self.session_kwargs)
+        with self.__sessions_lock:
+            self.sessions[key] = session
+        return session
+
+    def remove_session(self, key: Hashable) -> None:
+        '''
+        removes the session with the key from the pool and closes it
+        '''
+        with self.__sessions_lock:
+            session = self.sessions.pop(key, None)
+        if session is not None:
+            if self.token_refresher is not None:
+                self.token_refresher.unregister(session)
+            session.clear()
+
+    def login_all(self, accounts: Iterable[tuple]) -> Iterator[PoolResult]:
+        '''
+        logs in all of the accounts concurrently
+
+        params:
+        accounts -> an iterable of (key, school_name, username, password) tuples
+
+        returns:
+        An iterator of PoolResults in the order the logins finish. The value is the result of MagisterSession.login
+        '''
+        def login(account):
+            key, school_name, username, password = account
+            session = self.sessions.get(key) or self.create_session(key)
+            logged_in = session.login(
+                school_name=school_name, username=username, password=password)
+            if logged_in and self.token_refresher is not None:
+                self.token_refresher.register(session)
+            return logged_in
+
+        return self.__run(((account[0], account) for account in accounts), login)
+
+    def map(self, method: Union[str, Callable], *args, keys: Optional[Iterable[Hashable]] = None, **kwargs) -> Iterator[PoolResult]:
+        '''
+        calls a method on the sessions concurrently
+
+        params:
+        method -> the name of a MagisterSession method (for example "get_grades") or a function that gets the session as its first argument
+        *args, **kwargs -> passed to the method
+        keys -> the keys of the sessions to call the method on. Defaults to all of the sessions
+
+        returns:
+        An iterator of PoolResults in the order the calls finish
+
+        Example:
+            for result in pool.map("get_grades", top=25):
+                print(result.key, result.value)
+        '''
+        with self.__sessions_lock:
+            if keys is None:
+                keys = list(self.sessions)
+            # the keys are checked before any call is made, instead of failing halfway through the results
+            missing_keys = [key for key in keys if key not in self.sessions]
+            if missing_keys:
+                raise KeyError(f"No sessions with the keys: {missing_keys}")
+            items = [(key, self.sessions[key]) for key in keys]
+
+        def call(session):
+            if isinstance(method, str):
+                return getattr(session, method)(*args, **kwargs)
+            return method(session, *args, **kwargs)
+
+        return self.__run(items, call)
+
+    def __run(self, items: Iterable[tuple], func: Callable) -> Iterator[PoolResult]:
+        '''
+        runs func on all of the items while keeping at most max_concurrency calls in flight and yields the results as they finish
+        '''
+        items = iter(items)
+        in_flight = {}
+
+        def submit_next() -> bool:
+            for key, item in items:
+                in_flight[self.__executor.submit(func, item)] = key
+                return True
+            return False
+
+        # a few extra calls get queued so the workers never have to wait for the consumer
+        while len(in_flight) < self.max_concurrency * 2 and submit_next():
+            pass
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = in_flight.pop(future)
+                submit_next()
+                error = future.exception()
+                yield PoolResult(key=key, value=None if error else future.result(), error=error)
+
+    def close(self) -> None:
+        '''
+        closes all of the sessions and the shared connections
+        '''
+        self.__executor.shutdown(wait=True)
+        if self.token_refresher is not None:
+            self.token_refresher.stop()
+        with self.__sessions_lock:
+            sessions = list(self.sessions.values())
+            self.sessions = {}
+        for session in sessions:
+            session.clear()
+        self.http_adapter.shutdown()
@@ -0,0 +1,750 @@
+'''
+A local stand-in for Magister, so the client can be tested, benchmarked and load tested without real credentials.
+
+MagisterSimulator answers the requests of the whole login flow (the accounts.magister.net redirects, the account-*.js bundle,
+the challenges, connect/authorize and host-meta.json) and of the API endpoints used by the sessions. It can be reached in two ways:
+
+    SimulatorAdapter: answers the requests inside of the process, without any sockets
+    SimulatorServer + SimulatorServerAdapter: a real http server on localhost, the adapter sends the https requests of the session to it
+
+Example:
+    simulator = MagisterSimulator(latency=0.01)
+    session = MagisterSession(http_adapter=SimulatorAdapter(simulator))
+    session.login("Simulated School", "student1", "password")
+'''
+import base64
+import datetime
+import http.client
+import io
+import json
+import random
+import re
+import secrets
+import ssl
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Mapping, NamedTuple, Optional, Union
+from urllib.parse import parse_qs, quote, urlencode, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPHeaderDict, HTTPResponse
+
+ACCOUNTS_HOST = "accounts.magister.net"
+HOST_META_HOST = "magister.net"
+
+SUBJECTS = (("ne", "Nederlands"), ("en", "Engels"), ("wi", "Wiskunde"), ("na", "Natuurkunde"),
+            ("gs", "Geschiedenis"), ("ak", "Aardrijkskunde"), ("bi", "Biologie"), ("lo", "Lichamelijke opvoeding"))
+
+# a 1x1 png, returned by the photo endpoint
+PHOTO = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==")
+
+# the longest schedule range that can be requested at once
+MAX_SCHEDULE_DAYS = 366
+
+_REASONS = {200: "OK", 302: "Found", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+            404: "Not Found", 405: "Method Not Allowed", 429: "Too Many Requests", 500: "Internal Server Error",
+            502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class SimulatedResponse(NamedTuple):
+    '''
+    A response of MagisterSimulator
+
+    status: the http status code
+    headers: list of (name, value) tuples. Set-Cookie can appear more than once
+    body: the body of the response
+    '''
+    status: int
+    headers: list
+    body: bytes
+
+    @property
+    def reason(self) -> str:
+        return _REASONS.get(self.status, "Unknown")
+
+
+class _Account(NamedTuple):
+    school_name: str
+    tenant_id: str
+    subdomain: str
+    username: str
+    password: str
+    account_id: int
+    person_id: int
+
+
+def _json_response(value, status: int = 200, headers: Optional[list] = None) -> SimulatedResponse:
+    return SimulatedResponse(status, [("Content-Type", "application/json; charset=utf-8")] + (headers or []),
+                             json.dumps(value).encode())
+
+
+def _redirect(location: str, headers: Optional[list] = None) -> SimulatedResponse:
+    return SimulatedResponse(302, [("Location", location)] + (headers or []), b"")
+
+
+def _error(status: int, message: str) -> SimulatedResponse:
+    return _json_response({"error": message}, status=status)
+
+
+def _base64url(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode()
+
+
+def _magister_time(value: datetime.datetime) -> str:
+    # Magister sends the times in UTC with 7 fractional digits
+    return value.strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+
+class MagisterSimulator():
+    '''
+    Simulates the Magister accounts server and the API of the schools. It is thread safe.
+
+    Parameters:
+            schools (dict): school name -> {username: password}. Defaults to "Simulated School" with the accounts student1 ... student10,
+            which all have the password "password"
+
+            latency (float): How many seconds every request takes
+
+            latency_jitter (float): A random amount of seconds between 0 and latency_jitter that is added to the latency of every request
+
+            token_lifetime (float): How many seconds the access tokens are valid. Expired tokens get a 401 response
+
+            error_rate (float): The chance (0-1) that a request fails with error_status
+
+            error_status (int): The status code of the injected errors
+
+            lessons_per_day (int): How many lessons every student has on a weekday
+
+            cancel_rate (float): The chance (0-1) that a lesson is cancelled
+
+            grades_per_student (int): How many grades every student has
+
+            bundle_size (int): The size in bytes of the account javascript bundle (the real one is about 240 KB)
+
+            seed (int): Seed for the generated data, the authcode and the injected errors, so the runs can be reproduced
+    '''
+
+    def __init__(self, schools: Optional[Mapping[str, Mapping[str, str]]] = None, latency: float = 0.0, latency_jitter: float = 0.0,
+                 token_lifetime: float = 3600, error_rate: float = 0.0, error_status: int = 503, lessons_per_day: int = 8,
+                 cancel_rate: float = 0.1, grades_per_student: int = 60, bundle_size: int = 240_000, seed: int = 0):
+        if schools is None:
+            schools = {"Simulated School": {
+                f"student{index}": "password" for index in range(1, 11)}}
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.token_lifetime = token_lifetime
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.lessons_per_day = lessons_per_day
+        self.cancel_rate = cancel_rate
+        self.grades_per_student = grades_per_student
+        self.bundle_size = bundle_size
+        self.seed = seed
+
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__accounts = {}  # (tenant_id, username) -> _Account
+        self.__tenants = {}  # tenant_id -> (school name, subdomain)
+        for school_name, users in schools.items():
+            subdomain = re.sub(r"[^a-z0-9]", "", school_name.lower()) or "school"
+            tenant_id = f"{zlib.crc32(school_name.encode()):08x}-simulated-tenant"
+            self.__tenants[tenant_id] = (school_name, subdomain)
+            for username, password in users.items():
+                index = len(self.__accounts)
+                self.__accounts[(tenant_id, username)] = _Account(school_name, tenant_id, subdomain, username, password,
+                                                                  account_id=1000 + index, person_id=5000 + index)
+        self.__login_sessions = {}  # sessionId -> state of the login
+        # both are kept in the order they expire, so the expired entries can be removed from the front
+        self.__identities = {}  # value of the idsrv cookie -> (_Account, expiry)
+        self.__tokens = {}  # access token -> (client_id, _Account, expiry)
+        self.__grades = {}  # person_id -> generated grades
+        self.__forced_errors = []  # status codes of the next requests
+        self.request_counts = Counter()
+        self.rotate_authcode()
+
+    # ---- controlling the simulator ----
+
+    def get_accounts(self) -> list[tuple]:
+        '''
+        returns a list of (school_name, username, password) tuples of all of the accounts
+        '''
+        return [(account.school_name, account.username, account.password) for account in self.__accounts.values()]
+
+    def rotate_authcode(self) -> str:
+        '''
+        generates a new authcode and account bundle (Magister does this every few days). Returns the new authcode
+        '''
+        with self.__lock:
+            parts = [f"{self.__random.getrandbits(32):08x}"[:self.__random.randint(4, 8)]
+                     for _ in range(4)]
+            indexes = self.__random.sample(range(4), 2)
+            self.authcode = "".join(parts[index] for index in indexes)
+            self.bundle_name = f"account-{self.__random.getrandbits(80):020x}.js"
+            self.__bundle = self.__build_bundle(parts, indexes)
+        return self.authcode
+
+    def expire_tokens(self) -> None:
+        '''
+        makes all of the access tokens that were handed out invalid, like they expired
+        '''
+        with self.__lock:
+            self.__tokens.clear()
+
+    def inject_errors(self, count: int = 1, status: Optional[int] = None) -> None:
+        '''
+        makes the next count requests fail with the status code (defaults to error_status)
+        '''
+        with self.__lock:
+            self.__forced_errors.extend(
+                [status or self.error_status] * count)
+
+    def reset_request_counts(self) -> None:
+        with self.__lock:
+            self.request_counts.clear()
+
+    # ---- handling the requests ----
+
+    def handle(self, method: str, url: str, headers: Optional[Mapping[str, str]] = None, body: Union[bytes, str, None] = None) -> SimulatedResponse:
+        '''
+        answers one request
+
+        params:
+        method -> the http method
+        url -> the full url of the request (for example https://accounts.magister.net/challenges/tenant)
+        headers -> the headers of the request
+        body -> the body of the request
+
+        returns:
+        SimulatedResponse
+        '''
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        if isinstance(body, str):
+            body = body.encode()
+        url = urlsplit(url)
+        host = (url.hostname or "").lower()
+        # the sessions sometimes build urls with double slashes
+        path = re.sub(r"/+", "/", url.path) or "/"
+        query = {name: values[0]
+                 for name, values in parse_qs(url.query).items()}
+
+        delay = self.latency
+        with self.__lock:
+            if self.latency_jitter:
+                delay += self.__random.uniform(0, self.latency_jitter)
+            if self.__forced_errors:
+                error_status = self.__forced_errors.pop(0)
+            elif self.error_rate and self.__random.random() < self.error_rate:
+                error_status = self.error_status
+            else:
+                error_status = None
+        if delay > 0:
+            time.sleep(delay)
+
+        endpoint = self.__get_endpoint_name(host, path)
+        with self.__lock:
+            self.request_counts[endpoint] += 1
+        if error_status is not None:
+            return _error(error_status, "Injected error")
+
+        cookies = SimpleCookie()
+        cookies.load(headers.get("cookie", ""))
+        cookies = {name: morsel.value for name, morsel in cookies.items()}
+        try:
+            if host == ACCOUNTS_HOST:
+                return self.__handle_accounts(method, path, query, headers, cookies, body)
+            if host == HOST_META_HOST and path == "/.well-known/host-meta.json":
+                return self.__handle_host_meta(headers)
+            if host.endswith(".magister.net") and (path == "/api" or path.startswith("/api/")):
+                return self.__handle_api(method, host, path[len("/api"):], query, headers)
+        except (ValueError, KeyError, TypeError) as e:
+            return _error(400, f"Bad request: {e!r}")
+        return _error(404, "Not found")
+
+    def __get_endpoint_name(self, host: str, path: str) -> str:
+        '''
+        groups the paths that only differ in their ids, used for request_counts
+        '''
+        if host == ACCOUNTS_HOST and path.startswith("/js/"):
+            return "/js/account.js"
+        if host != ACCOUNTS_HOST and host != HOST_META_HOST:
+            return re.sub(r"/\d+", "/{id}", path)
+        return path
+
+    def __handle_accounts(self, method: str, path: str, query: dict, headers: dict, cookies: dict, body: Optional[bytes]) -> SimulatedResponse:
+        if method == "GET":
+            if path == "/":
+                return _redirect("/account/login")
+            if path == "/connect/authorize":
+                return self.__authorize(query, cookies)
+            if path == "/account/login":
+                return self.__login_page(query)
+            if path == "/js/" + self.bundle_name:
+                return SimulatedResponse(200, [("Content-Type", "application/javascript")], self.__bundle)
+            if path == "/challenges/tenant/search":
+                return self.__search_tenant(query)
+        elif method == "POST" and path.startswith("/challenges/"):
+            return self.__challenge(path[len("/challenges/"):], headers, cookies, json.loads(body or b"{}"))
+        return _error(404, "Not found")
+
+    def __authorize(self, query: dict, cookies: dict) -> SimulatedResponse:
+        with self.__lock:
+            identity = self.__identities.get(cookies.get("idsrv"))
+        account = identity[0] if identity is not None and identity[1] > time.time() else None
+        if account is None:
+            # not logged in yet, the login page returns to this request after the challenges
+            correlation_id = secrets.token_hex(16)
+            return_url = "/connect/authorize/callback?" + \
+                urlencode(query) + f"&X-Correlation-ID={correlation_id}"
+            return _redirect(f"https://{ACCOUNTS_HOST}/account/login?returnUrl={quote(return_url, safe='')}")
+
+        client_id = query["client_id"]
+        if client_id != "iam-profile" and client_id != f"M6-{account.subdomain}.magister.net":
+            return _error(400, "unauthorized_client")
+        access_token = self.__create_token(client_id, account)
+        fragment = urlencode({"id_token": self.__create_token("id", account), "access_token": access_token,
+                              "token_type": "Bearer", "expires_in": int(self.token_lifetime),
+                              "scope": query.get("scope", ""), "state": query.get("state", "")})
+        return _redirect(f"{query['redirect_uri']}#{fragment}")
+
+    def __login_page(self, query: dict) -> SimulatedResponse:
+        session_id = query.get("sessionId")
+        if session_id is None:
+            # starts a new login session and redirects to the page with its id
+            session_id = secrets.token_hex(16)
+            xsrf_token = secrets.token_urlsafe(24)
+            with self.__lock:
+                self.__login_sessions[session_id] = {
+                    "xsrf": xsrf_token, "return_url": query.get("returnUrl"), "tenant": None, "account": None}
+            location = f"account/login?sessionId={session_id}&returnUrl={quote(query.get('returnUrl', ''), safe='')}"
+            return _redirect(location, [("Set-Cookie", f"XSRF-TOKEN={xsrf_token}; path=/; secure; samesite=strict")])
+
+        with self.__lock:
+            known_session = session_id in self.__login_sessions
+        if not known_session:
+            return _error(400, "Unknown sessionId")
+        page = ("<!doctype html><html lang=\"nl\"><head><meta charset=\"utf-8\"><title>Magister</title>"
+                "<link href=\"css/account.css\" rel=\"stylesheet\"></head><body>"
+                "<noscript>Schakel javascript in</noscript><div id=\"root\"></div>"
+                f"<script defer=\"defer\" src=\"js/{self.bundle_name}\"></script></body></html>")
+        return SimulatedResponse(200, [("Content-Type", "text/html; charset=utf-8")], page.encode())
+
+    def __search_tenant(self, query: dict) -> SimulatedResponse:
+        with self.__lock:
+            if query.get("sessionId") not in self.__login_sessions:
+                return _error(400, "Unknown sessionId")
+        key = query.get("key", "").lower()
+        if len(key) < 3:
+            return _json_response([])
+        return _json_response([{"id": tenant_id, "displayName": school_name}
+                               for tenant_id, (school_name, _) in self.__tenants.items() if key in school_name.lower()])
+
+    def __challenge(self, challenge: str, headers: dict, cookies: dict, payload: dict) -> SimulatedResponse:
+        with self.__lock:
+            login_session = self.__login_sessions.get(payload.get("sessionId"))
+            if login_session is None:
+                return _error(400, "InvalidSession")
+            if headers.get("x-xsrf-token") != login_session["xsrf"] or cookies.get("XSRF-TOKEN") != login_session["xsrf"]:
+                return _error(400, "InvalidXsrfToken")
+            if payload.get("authCode") != self.authcode:
+                return _error(400, "InvalidAuthCode")
+
+            if challenge == "tenant":
+                if payload.get("tenant") not in self.__tenants:
+                    return _error(400, "TenantNotFound")
+                login_session["tenant"] = payload["tenant"]
+                return _json_response({"action": "username", "error": None})
+
+            if challenge == "username":
+                account = self.__accounts.get(
+                    (login_session["tenant"], payload.get("username")))
+                if account is None:
+                    return _error(400, "UsernameNotFound")
+                login_session["account"] = account
+                return _json_response({"action": "password", "error": None})
+
+            if challenge == "password":
+                account = login_session["account"]
+                if account is None or payload.get("password") != account.password:
+                    return _error(400, "InvalidUsernameOrPassword")
+                identity = secrets.token_urlsafe(24)
+                # the login is remembered as long as the tokens it hands out are valid
+                self.__prune_expired(self.__identities)
+                self.__identities[identity] = (
+                    account, time.time() + self.token_lifetime)
+                del self.__login_sessions[payload["sessionId"]]
+                return _json_response({"action": None, "redirectURL": login_session["return_url"], "error": None},
+                                      headers=[("Set-Cookie", f"idsrv={identity}; path=/; secure; httponly")])
+        return _error(404, "Not found")
+
+    def __create_token(self, client_id: str, account: _Account) -> str:
+        '''
+        creates an access token shaped like a JWT, so the sessions can read when it expires
+        '''
+        expiry = time.time() + self.token_lifetime
+        header = _base64url(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+        payload = _base64url(json.dumps({"iss": f"https://{ACCOUNTS_HOST}", "client_id": client_id, "sub": str(account.account_id),
+                                         "exp": int(expiry), "jti": secrets.token_hex(8)}).encode())
+        token = f"{header}.{payload}.{_base64url(secrets.token_bytes(16))}"
+        with self.__lock:
+            self.__prune_expired(self.__tokens)
+            self.__tokens[token] = (client_id, account, expiry)
+        return token
+
+    @staticmethod
+    def __prune_expired(entries: dict) -> None:
+        '''
+        removes the expired entries (the expiry is the last value) from the front of entries, until it reaches one that is still valid.
+        Call it while holding the lock
+        '''
+        now = time.time()
+        while entries:
+            key = next(iter(entries))
+            if entries[key][-1] > now:
+                break
+            del entries[key]
+
+    def __get_token(self, headers: dict) -> Optional[tuple]:
+        '''
+        returns the (client_id, account) of the valid bearer token in the headers or None
+        '''
+        authorization = headers.get("authorization") or ""
+        if not authorization.startswith("Bearer "):
+            return None
+        with self.__lock:
+            token = self.__tokens.get(authorization[len("Bearer "):])
+        if token is None or token[2] <= time.time():
+            return None
+        return token[:2]
+
+    def __handle_host_meta(self, headers: dict) -> SimulatedResponse:
+        token = self.__get_token(headers)
+        if token is None:
+            return _error(401, "Unauthorized")
+        _, account = token
+        return _json_response({"links": [{"rel": "magister-api", "href": f"https://{account.subdomain}.magister.net/api"}]})
+
+    def __handle_api(self, method: str, host: str, path: str, query: dict, headers: dict) -> SimulatedResponse:
+        token = self.__get_token(headers)
+        if token is None:
+            return _error(401, "Unauthorized")
+        client_id, account = token
+        if client_id != f"M6-{account.subdomain}.magister.net" or host != f"{account.subdomain}.magister.net":
+            return _error(403, "Forbidden")
+        if method != "GET":
+            return _error(405, "Method not allowed")
+
+        if path == "/sessions/current":
+            return _json_response({"isVerified": True, "links": {"self": {"href": "/api/sessions/current"},
+                                                                 "account": {"href": f"/api/accounts/{account.account_id}"}}})
+        match = re.fullmatch(r"/accounts/(\d+)", path)
+        if match:
+            if int(match.group(1)) != account.account_id:
+                return _error(403, "Forbidden")
+            return _json_response(self.__account_profile(account))
+
+        match = re.fullmatch(r"/(leerlingen|personen)/(\d+)(/.*)?", path)
+        if match is None:
+            return _error(404, "Not found")
+        if int(match.group(2)) != account.person_id:
+            return _error(403, "Forbidden")
+        resource = match.group(3) or ""
+        if resource == "":
+            return _json_response(self.__person_profile(account))
+        if resource == "/foto":
+            return SimulatedResponse(200, [("Content-Type", "image/png")], PHOTO)
+        if resource == "/afspraken":
+            return self.__schedule(account, query)
+        if resource == "/cijfers/laatste":
+            top, skip = int(query.get("top", 25)), int(query.get("skip", 0))
+            return _json_response({"items": self.__get_grades(account)[skip:skip + top]})
+        return _error(404, "Not found")
+
+    # ---- generated data ----
+
+    def __build_bundle(self, parts: list, indexes: list) -> bytes:
+        '''
+        builds a javascript bundle that hides the authcode the same way the real account-*.js does
+        '''
+        head = b"/*! For license information please see account.js.LICENSE.txt */\n(()=>{var t={5338:(t,e,n)=>{"
+        filler = b"function(t){var e=0;return function(){return e<t.length?{done:!1,value:t[e++]}:{done:!0}}};"
+        authcode = ("t.prototype.post=function(t,e){var o,n=this,r=da(da({},this.session.getSessionData()),e);return r[ua[0]]=(o="
+                    + json.dumps(parts, separators=(",", ":")) + ","
+                    + json.dumps([str(index) for index in indexes], separators=(",", ":"))[:-1]
+                    + "].map((function(t){return o[parseInt(t)||0]})).join(\"\")),this.http.post(t,r)};").encode()
+        tail = b"}}})();"
+        # like in the real bundle the authcode is about 80% of the way in
+        filler_size = max(0, self.bundle_size - len(head) - len(authcode) - len(tail))
+        before = int(filler_size * 0.8)
+        return (head + (filler * (before // len(filler) + 1))[:before] + authcode
+                + (filler * ((filler_size - before) // len(filler) + 1))[:filler_size - before] + tail)
+
+    def __account_profile(self, account: _Account) -> dict:
+        return {"id": account.account_id, "naam": account.username, "emailadres": f"{account.username}@{account.subdomain}.nl",
+                "mobielTelefoonnummer": None, "softtokenStatus": "NietGekoppeld", "isEmailadresGeverifieerd": True,
+                "moetEmailadresVerifieren": False, "uuId": f"{account.account_id:08d}-0000-0000-0000-000000000000",
+                "links": {"self": {"href": f"/api/accounts/{account.account_id}"},
+                          "leerling": {"href": f"/api/leerlingen/{account.person_id}"}}}
+
+    def __person_profile(self, account: _Account) -> dict:
+        person_link = f"/api/leerlingen/{account.person_id}"
+        return {"id": account.person_id, "externeId": f"{account.person_id:08d}-simulated", "accountExterneId": f"{account.account_id:08d}-simulated",
+                "voorletters": account.username[0].upper() + ".", "roepnaam": account.username.capitalize(), "tussenvoegsel": None,
+                "achternaam": "Simulator", "stamnummer": account.person_id, "rollenVanGebruiker": ["Leerling"],
+                "links": {"self": {"href": person_link}, "foto": {"href": f"{person_link}/foto"},
+                          "afspraken": {"href": f"/api/personen/{account.person_id}/afspraken"}}}
+
+    def __is_cancelled(self, account: _Account, lesson_id: int) -> bool:
+        # deterministic, so both schedule requests of get_schedule(with_changes=True) agree
+        return zlib.crc32(f"{self.seed}-{account.person_id}-{lesson_id}".encode()) % 10000 < self.cancel_rate * 10000
+
+    def __schedule(self, account: _Account, query: dict) -> SimulatedResponse:
+        start = datetime.date.fromisoformat(query["van"])
+        end = datetime.date.fromisoformat(query["tot"])
+        if (end - start).days > MAX_SCHEDULE_DAYS:
+            return _error(400, "The range is too long")
+        without_cancelled = query.get("status") == "1"
+        lessons = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                for hour in range(self.lessons_per_day):
+                    lesson_id = day.toordinal() * 100 + hour
+                    cancelled = self.__is_cancelled(account, lesson_id)
+                    if not (cancelled and without_cancelled):
+                        lessons.append(self.__lesson(
+                            day, hour, lesson_id, cancelled))
+            day += datetime.timedelta(days=1)
+        return _json_response({"Items": lessons, "TotalCount": len(lessons), "Links": []})
+
+    def __lesson(self, day: datetime.date, hour: int, lesson_id: int, cancelled: bool) -> dict:
+        code, subject = SUBJECTS[(day.toordinal() + hour) % len(SUBJECTS)]
+        start = datetime.datetime.combine(day, datetime.time(7, 30)) + datetime.timedelta(minutes=50 * hour)
+        location = f"{100 + (lesson_id % 30)}"
+        return {"Id": lesson_id, "Start": _magister_time(start), "Einde": _magister_time(start + datetime.timedelta(minutes=50)),
+                "LesuurVan": hour + 1, "LesuurTotMet": hour + 1, "DuurtHeleDag": False,
+                "Omschrijving": f"{code} - {code.upper()}{hour % 3 + 1} - {location}", "Lokatie": location,
+                "Status": 5 if cancelled else 1, "Type": 13, "Subtype": 1, "IsOnlineDeelname": False, "WeergaveType": 1,
+                "Inhoud": None, "Opmerking": None, "InfoType": 0, "Aantekening": None, "Afgerond": False,
+                "HerhaalStatus": 0, "Herhaling": None, "Vakken": [{"Id": SUBJECTS.index((code, subject)), "Naam": subject}],
+                "Docenten": [{"Id": 300 + hour, "Naam": f"Docent {code.upper()}", "Docentcode": code.upper()}],
+                "Lokalen": [{"Naam": location}], "Groepen": None, "OpdrachtId": 0, "HeeftBijlagen": False, "Bijlagen": None}
+
+    def __get_grades(self, account: _Account) -> list:
+        with self.__lock:
+            grades = self.__grades.get(account.person_id)
+            if grades is None:
+                grades = self.__generate_grades(account)
+                self.__grades[account.person_id] = grades
+            return grades
+
+    def __generate_grades(self, account: _Account) -> list:
+        generator = random.Random(f"{self.seed}-{account.person_id}")
+        first_day = datetime.datetime(2024, 9, 2, 12, 0)
+        grades = []
+        for index in range(self.grades_per_student):
+            code, subject = SUBJECTS[generator.randrange(len(SUBJECTS))]
+            if index % 17 == 16:
+                # some grades are not numeric and don't count
+                value, counts = "V", False
+            else:
+                value, counts = f"{generator.randint(30, 100) / 10:.1f}".replace(".", ","), True
+            entered = first_day + datetime.timedelta(days=index * 2, minutes=generator.randrange(600))
+            grades.append({"kolomId": account.person_id * 1000 + index, "omschrijving": f"Toets {index + 1}",
+                           "ingevoerdOp": _magister_time(entered), "vak": {"code": code, "omschrijving": subject},
+                           "waarde": value, "weegfactor": generator.choice((1, 1, 2, 3)),
+                           "isVoldoende": value == "V" or float(value.replace(",", ".")) >= 5.5, "teltMee": counts,
+                           "moetInhalen": False, "heeftVrijstelling": False, "behaaldOp": None, "links": {}})
+        # the most recent grade first
+        grades.reverse()
+        return grades
+
+
+class _SimulatedOriginalResponse():
+    '''
+    the part of http.client.HTTPResponse requests uses to read the cookies of a response
+    '''
+
+    def __init__(self, headers: list):
+        self.msg = http.client.HTTPMessage()
+        for name, value in headers:
+            self.msg[name] = value
+
+    def isclosed(self) -> bool:
+        return True
+
+
+class SimulatorAdapter(HTTPAdapter):
+    '''
+    Answers the requests of a session using a MagisterSimulator inside of the process, no sockets are used.
+    Pass it as the http_adapter of a MagisterSession.
+
+    Parameters:
+            simulator (MagisterSimulator): The simulator that answers the requests
+    '''
+
+    def __init__(self, simulator: MagisterSimulator, **kwargs):
+        self.simulator = simulator
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        response = self.simulator.handle(
+            request.method, request.url, request.headers, request.body)
+        headers = HTTPHeaderDict()
+        for name, value in response.headers:
+            headers.add(name, value)
+        headers.setdefault("Content-Length", str(len(response.body)))
+        raw = HTTPResponse(body=io.BytesIO(response.body), headers=headers, status=response.status, reason=response.reason,
+                           preload_content=False, decode_content=False, request_method=request.method, request_url=request.url,
+                           original_response=_SimulatedOriginalResponse(response.headers))
+        return self.build_response(request, raw)
+
+
+class _SimulatorRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def __handle(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        # the adapter keeps the original host in the Host header
+        response = self.server.simulator.handle(
+            self.command, f"https://{self.headers.get('Host', ACCOUNTS_HOST)}{self.path}", dict(self.headers), body)
+        self.send_response(response.status, response.reason)
+        for name, value in response.headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = __handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SimulatorHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, simulator: MagisterSimulator):
+        self.simulator = simulator
+        super().__init__(server_address, _SimulatorRequestHandler)
+
+    def handle_error(self, request, client_address):
+        # the clients close their keep-alive connections whenever they want
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class SimulatorServer():
+    '''
+    Serves a MagisterSimulator over http on localhost in a background thread.
+    Use SimulatorServerAdapter to send the requests of a session to it.
+
+    Parameters:
+            simulator (MagisterSimulator): The simulator that answers the requests
+
+            host (str): The address the server listens on
+
+            port (int): The port the server listens on. 0 picks a free port
+
+            ssl_context (ssl.SSLContext): If provided the server speaks https. Clients that connect to it directly
+            (like AsyncMagisterSession with a resolver that points the Magister hosts at the server) need it
+
+    Example:
+        with SimulatorServer(MagisterSimulator()) as server:
+            session = MagisterSession(http_adapter=SimulatorServerAdapter(server.url))
+    '''
+
+    def __init__(self, simulator: MagisterSimulator, host: str = "127.0.0.1", port: int = 0, ssl_context: Optional[ssl.SSLContext] = None):
+        self.simulator = simulator
+        self.__server = _SimulatorHTTPServer((host, port), simulator)
+        self.__scheme = "http"
+        if ssl_context is not None:
+            self.__server.socket = ssl_context.wrap_socket(self.__server.socket, server_side=True)
+            self.__scheme = "https"
+        self.__thread = None
+
+    @property
+    def port(self) -> int:
+        return self.__server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"{self.__scheme}://{host}:{port}"
+
+    def start(self) -> "SimulatorServer":
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__server.serve_forever, name="MagisterPy-simulator",
+                                             daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class SimulatorServerAdapter(HTTPAdapter):
+    '''
+    Sends the https requests of a session to a SimulatorServer instead of to Magister. The cookies are still stored for the
+    original hosts, so the session behaves the same as with the real servers.
+
+    Parameters:
+            server_url (str): The url of the SimulatorServer (SimulatorServer.url)
+
+            All of the other parameters are passed to HTTPAdapter
+    '''
+
+    def __init__(self, server_url: str, **kwargs):
+        self.server_url = server_url.rstrip("/")
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        simulator_request = request.copy()
+        simulator_request.url = self.server_url + (url.path or "/") + (f"?{url.query}" if url.query else "")
+        simulator_request.headers["Host"] = url.netloc
+        response = super().send(simulator_request, **kwargs)
+        response.url = request.url
+        response.request = request
+        return response
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Serves a MagisterSimulator on localhost. Send the requests of a session to it with SimulatorServerAdapter")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-lifetime", type=float, default=3600)
+    args = parser.parse_args()
+
+    simulator = MagisterSimulator(latency=args.latency, error_rate=args.error_rate,
+                                  token_lifetime=args.token_lifetime)
+    server = SimulatorServer(simulator, port=args.port).start()
+    print(f"Serving the simulator on {server.url}")
+    for school_name, username, password in simulator.get_accounts():
+        print(f"    {school_name!r} {username!r} {password!r}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
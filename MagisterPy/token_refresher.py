@@ -0,0 +1,178 @@
+import heapq
+import logging
+import itertools
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from .magister_errors import NotLoggedInError
+
+
+class TokenRefresher():
+    '''
+    Relogs sessions in shortly before their app auth token expires, so that the requests of the user never
+    have to wait for a failed call and a relogin.
+
+    The refreshes are spread randomly over a window before the expiry, so a lot of sessions that logged in
+    at the same time don't all relogin in the same second.
+
+    Parameters:
+            refresh_before (float): How many seconds before the token expires the refresh window ends
+
+            spread (float): How many seconds the refresh window lasts. Every session gets a random moment inside of the window
+
+            retry_delay (float): How many seconds to wait before trying again when a refresh fails
+
+            max_workers (int): How many sessions can be refreshed at the same time
+
+            fallback_token_lifetime (float): Used when the expiry can't be read from the token. None doesn't refresh those sessions at all
+
+    Example:
+        with TokenRefresher() as refresher:
+            refresher.register(session)
+            ...
+    '''
+
+    def __init__(self, refresh_before: float = 300, spread: float = 240, retry_delay: float = 30, max_workers: int = 4,
+                 fallback_token_lifetime: Optional[float] = None):
+        self.refresh_before = refresh_before
+        self.spread = spread
+        self.retry_delay = retry_delay
+        self.max_workers = max_workers
+        self.fallback_token_lifetime = fallback_token_lifetime
+
+        self.__queue = []  # heap of (refresh_at, sequence_number, session id)
+        self.__sessions = {}  # session id -> (weakref to the session, refresh_at)
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__executor = None
+        self.__running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __len__(self):
+        return len(self.__sessions)
+
+    def get_refresh_time(self, session) -> Optional[float]:
+        '''
+        returns the unix timestamp at which the session should be refreshed or None if the expiry of its token is unknown
+        '''
+        expiry = session.app_auth_token_expiry
+        if expiry is None:
+            if self.fallback_token_lifetime is None:
+                return None
+            expiry = time.time() + self.fallback_token_lifetime
+
+        now = time.time()
+        refresh_at = expiry - self.refresh_before - \
+            random.uniform(0, self.spread)
+        if refresh_at < now:
+            # the window has already started, the session still gets a random moment so the refreshes don't pile up
+            refresh_at = now + random.uniform(0, min(self.spread, max(expiry - now, 0)))
+        return refresh_at
+
+    def register(self, session) -> bool:
+        '''
+        schedules the refresh of a logged in session
+
+        returns:
+        True -> if the session got scheduled
+        False -> if the expiry of the token is unknown
+        '''
+        refresh_at = self.get_refresh_time(session)
+        if refresh_at is None:
+            return False
+        self.__schedule(session, refresh_at)
+        return True
+
+    def unregister(self, session) -> None:
+        '''
+        stops refreshing the session
+        '''
+        with self.__condition:
+            self.__sessions.pop(id(session), None)
+
+    def __schedule(self, session, refresh_at: float) -> None:
+        with self.__condition:
+            # scheduling a session again replaces its previous refresh time
+            self.__sessions[id(session)] = (weakref.ref(session), refresh_at)
+            heapq.heappush(self.__queue, (refresh_at,
+                           next(self.__sequence), id(session)))
+            self.__condition.notify()
+
+    def start(self) -> None:
+        '''
+        starts the background thread
+        '''
+        with self.__condition:
+            if self.__running:
+                return
+            self.__running = True
+        self.__executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.__thread = threading.Thread(
+            target=self.__run, name="MagisterPy-TokenRefresher", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        '''
+        stops the background thread and waits for the running refreshes to finish
+        '''
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while self.__running and (not self.__queue or self.__queue[0][0] > time.time()):
+                    timeout = self.__queue[0][0] - \
+                        time.time() if self.__queue else None
+                    self.__condition.wait(timeout)
+                if not self.__running:
+                    return
+                refresh_at, _, session_id = heapq.heappop(self.__queue)
+                session_reference, scheduled_refresh_at = self.__sessions.get(
+                    session_id, (None, None))
+                if scheduled_refresh_at != refresh_at:
+                    # the session was unregistered or scheduled again
+                    continue
+                session = session_reference()
+                if session is None:
+                    # the session was garbage collected
+                    del self.__sessions[session_id]
+                    continue
+            self.__executor.submit(self.__refresh, session)
+
+    def __refresh(self, session) -> None:
+        try:
+            refreshed = session.relogin()
+        except (Exception, NotLoggedInError) as e:
+            # NotLoggedInError isn't an Exception, without catching it the refreshes of the session would stop
+            session._logMessage("Could not refresh the token: %r", e, level=logging.WARNING)
+            refreshed = False
+
+        with self.__condition:
+            if id(session) not in self.__sessions:
+                return
+        if refreshed:
+            refresh_at = self.get_refresh_time(session)
+            if refresh_at is None:
+                self.unregister(session)
+                return
+        else:
+            refresh_at = time.time() + self.retry_delay
+        self.__schedule(session, refresh_at)
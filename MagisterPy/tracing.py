@@ -0,0 +1,286 @@
+'''
+Hooks for timing the requests a session sends.
+
+Pass a Tracer as the tracer of a session and it gets called at the start and the end of every request, with the phase of the
+login (or the fetch) the request belongs to:
+
+    login                   the whole login() call
+    login_start             GET accounts.magister.net
+    authorize_redirect      GET connect/authorize, which redirects to the login page
+    login_redirect          GET the login page, which redirects to the page with the sessionId
+    login_page              GET the login page with the sessionId
+    bundle_download         GET the account javascript bundle (only the part before the authcode)
+    authcode_parse          finding the authcode in the downloaded chunks (no request)
+    tenant_search           GET challenges/tenant/search
+    tenant_challenge        POST challenges/tenant
+    username_challenge      POST challenges/username
+    password_challenge      POST challenges/password
+    profile_token           GET connect/authorize for the profile token
+    host_meta               GET host-meta.json for the api url
+    app_token               GET connect/authorize for the app token
+    account_id              GET sessions/current
+    person_id               GET accounts/{account_id}
+    schedule, grades, account_profile, person_profile, photo    the API requests of the fetch methods
+
+Without a tracer (the default) every hook is skipped.
+'''
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+
+class TraceEvent():
+    '''
+    One traced request (or phase without a request, like authcode_parse)
+
+    phase: the phase of the login or fetch the request belongs to
+    method, url: the http method and url of the request (None for phases without a request)
+    start_time, end_time: unix timestamps in nanoseconds
+    duration: how many seconds the request took, measured with a monotonic clock
+    status_code: the status code of the response
+    bytes_sent, bytes_received: the size of the request and response bodies (None if unknown)
+    retries: how many times the request was retried
+    error: the error that was raised during the request
+    attributes: any other information about the request
+    '''
+    __slots__ = ("phase", "method", "url", "start_time", "end_time", "duration", "status_code",
+                 "bytes_sent", "bytes_received", "retries", "error", "attributes", "_start")
+
+    def __init__(self, phase: str, method: Optional[str] = None, url: Optional[str] = None):
+        self.phase = phase
+        self.method = method
+        self.url = url
+        self.start_time = None
+        self.end_time = None
+        self.duration = None
+        self.status_code = None
+        self.bytes_sent = None
+        self.bytes_received = None
+        self.retries = 0
+        self.error = None
+        self.attributes = {}
+        self._start = None
+
+    def set(self, **fields) -> None:
+        '''
+        sets the fields of the event. Names that aren't fields are stored in attributes
+        '''
+        for name, value in fields.items():
+            if name in self.__slots__ and not name.startswith("_"):
+                setattr(self, name, value)
+            else:
+                self.attributes[name] = value
+
+    def set_response(self, response, read_content: bool = True) -> None:
+        '''
+        takes the status code and sizes from a requests.Response (or AsyncResponse).
+        Set read_content to False for streamed responses, so their body isn't downloaded
+        '''
+        self.status_code = response.status_code
+        if read_content:
+            self.bytes_received = len(response.content)
+        body = getattr(getattr(response, "request", None), "body", None)
+        if body is not None:
+            self.bytes_sent = len(body)
+
+    def _begin(self) -> None:
+        self.start_time = time.time_ns()
+        self._start = time.perf_counter()
+
+    def _end(self, error: Optional[BaseException] = None) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.end_time = self.start_time + int(self.duration * 1e9)
+        if error is not None:
+            self.error = error
+
+    def __repr__(self):
+        return f"<TraceEvent {self.phase} {self.status_code} {self.duration}>"
+
+
+class Tracer():
+    '''
+    Base class of the tracers. Override the hooks you need, they do nothing by default.
+    The hooks are called from the thread (or asyncio task) that sends the request, so they have to be thread safe
+    '''
+
+    def on_request_start(self, event: TraceEvent) -> None:
+        pass
+
+    def on_request_end(self, event: TraceEvent) -> None:
+        pass
+
+
+class _Trace():
+    '''
+    the context manager returned by trace_request when there is a tracer
+    '''
+    __slots__ = ("tracer", "event")
+
+    def __init__(self, tracer: Tracer, event: TraceEvent):
+        self.tracer = tracer
+        self.event = event
+
+    def __enter__(self) -> TraceEvent:
+        self.event._begin()
+        self.tracer.on_request_start(self.event)
+        return self.event
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.event._end(exc_value)
+        self.tracer.on_request_end(self.event)
+        return False
+
+
+class _NoopTrace():
+    '''
+    returned by trace_request when there is no tracer. It is its own event and ignores everything
+    '''
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **fields) -> None:
+        pass
+
+    def set_response(self, response, read_content: bool = True) -> None:
+        pass
+
+
+_NOOP_TRACE = _NoopTrace()
+
+
+def trace_request(tracer: Optional[Tracer], phase: str, method: Optional[str] = None, url: Optional[str] = None):
+    '''
+    returns a context manager that reports the request to the tracer. It returns the TraceEvent of the request,
+    use its set and set_response methods to add the results. Without a tracer nothing is done
+
+    Example:
+        with trace_request(self.tracer, "login_page", "GET", url) as event:
+            response = self.session.get(url)
+            event.set_response(response)
+    '''
+    if tracer is None:
+        return _NOOP_TRACE
+    return _Trace(tracer, TraceEvent(phase, method, url))
+
+
+def record_phase(tracer: Optional[Tracer], phase: str, duration: float, **fields) -> None:
+    '''
+    reports a phase that doesn't have one continuous start and end (like authcode_parse, which is spread over the chunks of the bundle)
+    as if it ended now
+    '''
+    if tracer is None:
+        return
+    event = TraceEvent(phase)
+    event.end_time = time.time_ns()
+    event.start_time = event.end_time - int(duration * 1e9)
+    event.duration = duration
+    event.set(**fields)
+    tracer.on_request_start(event)
+    tracer.on_request_end(event)
+
+
+class RecordingTracer(Tracer):
+    '''
+    Keeps all of the finished events in memory. Useful for finding out which phase of the login is slow
+
+    Parameters:
+            max_events (int): How many of the most recent events are kept. None keeps all of them
+
+    Example:
+        tracer = RecordingTracer()
+        session = MagisterSession(tracer=tracer)
+        session.login(...)
+        print(tracer.get_phase_durations())
+    '''
+
+    def __init__(self, max_events: Optional[int] = 10000):
+        self.max_events = max_events
+        self.events = []
+        self.__lock = threading.Lock()
+
+    def on_request_end(self, event: TraceEvent) -> None:
+        with self.__lock:
+            self.events.append(event)
+            if self.max_events is not None and len(self.events) > self.max_events:
+                del self.events[:len(self.events) - self.max_events]
+
+    def get_events(self, phase: Optional[str] = None) -> list[TraceEvent]:
+        '''
+        returns the finished events, optionally only the ones of one phase
+        '''
+        with self.__lock:
+            return [event for event in self.events if phase is None or event.phase == phase]
+
+    def get_phase_durations(self) -> dict[str, float]:
+        '''
+        returns the total amount of seconds spent in every phase, in the order the phases were first seen
+        '''
+        durations = {}
+        for event in self.get_events():
+            durations[event.phase] = durations.get(event.phase, 0.0) + event.duration
+        return durations
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.events.clear()
+
+
+def strip_url(url: Optional[str]) -> Optional[str]:
+    '''
+    returns the url without its query string, fragment and credentials. The query of the login urls holds the sessionId
+    and the fragment of the redirects the tokens, so they must not end up in the exported spans
+    '''
+    if url is None:
+        return None
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if parts.port is not None:
+        host = f"{host}:{parts.port}"
+    return urlunsplit((parts.scheme, host, parts.path, "", ""))
+
+
+class OpenTelemetryTracer(Tracer):
+    '''
+    Exports every event as an OpenTelemetry span named magister.{phase}, using the http semantic conventions for the attributes.
+    The url.full attribute only holds the scheme, host and path of the url (see strip_url).
+    Requires opentelemetry-api (pip install MagisterPy[tracing]) and a configured TracerProvider to send the spans anywhere
+
+    Parameters:
+            tracer (opentelemetry.trace.Tracer): The tracer the spans are created with. Defaults to the tracer of the global TracerProvider
+    '''
+
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError(
+                "OpenTelemetryTracer requires opentelemetry-api. Install it using: pip install MagisterPy[tracing]")
+        self.__trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("MagisterPy")
+
+    def on_request_end(self, event: TraceEvent) -> None:
+        attributes = {"magister.phase": event.phase, "magister.retries": event.retries}
+        for name, value in (("http.request.method", event.method), ("url.full", strip_url(event.url)),
+                            ("http.response.status_code", event.status_code),
+                            ("http.request.body.size", event.bytes_sent),
+                            ("http.response.body.size", event.bytes_received)):
+            if value is not None:
+                attributes[name] = value
+        for name, value in event.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                attributes[f"magister.{name}"] = value
+
+        span = self.tracer.start_span(f"magister.{event.phase}", start_time=event.start_time, attributes=attributes,
+                                      kind=self.__trace.SpanKind.CLIENT if event.method else self.__trace.SpanKind.INTERNAL)
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(self.__trace.Status(self.__trace.StatusCode.ERROR, type(event.error).__name__))
+        elif event.status_code is not None and event.status_code >= 400:
+            span.set_status(self.__trace.Status(self.__trace.StatusCode.ERROR))
+        span.end(end_time=event.end_time)
@@ -0,0 +1,6 @@
+'''
+The offline benchmarks of MagisterPy. Run them from the root of the repository, for example:
+
+    python -m benchmarks.run
+    python -m benchmarks.bench_authcode
+'''
@@ -0,0 +1,52 @@
+'''
+Measures how long it takes to extract the authcode from the account javascript bundles in tests/test_javascripts.
+
+    python -m benchmarks.bench_authcode [--repeat 200]
+
+response.text + slow: what the sessions used to do, decoding the response (requests guesses the encoding) and running the original parser
+slow: the original parser, on the decoded bundle
+fast (str): the regex parser, on the decoded bundle
+fast (bytes): the regex parser, on the raw bytes (what the sessions use)
+'''
+import argparse
+import timeit
+import requests
+from MagisterPy import JsParser
+from .fixtures import load_bundles
+
+
+def measure(function, repeat: int) -> float:
+    '''
+    returns the best time of one call in microseconds
+    '''
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    js_parser = JsParser()
+    print(f"{'bundle':<36}{'size':>10}{'response.text + slow':>22}{'slow':>12}{'fast (str)':>14}{'fast (bytes)':>14}")
+    for filename, content in load_bundles().items():
+        text = content.decode()
+        assert js_parser.get_authcode_fast(content) == js_parser.get_authcode_slow(text)
+
+        def decode_and_parse():
+            response = requests.Response()
+            response._content = content
+            return js_parser.get_authcode_slow(response.text)
+
+        decode_and_slow = measure(decode_and_parse, max(1, args.repeat // 10))
+        slow = measure(lambda: js_parser.get_authcode_slow(text), args.repeat)
+        fast_str = measure(
+            lambda: js_parser.get_authcode_fast(text), args.repeat)
+        fast_bytes = measure(
+            lambda: js_parser.get_authcode_fast(content), args.repeat)
+        print(f"{filename:<36}{len(content):>10}{decode_and_slow:>20.1f}us{slow:>10.1f}us{fast_str:>12.1f}us{fast_bytes:>12.1f}us")
+
+
+if __name__ == "__main__":
+    main()
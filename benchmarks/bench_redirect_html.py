@@ -0,0 +1,51 @@
+'''
+Compares the html.parser scan and the BeautifulSoup fallback that extract the bundle url from the login page,
+and measures how long importing bs4 takes in a fresh interpreter.
+
+    python -m benchmarks.bench_redirect_html [--repeat 200]
+'''
+import argparse
+import subprocess
+import sys
+import timeit
+from MagisterPy import request_manager
+from .fixtures import LOGIN_PAGE
+
+
+def measure(function, repeat: int) -> float:
+    '''
+    returns the best time of one call in microseconds
+    '''
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1e6
+
+
+def measure_import(module: str) -> float:
+    '''
+    returns how many milliseconds importing the module takes in a new interpreter
+    '''
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code],
+                            capture_output=True, text=True, check=True).stdout
+    return float(output) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"page size: {len(LOGIN_PAGE)} characters")
+    print(f"html.parser scan:   {measure(lambda: request_manager.find_deferred_script_src(LOGIN_PAGE), args.repeat):10.1f}us")
+    if request_manager.find_deferred_script_src_bs4(LOGIN_PAGE) is None:
+        print("bs4 is not installed, skipping the BeautifulSoup comparison")
+        return
+    assert request_manager.find_deferred_script_src(
+        LOGIN_PAGE) == request_manager.find_deferred_script_src_bs4(LOGIN_PAGE)
+    print(f"BeautifulSoup:      {measure(lambda: request_manager.find_deferred_script_src_bs4(LOGIN_PAGE), args.repeat):10.1f}us")
+    print(f"import html.parser: {measure_import('html.parser'):10.1f}ms")
+    print(f"import bs4:         {measure_import('bs4'):10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+'''
+The benchmarks run by benchmarks.run.
+
+Every benchmark is a generator that sets everything up, yields the function that gets timed and cleans up afterwards.
+'''
+import contextlib
+from unittest import mock
+from MagisterPy import (MagisterSession, AuthorizedRequestSender, LoginRequestsSender, JsParser, AuthcodeCache,
+                        Lesson, Grade, CompactLesson, CompactGrade)
+from MagisterPy.simulator import MagisterSimulator, SimulatorAdapter
+from . import fixtures
+
+# name -> context manager that returns the function that gets timed
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    def decorator(function):
+        BENCHMARKS[name] = contextlib.contextmanager(function)
+        return function
+    return decorator
+
+
+class _FakeResponse():
+    def __init__(self, items):
+        self.status_code = 200
+        self.items = items
+
+    def json(self):
+        return {"Items": self.items}
+
+
+def _add_authcode_benchmark(filename: str, content: bytes):
+    @benchmark(f"authcode/{filename}")
+    def authcode():
+        js_parser = JsParser()
+        yield lambda: js_parser.get_authcode_from_js(content)
+
+
+for _filename, _content in fixtures.load_bundles().items():
+    _add_authcode_benchmark(_filename, _content)
+
+
+@benchmark("redirect_html")
+def redirect_html():
+    request_sender = LoginRequestsSender()
+    yield lambda: request_sender.extract_redirect_url_from_html(fixtures.LOGIN_PAGE)
+
+
+def _add_schedule_benchmark(count: int, cancellations_from_status: bool):
+    name = "schedule_status" if cancellations_from_status else "schedule_diff"
+
+    @benchmark(f"{name}/{count}")
+    def schedule():
+        lessons = fixtures.make_lessons(count)
+        not_cancelled = [lesson for lesson in lessons if lesson["Status"] != 5]
+
+        def send_authorized_request(magister_session, url, method, params, **kwargs):
+            return _FakeResponse(not_cancelled if "status" in params else lessons)
+
+        session = MagisterSession(cancellations_from_status=cancellations_from_status)
+        session.app_auth_token = "Bearer token"
+        with mock.patch.object(AuthorizedRequestSender, "send_authorized_request", side_effect=send_authorized_request):
+            yield lambda: session.get_schedule("2024-09-02", "2025-07-18", with_changes=True)
+
+
+for _count in (1000, 10000):
+    _add_schedule_benchmark(_count, cancellations_from_status=False)
+    _add_schedule_benchmark(_count, cancellations_from_status=True)
+
+
+def _add_wrapper_benchmark(item_class, make_items, count: int):
+    @benchmark(f"wrap/{item_class.__name__}/{count}")
+    def wrap():
+        items = make_items(count)
+        yield lambda: [item_class(item) for item in items]
+
+
+for _count in (1000, 10000):
+    for _item_class in (Lesson, CompactLesson):
+        _add_wrapper_benchmark(_item_class, fixtures.make_lessons, _count)
+    for _item_class in (Grade, CompactGrade):
+        _add_wrapper_benchmark(_item_class, fixtures.make_grades, _count)
+
+
+def _add_login_benchmark(cached_authcode: bool):
+    @benchmark("login/cached_authcode" if cached_authcode else "login/uncached_authcode")
+    def login():
+        simulator = MagisterSimulator()
+        http_adapter = SimulatorAdapter(simulator)
+        authcode_cache = AuthcodeCache()
+        school_name, username, password = simulator.get_accounts()[0]
+
+        def run():
+            session = MagisterSession(http_adapter=http_adapter, automatically_handle_errors=False,
+                                      enable_authcode_cache=cached_authcode, authcode_cache=authcode_cache)
+            if not session.login(school_name, username, password):
+                raise RuntimeError("The login failed")
+        yield run
+
+
+_add_login_benchmark(cached_authcode=False)
+_add_login_benchmark(cached_authcode=True)
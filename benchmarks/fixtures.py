@@ -0,0 +1,73 @@
+'''
+The recorded inputs of the benchmarks. Everything is deterministic, so the results of different commits can be compared.
+'''
+import datetime
+import os
+
+BUNDLE_DIRECTORY = os.path.join(os.path.dirname(
+    __file__), "..", "tests", "test_javascripts")
+
+# shaped like the login page of accounts.magister.net
+LOGIN_PAGE = ("<!doctype html><html lang=\"nl\"><head><meta charset=\"utf-8\"><title>Magister</title>"
+              "<meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">"
+              + "".join(f"<link rel=\"preload\" href=\"fonts/font-{index}.woff2\" as=\"font\" crossorigin>" for index in range(20))
+              + "<link href=\"css/account.css\" rel=\"stylesheet\"></head><body><noscript>Schakel javascript in</noscript>"
+              + "<div id=\"root\">" + "<div class=\"placeholder\"><span>&nbsp;</span></div>" * 50 + "</div>"
+              + "<script defer=\"defer\" src=\"js/account-56c22c13622e321fb1f1.js\"></script></body></html>")
+
+SUBJECTS = (("ne", "Nederlands"), ("en", "Engels"), ("wi", "Wiskunde"), ("na", "Natuurkunde"),
+            ("gs", "Geschiedenis"), ("ak", "Aardrijkskunde"), ("bi", "Biologie"), ("lo", "Lichamelijke opvoeding"))
+
+
+def load_bundles() -> dict:
+    '''
+    returns the account javascript bundles of tests/test_javascripts as {filename: bytes}
+    '''
+    bundles = {}
+    for filename in sorted(os.listdir(BUNDLE_DIRECTORY)):
+        with open(os.path.join(BUNDLE_DIRECTORY, filename), "rb") as file:
+            bundles[filename] = file.read()
+    return bundles
+
+
+def make_lessons(count: int, cancel_every: int = 10) -> list[dict]:
+    '''
+    returns count lessons as they are returned by /afspraken. Every cancel_every-th lesson is cancelled (Status 5)
+    '''
+    first_lesson = datetime.datetime(2024, 9, 2, 7, 30)
+    lessons = []
+    for index in range(count):
+        code, subject = SUBJECTS[index % len(SUBJECTS)]
+        start = first_lesson + datetime.timedelta(days=index // 8, minutes=50 * (index % 8))
+        location = str(100 + index % 30)
+        lessons.append({"Id": 1_000_000 + index, "Start": start.strftime("%Y-%m-%dT%H:%M:%S.0000000Z"),
+                        "Einde": (start + datetime.timedelta(minutes=50)).strftime("%Y-%m-%dT%H:%M:%S.0000000Z"),
+                        "LesuurVan": index % 8 + 1, "LesuurTotMet": index % 8 + 1, "DuurtHeleDag": False,
+                        "Omschrijving": f"{code} - {code.upper()}1 - {location}", "Lokatie": location,
+                        "Status": 5 if index % cancel_every == cancel_every - 1 else 1, "Type": 13, "Subtype": 1,
+                        "IsOnlineDeelname": False, "WeergaveType": 1, "Inhoud": None, "Opmerking": None, "InfoType": 0,
+                        "Aantekening": None, "Afgerond": False, "HerhaalStatus": 0, "Herhaling": None,
+                        "Vakken": [{"Id": index % len(SUBJECTS), "Naam": subject}],
+                        "Docenten": [{"Id": 300 + index % 40, "Naam": f"Docent {code.upper()}", "Docentcode": code.upper()}],
+                        "Lokalen": [{"Naam": location}], "Groepen": None, "OpdrachtId": 0, "HeeftBijlagen": False,
+                        "Bijlagen": None})
+    return lessons
+
+
+def make_grades(count: int) -> list[dict]:
+    '''
+    returns count grades as they are returned by /cijfers/laatste, the most recent one first
+    '''
+    first_grade = datetime.datetime(2024, 9, 2, 12, 0)
+    grades = []
+    for index in range(count):
+        code, subject = SUBJECTS[index % len(SUBJECTS)]
+        value = f"{3 + (index * 7) % 71 / 10:.1f}".replace(".", ",")
+        entered = first_grade + datetime.timedelta(hours=index * 5)
+        grades.append({"kolomId": 2_000_000 + index, "omschrijving": f"Toets {index + 1}",
+                       "ingevoerdOp": entered.strftime("%Y-%m-%dT%H:%M:%S.0000000Z"),
+                       "vak": {"code": code, "omschrijving": subject}, "waarde": value,
+                       "weegfactor": (1, 1, 2, 3)[index % 4], "isVoldoende": float(value.replace(",", ".")) >= 5.5,
+                       "teltMee": True, "moetInhalen": False, "heeftVrijstelling": False, "behaaldOp": None, "links": {}})
+    grades.reverse()
+    return grades
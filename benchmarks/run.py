@@ -0,0 +1,143 @@
+'''
+Runs the benchmark suite offline and stores the results as json, so the results of different commits can be compared.
+
+    python -m benchmarks.run [--filter login] [--rounds 7] [--output results.json]
+    python -m benchmarks.run --compare benchmarks/results/<old commit>.json [--threshold 0.1]
+    python -m benchmarks.run --compare old.json new.json
+
+By default the results are written to benchmarks/results/<commit>.json. The comparison uses the best round of every
+benchmark (the least noisy number) and exits with status 1 if a benchmark got slower than the threshold.
+'''
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from .cases import BENCHMARKS
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(__file__), "results")
+# every round runs the benchmark at least this many seconds
+MIN_ROUND_SECONDS = 0.05
+RESULTS_VERSION = 1
+
+
+def get_commit() -> str:
+    '''
+    returns the current git commit (with -dirty if there are uncommitted changes) or "unknown"
+    '''
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True,
+                               check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + "-dirty" if dirty else commit
+
+
+def measure(function, rounds: int) -> dict:
+    '''
+    times the function and returns the statistics of the time of one call in seconds
+    '''
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    # autorange stops at 0.2 seconds, the rounds are kept a bit shorter
+    number = max(1, int(number * MIN_ROUND_SECONDS / 0.2))
+    times = [total / number for total in timer.repeat(repeat=rounds, number=number)]
+    return {"min": min(times), "median": statistics.median(times), "mean": statistics.mean(times),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0, "rounds": rounds, "number": number}
+
+
+def run(names: list, rounds: int) -> dict:
+    '''
+    runs the benchmarks and returns the results together with the environment they were measured in
+    '''
+    results = {}
+    for name in names:
+        with BENCHMARKS[name]() as function:
+            function()  # warm up the caches that are filled once per process
+            results[name] = measure(function, rounds)
+        print(f"{name:<48}{results[name]['min'] * 1e6:>14.1f}us  (median {results[name]['median'] * 1e6:.1f}us)")
+    return {
+        "version": RESULTS_VERSION,
+        "commit": get_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    '''
+    prints the change of every benchmark that is in both results and returns the names of the ones that got slower than the threshold
+    '''
+    if (old.get("python"), old.get("machine")) != (new.get("python"), new.get("machine")):
+        print(f"warning: comparing python {old.get('python')} on {old.get('machine')} "
+              f"with python {new.get('python')} on {new.get('machine')}")
+    print(f"{'benchmark':<48}{old.get('commit', 'old'):>14}{new.get('commit', 'new'):>14}{'change':>10}")
+    regressions = []
+    for name, new_result in new["benchmarks"].items():
+        old_result = old["benchmarks"].get(name)
+        if old_result is None:
+            continue
+        ratio = new_result["min"] / old_result["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:<48}{old_result['min'] * 1e6:>12.1f}us{new_result['min'] * 1e6:>12.1f}us{ratio - 1:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="",
+                        help="only run the benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--output", help="where the results are written to")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS",
+                        help="the results to compare with. With two files they are compared without running the benchmarks")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument("--list", action="store_true",
+                        help="list the benchmarks")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    if args.compare and len(args.compare) == 2:
+        results = []
+        for path in args.compare:
+            with open(path) as file:
+                results.append(json.load(file))
+        sys.exit(1 if compare(*results, threshold=args.threshold) else 0)
+
+    results = run(names, args.rounds)
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare[0]) as file:
+            old = json.load(file)
+        print()
+        sys.exit(1 if compare(old, results, threshold=args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
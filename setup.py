@@ -14,7 +14,7 @@ setup(
     long_description_content_type="text/markdown",
     author="H3LL0U",
     url="https://github.com/H3LL0U/MagisterPy",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -24,5 +24,12 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=parse_requirements(
-        './requirements.txt')  # Read dependencies
+        './requirements.txt'),  # Read dependencies
+    extras_require={
+        "async": ["aiohttp>=3.8"],
+        "encryption": ["cryptography"],
+        "frames": ["numpy"],
+        "html": ["beautifulsoup4>=4.12", "soupsieve>=2.6"],
+        "tracing": ["opentelemetry-api"],
+    }
 )
@@ -0,0 +1,182 @@
+import unittest
+import datetime
+import os
+import socket
+import ssl
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import AsyncMagisterSession, AuthcodeCache, RecordingTracer, Grade, NotLoggedInError, RetryPolicy, CircuitBreakerRegistry
+from MagisterPy.simulator import MagisterSimulator, SimulatorServer, PHOTO
+
+try:
+    import aiohttp
+    from aiohttp.abc import AbstractResolver
+except ImportError:
+    aiohttp = None
+    AbstractResolver = object
+try:
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+except ImportError:
+    x509 = None
+
+SCHOOL, USERNAME, PASSWORD = "Simulated School", "student1", "password"
+
+
+def make_ssl_context() -> ssl.SSLContext:
+    '''
+    returns a server context with a self signed certificate, the sessions connect to it without verifying it
+    '''
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "magister.net")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1))
+                   .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256()))
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    with tempfile.TemporaryDirectory() as directory:
+        certificate_file, key_file = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+        with open(certificate_file, "wb") as file:
+            file.write(certificate.public_bytes(serialization.Encoding.PEM))
+        with open(key_file, "wb") as file:
+            file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                         serialization.NoEncryption()))
+        context.load_cert_chain(certificate_file, key_file)
+    return context
+
+
+class SimulatorResolver(AbstractResolver):
+    '''
+    points all of the Magister hosts at the SimulatorServer
+    '''
+
+    def __init__(self, port: int):
+        self.port = port
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        return [{"hostname": host, "host": "127.0.0.1", "port": self.port, "family": socket.AF_INET,
+                 "proto": 0, "flags": 0}]
+
+    async def close(self):
+        pass
+
+
+@unittest.skipIf(aiohttp is None or x509 is None, "aiohttp or cryptography is not installed")
+class TestAsyncMagisterSession(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ssl_context = make_ssl_context()
+
+    def setUp(self):
+        self.simulator = MagisterSimulator()
+        self.server = SimulatorServer(self.simulator, ssl_context=self.ssl_context).start()
+        self.addCleanup(self.server.stop)
+
+    async def asyncSetUp(self):
+        self.connector = aiohttp.TCPConnector(resolver=SimulatorResolver(self.server.port), ssl=False)
+        self.addAsyncCleanup(self.connector.close)
+
+    def make_session(self, **kwargs) -> AsyncMagisterSession:
+        kwargs.setdefault("authcode_cache", AuthcodeCache())
+        kwargs.setdefault("delay_between_relogin_atempts", 0)
+        session = AsyncMagisterSession(connector=self.connector, **kwargs)
+        self.addAsyncCleanup(session.close)
+        return session
+
+    async def test_login(self):
+        tracer = RecordingTracer()
+        session = self.make_session(tracer=tracer)
+        self.assertTrue(await session.login(SCHOOL, USERNAME, PASSWORD))
+        self.assertTrue(session.is_logged_in())
+        self.assertEqual(session.api_url, "https://simulatedschool.magister.net/api")
+        # the authcode was found in the streamed bundle
+        self.assertEqual(session.authcode, self.simulator.authcode)
+        self.assertEqual(len(tracer.get_events("bundle_download")), 1)
+        self.assertEqual(len(tracer.get_events("authcode_parse")), 1)
+
+    async def test_authcode_is_cached(self):
+        cache = AuthcodeCache()
+        self.assertTrue(await self.make_session(authcode_cache=cache).login(SCHOOL, USERNAME, PASSWORD))
+        self.assertTrue(await self.make_session(authcode_cache=cache).login(SCHOOL, USERNAME, PASSWORD))
+        self.assertEqual(self.simulator.request_counts["/js/account.js"], 1)
+
+    async def test_wrong_password(self):
+        session = self.make_session()
+        self.assertFalse(await session.login(SCHOOL, USERNAME, "wrong password"))
+        self.assertFalse(session.is_logged_in())
+
+    async def test_fetches(self):
+        session = self.make_session()
+        self.assertTrue(await session.login(SCHOOL, USERNAME, PASSWORD))
+
+        grades = await session.get_grades(top=5)
+        self.assertEqual(len(grades), 5)
+        self.assertIsInstance(grades[0], Grade)
+        schedule = await session.get_schedule("2024-11-04", "2024-11-08", with_changes=True)
+        self.assertTrue(schedule)
+        self.assertTrue(all(lesson.is_valid() for lesson in schedule))
+        self.assertEqual((await session.get_person_profile()).get_first_name(), "Student1")
+        self.assertEqual((await session.get_account_profile()).get_username(), USERNAME)
+        self.assertEqual(await session.get_photo(), PHOTO)
+
+    async def test_not_logged_in(self):
+        session = self.make_session(automatically_handle_errors=False)
+        self.assertIsNone(await session.get_grades())
+        with self.assertRaises(NotLoggedInError):
+            await session.get_photo()
+
+    async def test_expired_token_relogs_in(self):
+        session = self.make_session()
+        self.assertTrue(await session.login(SCHOOL, USERNAME, PASSWORD))
+        generation = session.token_generation
+        self.simulator.expire_tokens()
+        self.assertEqual(len(await session.get_grades(top=5)), 5)
+        self.assertEqual(self.simulator.request_counts["/challenges/password"], 2)
+        self.assertGreater(session.token_generation, generation)
+
+    async def test_timeout_is_handled_without_relogin(self):
+        session = self.make_session(request_timeout=0.1)
+        self.assertTrue(await session.login(SCHOOL, USERNAME, PASSWORD))
+        generation = session.token_generation
+        self.simulator.latency = 0.5
+        self.assertIsNone(await session.get_grades(top=5))
+        self.assertEqual(self.simulator.request_counts["/challenges/password"], 1)
+        self.assertEqual(session.token_generation, generation)
+
+    async def test_temporary_server_errors_are_retried(self):
+        tracer = RecordingTracer()
+        session = self.make_session(request_retries=1, tracer=tracer)
+        self.assertTrue(await session.login(SCHOOL, USERNAME, PASSWORD))
+        self.simulator.inject_errors(1, status=503)
+        self.assertEqual(len(await session.get_grades(top=5)), 5)
+        self.assertEqual(tracer.get_events("grades")[-1].retries, 1)
+
+    async def test_only_server_errors_count_for_the_circuit_breaker(self):
+        circuit_breakers = CircuitBreakerRegistry(failure_threshold=1)
+        session = self.make_session(max_relogin_atempts=1, retry_policy=RetryPolicy(base_delay=0, circuit_breakers=circuit_breakers))
+        self.assertTrue(await session.login(SCHOOL, USERNAME, PASSWORD))
+        circuit_breaker = circuit_breakers.get("simulatedschool.magister.net")
+        session._AsyncMagisterSession__password = "wrong password"
+        with self.assertRaises(Exception):
+            await session.relogin()
+        self.assertEqual(circuit_breaker.state, circuit_breaker.CLOSED)
+        self.simulator.inject_errors(100, status=503)
+        with self.assertRaises(Exception):
+            await session.relogin()
+        self.assertEqual(circuit_breaker.state, circuit_breaker.OPEN)
+
+    async def test_iter_grades(self):
+        session = self.make_session()
+        self.assertTrue(await session.login(SCHOOL, USERNAME, PASSWORD))
+        grades = [grade async for grade in session.iter_grades(page_size=7)]
+        self.assertEqual(len(grades), self.simulator.grades_per_student)
+        self.assertEqual([grade.get_id() for grade in grades],
+                         [grade.get_id() for grade in await session.get_grades(top=100)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import AuthcodeCache
+
+
+class TestAuthcodeCache(unittest.TestCase):
+    def setUp(self):
+        self.bundle_url = "https://accounts.magister.net/js/account-56c22c13622e321fb1f1.js"
+        self.cache = AuthcodeCache()
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get(self.bundle_url))
+        self.cache.set(self.bundle_url, "6380e45e80d5bb")
+        self.assertEqual(self.cache.get(self.bundle_url), "6380e45e80d5bb")
+        self.assertIn(self.bundle_url, self.cache)
+
+    def test_ttl(self):
+        cache = AuthcodeCache(ttl=0)
+        cache.set(self.bundle_url, "6380e45e80d5bb")
+        self.assertIsNone(cache.get(self.bundle_url))
+
+    def test_invalidate(self):
+        self.cache.set(self.bundle_url, "6380e45e80d5bb")
+        self.cache.invalidate(self.bundle_url)
+        self.assertIsNone(self.cache.get(self.bundle_url))
+
+    def test_cache_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, "authcodes.json")
+            self.cache = AuthcodeCache(cache_file=cache_file)
+            self.cache.set(self.bundle_url, "6380e45e80d5bb")
+
+            # a new cache (for example in another process) reads the stored authcode
+            self.assertEqual(AuthcodeCache(cache_file=cache_file).get(
+                self.bundle_url), "6380e45e80d5bb")
+
+            self.cache.invalidate(self.bundle_url)
+            self.assertIsNone(AuthcodeCache(
+                cache_file=cache_file).get(self.bundle_url))
+
+    def test_failed_write_removes_the_temporary_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = AuthcodeCache(cache_file=os.path.join(directory, "authcodes.json"))
+            with mock.patch("os.replace", side_effect=OSError("disk full")):
+                cache.set(self.bundle_url, "6380e45e80d5bb")
+            self.assertEqual(os.listdir(directory), [])
+            self.assertEqual(cache.get(self.bundle_url), "6380e45e80d5bb")
+
+
+if __name__ == "__main__":
+    unittest.main()
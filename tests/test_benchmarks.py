@@ -0,0 +1,36 @@
+import unittest
+import io
+import sys
+import os
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from benchmarks.cases import BENCHMARKS
+from benchmarks import run
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_every_benchmark_runs(self):
+        for name, benchmark in BENCHMARKS.items():
+            with self.subTest(name=name), benchmark() as function:
+                function()
+
+    def test_authcode_benchmarks_cover_all_bundles(self):
+        self.assertEqual(len([name for name in BENCHMARKS if name.startswith("authcode/")]), 4)
+
+    def test_compare(self):
+        old = {"commit": "old", "benchmarks": {"a": {"min": 1.0}, "b": {"min": 1.0}, "c": {"min": 1.0}}}
+        new = {"commit": "new", "benchmarks": {"a": {"min": 1.05}, "b": {"min": 1.5}, "c": {"min": 0.5}, "d": {"min": 1.0}}}
+        with redirect_stdout(io.StringIO()) as output:
+            regressions = run.compare(old, new, threshold=0.1)
+        self.assertEqual(regressions, ["b"])
+        self.assertIn("faster", output.getvalue())
+
+    def test_measure(self):
+        result = run.measure(lambda: None, rounds=2)
+        self.assertEqual(result["rounds"], 2)
+        self.assertLessEqual(result["min"], result["median"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+import unittest
+import pickle
+import sys
+import os
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import *
+from MagisterPy.compact_items import CompactResponseItem, _intern_frozen
+from MagisterPy.simulator import MagisterSimulator, SimulatorAdapter
+
+
+LESSON_JSON = {
+    "Start": "2024-04-02T08:00:00.0000000Z", "Einde": "2024-04-02T09:00:00.0000000Z", "LesuurVan": 1, "LesuurTotMet": 1,
+    "DuurtHeleDag": False, "Omschrijving": "Math", "Lokatie": "Room 101",
+    "Status": 5, "Type": "Lecture", "Subtype": "Normal",
+    "IsOnlineDeelname": False, "WeergaveType": "Standard", "Inhoud": "Algebra",
+    "Opmerking": "Bring calculator", "InfoType": "General", "Aantekening": "",
+    "Afgerond": False, "HerhaalStatus": "None", "Herhaling": "None", "Vakken": [{"Naam": "Math"}, {"Naam": "Physics"}],
+    "Docenten": [{"Naam": "Dr. Smith", "Docentcode": "SMI"}], "Lokalen": [{"Naam": "Room 101"}], "Groepen": [], "OpdrachtId": None,
+    "HeeftBijlagen": False, "Bijlagen": [], "Id": 100
+}
+
+GRADE_JSON = {
+    "kolomId": 1, "omschrijving": "Exam", "ingevoerdOp": "2024-04-02",
+    "vak": {"code": "MATH101", "omschrijving": "Mathematics"}, "waarde": "7,5",
+    "weegfactor": 2, "isVoldoende": True, "teltMee": True, "moetInhalen": False,
+    "heeftVrijstelling": False, "behaaldOp": "2024-04-01", "links": []
+}
+
+
+class TestCompactLesson(unittest.TestCase):
+    def setUp(self):
+        self.lesson = CompactLesson(LESSON_JSON)
+
+    def test_getters_match_lesson(self):
+        lesson = Lesson(LESSON_JSON)
+        for getter in ("is_valid", "is_cancelled", "has_cancelled_status", "get_id", "get_location", "get_start_time",
+                       "get_end_time", "get_teacher_names", "get_locations", "get_subject_names", "get_description"):
+            self.assertEqual(getattr(self.lesson, getter)(),
+                             getattr(lesson, getter)(), getter)
+
+    def test_has_no_dict(self):
+        self.assertFalse(hasattr(self.lesson, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.lesson.some_attribute = 1
+
+    def test_cancelled_can_be_set(self):
+        self.lesson.cancelled = True
+        self.assertTrue(self.lesson.is_cancelled())
+
+    def test_kept_fields_can_be_read(self):
+        self.assertEqual(self.lesson["Id"], 100)
+        self.assertEqual(self.lesson.get("Lokatie"), "Room 101")
+        self.assertEqual(self.lesson["Docenten"], LESSON_JSON["Docenten"])
+        self.assertIn("Start", self.lesson)
+
+    def test_dropped_fields_raise(self):
+        with self.assertRaises(DroppedFieldError):
+            self.lesson["Inhoud"]
+        with self.assertRaises(DroppedFieldError):
+            self.lesson.get("Vakken")
+        with self.assertRaises(DroppedFieldError):
+            self.lesson.json
+        with self.assertRaises(KeyError):
+            "Inhoud" in self.lesson
+        # an invalid item might not have had the kept fields at all
+        with self.assertRaises(DroppedFieldError):
+            CompactLesson({"Id": 1, "Inhoud": "Algebra"})["Start"]
+        self.assertEqual(repr(self.lesson), "<CompactLesson id=100>")
+
+    def test_keep_raw(self):
+        lesson = CompactLesson(LESSON_JSON, keep_raw=True)
+        self.assertEqual(lesson.json, LESSON_JSON)
+        self.assertEqual(lesson["Inhoud"], "Algebra")
+        self.assertEqual(len(lesson), len(LESSON_JSON))
+        self.assertEqual(dict(lesson.items()), LESSON_JSON)
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.lesson["Lokatie"] = "Room 102"
+        with self.assertRaises(TypeError):
+            del self.lesson["Lokatie"]
+
+    def test_returned_lists_are_copies(self):
+        self.lesson.get_teacher_names().append({"Naam": "Someone"})
+        self.lesson.get_locations().append("Room 102")
+        self.assertEqual(self.lesson.get_teacher_names(),
+                         LESSON_JSON["Docenten"])
+        self.assertEqual(self.lesson.get_locations(), ["Room 101"])
+
+    def test_strings_are_shared(self):
+        other = CompactLesson(dict(LESSON_JSON, Id=101))
+        self.assertIs(self.lesson.get_location(), other.get_location())
+        self.assertIs(self.lesson._teachers, other._teachers)
+
+    def test_intern_cache_is_bounded(self):
+        for teacher in range(5000):
+            CompactLesson(dict(LESSON_JSON, Docenten=[{"Naam": str(teacher)}]))
+        self.assertLessEqual(_intern_frozen.cache_info().currsize, 4096)
+
+    def test_interning_keeps_the_types(self):
+        # 1 == 1.0 == True, but the interned values must not be mixed up
+        for teacher_id in (1, True, 1.0):
+            teachers = [{"Id": teacher_id, "Naam": "Dr. Smith"}]
+            lesson = CompactLesson(dict(LESSON_JSON, Docenten=teachers))
+            self.assertIs(type(lesson.get_teacher_names()[0]["Id"]), type(teacher_id))
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            CompactResponseItem()
+
+    def test_invalid_json(self):
+        lesson = CompactLesson({"Id": 1})
+        self.assertFalse(lesson.is_valid())
+        self.assertIsNone(lesson.get_locations())
+        self.assertIsNone(lesson.get_teacher_names())
+
+    def test_datetimes(self):
+        lesson = Lesson(LESSON_JSON)
+        self.assertEqual(self.lesson.get_start_datetime(), lesson.get_start_datetime())
+        self.assertIs(self.lesson.get_end_datetime(), self.lesson.get_end_datetime())
+        parse_datetimes([self.lesson])
+        self.assertEqual(self.lesson.get_end_datetime().hour, 9)
+        self.assertEqual(CompactGrade(GRADE_JSON).get_entered_datetime().day, 2)
+
+    def test_from_lesson(self):
+        lesson = CompactLesson.from_lesson(Lesson(LESSON_JSON, cancelled=True))
+        self.assertTrue(lesson.is_cancelled())
+        self.assertEqual(lesson.get_id(), 100)
+
+
+class TestCompactGrade(unittest.TestCase):
+    def test_getters_match_grade(self):
+        compact_grade, grade = CompactGrade(GRADE_JSON), Grade(GRADE_JSON)
+        for getter in ("is_valid", "get_id", "get_value", "get_lesson_code", "get_lesson_name",
+                       "get_entered_time", "get_weighting_factor"):
+            self.assertEqual(getattr(compact_grade, getter)(),
+                             getattr(grade, getter)(), getter)
+
+    def test_complete_json_is_rebuilt(self):
+        data = {key: GRADE_JSON[key] for key in CompactGrade.kept_keys}
+        self.assertEqual(CompactGrade(data).json, data)
+        with self.assertRaises(DroppedFieldError):
+            CompactGrade(GRADE_JSON).json
+
+    def test_missing_lesson(self):
+        grade = CompactGrade({"kolomId": 2})
+        self.assertFalse(grade.is_valid())
+        self.assertIsNone(grade.get_lesson_code())
+        self.assertIsNone(grade.get_lesson_name())
+
+    def test_pickle(self):
+        grade = pickle.loads(pickle.dumps(
+            CompactGrade(GRADE_JSON, keep_raw=True)))
+        self.assertEqual(grade.json, GRADE_JSON)
+        self.assertEqual(grade.get_value(), "7,5")
+
+
+class TestCompactProfiles(unittest.TestCase):
+    def test_person_profile(self):
+        data = {
+            "id": 999001, "externeId": "xyz789", "accountExterneId": "acc987654321", "voorletters": "J.D.",
+            "roepnaam": "Jane", "tussenvoegsel": None, "achternaam": "Doe", "stamnummer": 654321,
+            "rollenVanGebruiker": ["Leerling"],
+            "links": {"foto": {"href": "/api/leerlingen/999001/foto"}}
+        }
+        profile = CompactPersonProfile(data)
+        self.assertTrue(profile.is_valid())
+        self.assertEqual(profile.get_first_name(), "Jane")
+        self.assertEqual(profile.get_roles(), ["Leerling"])
+        self.assertEqual(profile.get_photo_link(),
+                         "/api/leerlingen/999001/foto")
+        self.assertEqual(profile.json, data)
+
+    def test_account_profile(self):
+        data = {
+            "id": 888222, "naam": "user12345", "emailadres": "user12345@schooldomain.test",
+            "mobielTelefoonnummer": "0611223344", "softtokenStatus": "nietGekoppeld",
+            "isEmailadresGeverifieerd": False, "moetEmailadresVerifieren": True,
+            "uuId": "abcd1234", "links": {"leerling": {"href": "/api/leerlingen/999001"}}
+        }
+        profile = CompactAccountProfile(data)
+        self.assertTrue(profile.is_valid())
+        self.assertEqual(profile.get_username(), "user12345")
+        self.assertTrue(profile.must_verify_email())
+        self.assertEqual(profile.get_specific_link(
+            "leerling"), "/api/leerlingen/999001")
+        self.assertEqual(profile.json, data)
+
+
+class TestCompactSession(unittest.TestCase):
+    def get_grades(self, **kwargs):
+        session = MagisterSession(http_adapter=SimulatorAdapter(MagisterSimulator()), authcode_cache=AuthcodeCache(),
+                                  compact_items=True, enable_metrics=False, **kwargs)
+        self.assertTrue(session.login("Simulated School", "student1", "password"))
+        return session.get_grades(top=2)
+
+    def test_keep_raw_json(self):
+        grade = self.get_grades(keep_raw_json=True)[0]
+        self.assertIsInstance(grade, CompactGrade)
+        self.assertEqual(grade["vak"]["code"], grade.get_lesson_code())
+        self.assertTrue(grade.json.keys() >= CompactGrade.required_keys)
+
+    def test_without_raw_json(self):
+        grade = self.get_grades()[0]
+        self.assertEqual(grade["waarde"], grade.get_value())
+        with self.assertRaises(DroppedFieldError):
+            grade["vak"]
+
+
+class TestJsonResponseItemAttributes(unittest.TestCase):
+    def test_unknown_attributes_come_from_the_json(self):
+        lesson = Lesson(dict(LESSON_JSON))
+        self.assertEqual(lesson.get("Id"), 100)
+        self.assertEqual(set(lesson.keys()), set(LESSON_JSON))
+        self.assertFalse(hasattr(lesson, "not_a_dict_method"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import *
+from MagisterPy import frames
+
+
+def make_lesson(lesson_id, start, end, subject, location, cancelled=False):
+    return Lesson({"Id": lesson_id, "Start": start, "Einde": end, "Vakken": [{"Naam": subject}],
+                   "Lokatie": location, "Status": 5 if cancelled else 1}, cancelled=cancelled)
+
+
+def make_grade(grade_id, subject, value, weight, counts=True, exempt=False):
+    return Grade({"kolomId": grade_id, "ingevoerdOp": "2024-04-02T10:00:00.0000000Z", "vak": {"code": subject},
+                  "waarde": value, "weegfactor": weight, "teltMee": counts, "heeftVrijstelling": exempt})
+
+
+@unittest.skipIf(frames.np is None, "numpy is not installed")
+class TestGradeFrame(unittest.TestCase):
+    def setUp(self):
+        self.grades = [
+            make_grade(1, "wi", "8,0", 1),
+            make_grade(2, "wi", "5,0", 3),
+            make_grade(3, "ne", "7,5", 2),
+            make_grade(4, "ne", "1,0", 5, counts=False),
+            make_grade(5, "ne", "2,0", 5, exempt=True),
+            make_grade(6, "ne", "V", 1),
+            make_grade(7, None, "6", 1)
+        ]
+        self.frame = GradeFrame.from_list(self.grades)
+
+    def test_columns(self):
+        self.assertEqual(len(self.frame), 7)
+        self.assertEqual(self.frame.get_column("value")[2], 7.5)
+        self.assertTrue(frames.np.isnan(self.frame.get_column("value")[5]))
+        self.assertEqual(list(self.frame.get_labels("subject")), [
+                         "wi", "wi", "ne", "ne", "ne", "ne", None])
+
+    def test_weighted_mean(self):
+        self.assertAlmostEqual(self.frame.get_weighted_mean(), (8 + 15 + 15 + 6) / 7)
+        self.assertEqual(self.frame.get_weighted_mean(by="subject"), {
+                         "wi": 5.75, "ne": 7.5, None: 6.0})
+
+    def test_filter_and_group_by(self):
+        self.assertEqual([grade.get_id() for grade in self.frame.filter(subject="wi")], [1, 2])
+        self.assertEqual(len(self.frame.filter(subject="gs")), 0)
+        self.assertEqual(len(self.frame.filter(counts=False)), 1)
+        groups = self.frame.group_by("subject")
+        self.assertEqual(set(groups), {"wi", "ne", None})
+        self.assertEqual(groups["ne"].get_weighted_mean(), 7.5)
+
+    def test_round_trip(self):
+        self.assertEqual(self.frame.to_list(), self.grades)
+        self.assertIsInstance(self.frame.to_list()[0], Grade)
+        frame = GradeFrame.from_list([CompactGrade(grade.json) for grade in self.grades])
+        self.assertEqual(frame.get_weighted_mean(by="subject"),
+                         self.frame.get_weighted_mean(by="subject"))
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            frames._Frame({}, {}, frames.np.array([]))
+
+    def test_empty(self):
+        frame = GradeFrame.from_list([])
+        self.assertIsNone(frame.get_weighted_mean())
+        self.assertEqual(frame.get_weighted_mean(by="subject"), {})
+
+
+@unittest.skipIf(frames.np is None, "numpy is not installed")
+class TestScheduleFrame(unittest.TestCase):
+    def setUp(self):
+        self.lessons = [
+            make_lesson(3, "2024-04-03T08:00:00Z", "2024-04-03T09:00:00Z", "wi", "101"),
+            make_lesson(1, "2024-04-01T08:00:00Z", "2024-04-01T08:50:00Z", "ne", "101"),
+            make_lesson(2, "2024-04-02T08:00:00Z", "2024-04-02T09:00:00Z", "wi", "102", cancelled=True)
+        ]
+        self.frame = ScheduleFrame.from_list(self.lessons)
+
+    def test_total_duration(self):
+        self.assertEqual(self.frame.get_total_duration(by="location"), {"101": 6600.0})
+        self.assertEqual(self.frame.get_total_duration(by="subject", include_cancelled=True),
+                         {"wi": 7200.0, "ne": 3000.0})
+
+    def test_sort_and_between(self):
+        self.assertEqual([lesson.get_id() for lesson in self.frame.sort_by_start()], [1, 2, 3])
+        lessons = self.frame.between(parse_datetime("2024-04-02"), parse_datetime("2024-04-04"))
+        self.assertEqual(sorted(lesson.get_id() for lesson in lessons), [2, 3])
+
+    def test_filter(self):
+        self.assertEqual(self.frame.filter(cancelled=True).to_list(), [self.lessons[2]])
+        self.assertEqual(len(self.frame.filter(subject="wi", location="101")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import time
+from unittest import mock
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, AuthorizedRequestSender
+
+
+class FakeResponse():
+    def __init__(self, items):
+        self.status_code = 200
+        self.items = items
+
+    def json(self):
+        return {"Items": self.items}
+
+
+LESSONS = [{"Id": 1, "Status": 1}, {"Id": 2, "Status": 5}, {"Id": 3, "Status": 2}]
+
+
+def send_authorized_request(magister_session, url, method, params, **kwargs):
+    time.sleep(0.1)
+    if "status" in params:
+        return FakeResponse([lesson for lesson in LESSONS if lesson["Status"] != 5])
+    return FakeResponse(LESSONS)
+
+
+class TestGetScheduleWithChanges(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(AuthorizedRequestSender, "send_authorized_request",
+                                    side_effect=send_authorized_request)
+        self.send_authorized_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_cancelled_ids(self, session):
+        lessons = session.get_schedule("2024-11-04", "2024-11-08", with_changes=True)
+        return [lesson.get_id() for lesson in lessons if lesson.is_cancelled()]
+
+    def make_session(self, **kwargs):
+        session = MagisterSession(**kwargs)
+        session.app_auth_token = "Bearer token"
+        return session
+
+    def test_requests_are_concurrent(self):
+        start = time.monotonic()
+        self.assertEqual(self.get_cancelled_ids(self.make_session()), [2])
+        self.assertLess(time.monotonic() - start, 0.19)
+        self.assertEqual(self.send_authorized_request.call_count, 2)
+
+    def test_cancellations_from_status(self):
+        session = self.make_session(cancellations_from_status=True)
+        self.assertEqual(self.get_cancelled_ids(session), [2])
+        self.assertEqual(self.send_authorized_request.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+from unittest import mock
+import sys
+import os
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import *
+from MagisterPy import grade_statistics
+
+
+def make_grade(subject, value, weight, counts=True, exempt=False, month=4):
+    return Grade({"vak": {"code": subject}, "waarde": value, "weegfactor": weight, "teltMee": counts,
+                  "heeftVrijstelling": exempt, "ingevoerdOp": f"2024-{month:02d}-02T10:00:00Z"})
+
+
+class GradeStatisticsTests():
+    use_numpy = None
+
+    def setUp(self):
+        self.grades = {
+            "jan": [
+                make_grade("wi", "8,0", 1, month=10),
+                make_grade("wi", "5,0", 3),
+                make_grade("ne", "7,5", 2),
+                make_grade("ne", "1,0", 5, counts=False),
+                make_grade("ne", "2,0", 5, exempt=True),
+                make_grade("ne", "V", 1),
+                make_grade("ne", "9,0", 0)
+            ],
+            "piet": [
+                make_grade("wi", "6,0", 2),
+                make_grade("gs", "4,0", 1, month=10)
+            ]
+        }
+        self.statistics = GradeStatistics(self.grades, period_key=lambda grade: grade.get_entered_datetime().month > 7,
+                                          use_numpy=self.use_numpy)
+
+    def test_skips_grades_that_dont_count(self):
+        self.assertEqual(len(self.statistics), 5)
+
+    def test_averages(self):
+        self.assertEqual(self.statistics.get_averages(), {
+            ("jan", "wi"): 5.75, ("jan", "ne"): 7.5, ("piet", "wi"): 6.0, ("piet", "gs"): 4.0})
+        self.assertEqual(self.statistics.get_averages(by="student"), {
+            "jan": (8 + 15 + 15) / 6, "piet": 16 / 3})
+        self.assertEqual(self.statistics.get_averages(by="period"), {
+            True: 6.0, False: (15 + 15 + 12) / 7})
+
+    def test_get_average(self):
+        self.assertEqual(self.statistics.get_average(student="jan", subject="wi"), 5.75)
+        self.assertEqual(self.statistics.get_average(subject="wi"), (8 + 15 + 12) / 6)
+        self.assertEqual(self.statistics.get_average(), (8 + 15 + 15 + 12 + 4) / 9)
+        self.assertIsNone(self.statistics.get_average(student="klaas"))
+
+    def test_get_required_grade(self):
+        # (8 + 15 + 2x) / 6 = 5.5
+        self.assertAlmostEqual(self.statistics.get_required_grade(
+            5.5, weight=2, student="jan", subject="wi"), 5.0)
+        self.assertEqual(self.statistics.get_required_grade(
+            5.0, weight=1, student="jan", subject="ne"), 1.0)
+        self.assertIsNone(self.statistics.get_required_grade(
+            9.5, weight=1, student="jan", subject="wi"))
+        self.assertEqual(self.statistics.get_required_grade(
+            6.0, weight=1, student="klaas"), 6.0)
+        with self.assertRaises(ValueError):
+            self.statistics.get_required_grade(5.5, weight=0)
+
+    def test_single_student(self):
+        statistics = GradeStatistics(self.grades["piet"], use_numpy=self.use_numpy)
+        self.assertEqual(statistics.get_averages(by="subject"), {"wi": 6.0, "gs": 4.0})
+        self.assertEqual(statistics.get_labels("student"), [None])
+
+    def test_totals_are_cached(self):
+        totals = self.statistics.get_totals(("student", "subject"))
+        with mock.patch.object(self.statistics, "_GradeStatistics__compute_totals") as compute_totals:
+            self.assertEqual(self.statistics.get_totals(("student", "subject")), totals)
+            self.assertEqual(self.statistics.get_average(student="jan", subject="wi"), 5.75)
+            self.assertEqual(self.statistics.get_required_grade(
+                5.0, weight=1, student="jan", subject="ne"), 1.0)
+        compute_totals.assert_not_called()
+        # the returned dict is a copy
+        totals.clear()
+        self.assertEqual(len(self.statistics.get_totals(("student", "subject"))), 4)
+
+    def test_same_grades_as_grade_frame(self):
+        if grade_statistics.np is None:
+            self.skipTest("numpy is not installed")
+        for grades in self.grades.values():
+            frame = GradeFrame.from_list(grades)
+            statistics = GradeStatistics(grades, use_numpy=self.use_numpy)
+            self.assertEqual(len(statistics), int(frame.get_counting_mask().sum()))
+            self.assertEqual(statistics.get_averages(by="subject"), frame.get_weighted_mean(by="subject"))
+
+    def test_invalid_group(self):
+        with self.assertRaises(ValueError):
+            self.statistics.get_averages(by="teacher")
+
+
+class TestGradeStatisticsPython(GradeStatisticsTests, unittest.TestCase):
+    use_numpy = False
+
+
+@unittest.skipIf(grade_statistics.np is None, "numpy is not installed")
+class TestGradeStatisticsNumpy(GradeStatisticsTests, unittest.TestCase):
+    use_numpy = True
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import abc
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import GradeSync, GradeSyncStore, InMemoryGradeSyncStore, SQLiteGradeSyncStore, Grade, MagisterSession, FetchError
+
+
+def make_grade(kolom_id, entered_time, value="7,5"):
+    return Grade({"kolomId": kolom_id, "ingevoerdOp": entered_time, "waarde": value})
+
+
+class FakeSession():
+    account_id = "888222"
+
+    def __init__(self, grades):
+        self.grades = grades
+        self.iterated = 0
+
+    def iter_grades(self, page_size=25, prefetch=0):
+        for grade in sorted(self.grades, key=lambda grade: grade.get_entered_time(), reverse=True):
+            self.iterated += 1
+            yield grade
+
+
+class PagedSession(MagisterSession):
+    '''
+    uses the real iter_grades, the page at failing_skip comes back as None like when error_handler handled an error
+    '''
+
+    def __init__(self, grades):
+        super().__init__()
+        self.account_id = "888222"
+        self.grades = sorted(grades, key=lambda grade: grade.get_entered_time(), reverse=True)
+        self.failing_skip = None
+
+    def get_grades(self, top=25, skip=0):
+        if skip == self.failing_skip:
+            return None
+        return self.grades[skip:skip + top]
+
+
+class GradeSyncTests(abc.ABC):
+    @abc.abstractmethod
+    def make_store(self) -> GradeSyncStore:
+        ...
+
+    def setUp(self):
+        self.grade_sync = GradeSync(store=self.make_store())
+        self.session = FakeSession([make_grade(kolom_id, f"2024-01-{kolom_id:02d}T10:00:00Z")
+                                    for kolom_id in range(1, 21)])
+
+    def test_first_sync_returns_everything(self):
+        self.assertEqual(len(self.grade_sync.sync(self.session)), 20)
+
+    def test_only_new_grades(self):
+        self.grade_sync.sync(self.session)
+        self.session.grades.append(make_grade(21, "2024-01-21T10:00:00Z"))
+        self.session.iterated = 0
+
+        new_grades = self.grade_sync.sync(self.session)
+        self.assertEqual([grade.get_id() for grade in new_grades], [21])
+        # stops right after the high water mark
+        self.assertLessEqual(self.session.iterated, 3)
+
+    def test_changed_grade(self):
+        self.grade_sync.sync(self.session)
+        self.session.grades[19] = make_grade(20, "2024-01-20T10:00:00Z", value="8,0")
+        self.assertEqual([grade.get_value() for grade in self.grade_sync.sync(self.session)], ["8,0"])
+
+    def test_failed_page_doesnt_save_the_state(self):
+        grade_sync = GradeSync(store=self.make_store(), page_size=10)
+        session = PagedSession([make_grade(kolom_id, f"2024-01-{kolom_id:02d}T10:00:00Z")
+                                for kolom_id in range(1, 31)])
+        session.failing_skip = 10
+        with self.assertRaises(FetchError):
+            grade_sync.sync(session)
+        self.assertIsNone(grade_sync.store.load(session.account_id).high_water_mark)
+
+        session.failing_skip = None
+        self.assertEqual(len(grade_sync.sync(session)), 30)
+        self.assertEqual(grade_sync.sync(session), [])
+
+    def test_nothing_new(self):
+        self.grade_sync.sync(self.session)
+        self.assertEqual(self.grade_sync.sync(self.session), [])
+
+    def test_mixed_precision(self):
+        self.grade_sync.sync(self.session)
+        # 10:00:00.5 was entered after the high water mark of 2024-01-20T10:00:00Z, even though the string sorts before it
+        self.session.grades.append(make_grade(21, "2024-01-20T10:00:00.5000000Z"))
+        self.assertEqual([grade.get_id() for grade in self.grade_sync.sync(self.session)], [21])
+        self.assertEqual(self.grade_sync.store.load(self.session.account_id).high_water_mark,
+                         ("2024-01-20T10:00:00.500000+00:00", 21))
+        self.assertEqual(self.grade_sync.sync(self.session), [])
+
+
+class TestGradeSyncStore(unittest.TestCase):
+    def test_is_abstract(self):
+        with self.assertRaises(TypeError):
+            GradeSyncStore()
+
+
+class TestInMemoryGradeSync(GradeSyncTests, unittest.TestCase):
+    def make_store(self):
+        return InMemoryGradeSyncStore()
+
+
+class TestSQLiteGradeSync(GradeSyncTests, unittest.TestCase):
+    def make_store(self):
+        return SQLiteGradeSyncStore(":memory:")
+
+    def test_state_survives_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "grades.db")
+            store = SQLiteGradeSyncStore(path)
+            GradeSync(store=store).sync(self.session)
+            store.close()
+
+            store = SQLiteGradeSyncStore(path)
+            self.assertEqual(GradeSync(store=store).sync(self.session), [])
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import json
+import subprocess
+import sys
+import os
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+
+PACKAGE_DIRECTORY = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../'))
+
+# modules that make the import slow and should only be loaded when they are used
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "soupsieve",
+                 "aiohttp", "numpy", "cryptography", "http.client")
+
+# generous upper limit, it only catches something heavy being imported eagerly again
+MAX_IMPORT_SECONDS = 0.5
+
+
+def run_import(statement: str) -> dict:
+    '''
+    runs the import statement in a new interpreter and returns how long it took and which heavy modules it loaded
+    '''
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "duration = time.perf_counter() - start\n"
+        f"print(json.dumps({{'duration': duration, 'loaded': [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=PACKAGE_DIRECTORY,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+class TestImportTime(unittest.TestCase):
+    def test_package_import_is_lazy(self):
+        result = run_import("import MagisterPy")
+        self.assertEqual(result["loaded"], [])
+        self.assertLess(result["duration"], MAX_IMPORT_SECONDS)
+
+    def test_response_items_import_is_lazy(self):
+        result = run_import(
+            "import MagisterPy.response_items, MagisterPy.compact_items, MagisterPy.schedule_cache")
+        self.assertEqual(result["loaded"], [])
+        self.assertLess(result["duration"], MAX_IMPORT_SECONDS)
+
+    def test_session_loads_the_http_stack(self):
+        result = run_import("from MagisterPy import MagisterSession")
+        self.assertIn("requests", result["loaded"])
+        self.assertNotIn("bs4", result["loaded"])
+
+    def test_lazy_attributes(self):
+        import MagisterPy
+        self.assertIs(MagisterPy.Lesson, MagisterPy.response_items.Lesson)
+        self.assertIn("MagisterSession", dir(MagisterPy))
+        for name in MagisterPy.__all__:
+            self.assertIsNotNone(getattr(MagisterPy, name), name)
+        with self.assertRaises(AttributeError):
+            MagisterPy.not_an_attribute
+
+
+if __name__ == "__main__":
+    unittest.main()
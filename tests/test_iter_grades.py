@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, Grade, FetchError
+
+GRADES = [Grade({"kolomId": kolom_id}) for kolom_id in range(250)]
+
+
+class PagedSession(MagisterSession):
+    def __init__(self):
+        super().__init__()
+        self.requested_skips = []
+        self.lock = threading.Lock()
+        self.failing_skips = set()
+
+    def get_grades(self, top=25, skip=0):
+        with self.lock:
+            self.requested_skips.append(skip)
+        if skip in self.failing_skips:
+            # what get_grades returns when error_handler handled the error
+            return None
+        return GRADES[skip:skip + top]
+
+
+class TestIterGrades(unittest.TestCase):
+    def test_iterates_over_all_pages(self):
+        session = PagedSession()
+        grades = list(session.iter_grades(page_size=100, prefetch=1))
+        self.assertEqual([grade.get_id() for grade in grades], list(range(250)))
+        # stops after the short page, at most one page was prefetched beyond it
+        self.assertLessEqual(max(session.requested_skips), 300)
+
+    def test_is_lazy(self):
+        session = PagedSession()
+        grades = session.iter_grades(page_size=10, prefetch=2)
+        self.assertEqual(next(grades).get_id(), 0)
+        grades.close()
+        self.assertLessEqual(len(session.requested_skips), 4)
+
+    def test_exact_multiple_of_page_size(self):
+        session = PagedSession()
+        grades = list(session.iter_grades(page_size=50, prefetch=0))
+        self.assertEqual(len(grades), 250)
+
+    def test_failed_page_raises(self):
+        session = PagedSession()
+        session.failing_skips.add(100)
+        grades = session.iter_grades(page_size=100, prefetch=0)
+        self.assertEqual(len([next(grades) for _ in range(100)]), 100)
+        with self.assertRaises(FetchError):
+            next(grades)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '../')))  # NOQA
 import json
 import unittest
-from MagisterPy import JsParser
+from MagisterPy import JsParser, AuthcodeError, AuthcodeScanner, LoginRequestsSender
 logging.basicConfig(level=logging.INFO)
 
 # Replace with the actual module name where JsParser is defined
@@ -24,6 +24,118 @@ class TestJsParser(unittest.TestCase):
 
                 self.assertEqual(True, True)
 
+    def test_fast_path_matches_legacy_parser(self):
+        directory = os.path.join(os.path.dirname(__file__), "test_javascripts")
+        for filename in os.listdir(directory):
+            with open(os.path.join(directory, filename), "rb") as file:
+                content = file.read()
+            legacy_authcode = self.parser.get_authcode_slow(content.decode())
+            self.assertTrue(legacy_authcode)
+            self.assertEqual(self.parser.get_authcode_fast(content), legacy_authcode)
+            self.assertEqual(self.parser.get_authcode_fast(content.decode()), legacy_authcode)
+            self.assertEqual(self.parser.get_authcode_from_js(content), legacy_authcode)
+
+    def test_fast_path(self):
+        content = b'var x=1;(a=["6380e4","5e80d5bb","c0f3a31a","306157f0"],["0","1"].map((function(t){return a[t]}))'
+        self.assertEqual(self.parser.get_authcode_fast(content), "6380e45e80d5bb")
+        self.assertIsNone(self.parser.get_authcode_fast(b"no authcode here"))
+
+    def test_scanner_with_different_chunk_sizes(self):
+        directory = os.path.join(os.path.dirname(__file__), "test_javascripts")
+        for filename in os.listdir(directory):
+            with open(os.path.join(directory, filename), "rb") as file:
+                content = file.read()
+            expected = self.parser.get_authcode_fast(content)
+            for chunk_size in (1000, 4096, 65536, len(content)):
+                chunks = [content[start:start + chunk_size]
+                          for start in range(0, len(content), chunk_size)]
+                scanner = AuthcodeScanner()
+                for chunk in chunks:
+                    if scanner.feed(chunk) is not None:
+                        break
+                self.assertEqual(scanner.finish(), expected)
+                # the chunks after the marker are never read
+                self.assertLess(scanner.bytes_received, content.find(b"].map((function(t)") + 18 + chunk_size)
+
+    def test_first_marker_is_used(self):
+        content = (b'(a=["6380e4","5e80d5bb"],["0"].map((function(t){return a[t]}));' +
+                   b'(b=["c0f3a31a","306157f0"],["1"].map((function(t){return b[t]}))')
+        self.assertEqual(self.parser.get_authcode_fast(content), "6380e4")
+        self.assertEqual(self.parser.get_authcode_slow(content.decode()), "6380e4")
+        self.assertEqual(self.parser.get_authcode_from_stream([content[:40], content[40:]]), "6380e4")
+
+    def test_scanner_keeps_only_the_window_for_the_slow_parser(self):
+        # the arrays aren't separated by a comma, so only the slow parser finds them
+        content = b"x" * 5000 + b'(a=["6380e4","5e80d5bb"];["1"].map((function(t){return a[t]}))' + b"y" * 5000
+        self.assertIsNone(self.parser.get_authcode_fast(content))
+        scanner = AuthcodeScanner()
+        for start in range(0, len(content), 1000):
+            scanner.feed(content[start:start + 1000])
+            if scanner.done:
+                break
+        self.assertEqual(scanner.bytes_received, 6000)
+        self.assertEqual(scanner.finish(), "5e80d5bb")
+
+    def test_marker_split_between_chunks(self):
+        content = b"x" * 1000 + b'(a=["6380e4","5e80d5bb"],["1","0"].map((function(t){return a[t]}))' + b"y" * 1000
+        split = content.find(b".map(")
+        self.assertEqual(self.parser.get_authcode_from_stream(
+            [content[:split], content[split:split + 3], content[split + 3:]]), "5e80d5bb6380e4")
+
+    def test_streaming_response_is_closed(self):
+        content = b'(a=["6380e4","5e80d5bb"],["0"].map((function(t){return a[t]}))' + b"y" * 100000
+        read_chunks = []
+
+        class FakeResponse():
+            closed = False
+
+            def iter_content(self, chunk_size):
+                for start in range(0, len(content), chunk_size):
+                    read_chunks.append(start)
+                    yield content[start:start + chunk_size]
+
+            def close(self):
+                self.closed = True
+
+        response = FakeResponse()
+        self.assertEqual(LoginRequestsSender().extract_dynamic_authcode_streaming(
+            response, chunk_size=1024), "6380e4")
+        self.assertTrue(response.closed)
+        self.assertEqual(len(read_chunks), 1)
+
+    def test_scanner_falls_back_to_slow_parser(self):
+        scanner = AuthcodeScanner()
+        self.assertIsNone(scanner.feed(b"no authcode here"))
+        self.assertFalse(scanner.done)
+        with self.assertRaises(AuthcodeError):
+            scanner.finish()
+
+        scanner = AuthcodeScanner(keep_content=True)
+        scanner.feed(b"no authcode here")
+        with self.assertRaises(AuthcodeError):
+            scanner.finish()
+
+    def test_scanner_with_invalid_arrays(self):
+        # the arrays match the fast scan but aren't json, feed falls back to the slow parser instead of raising
+        content = b'(a=[x,y],["0","1"].map((function(t){return a[t]}))'
+        scanner = AuthcodeScanner()
+        self.assertIsNone(scanner.feed(content))
+        self.assertTrue(scanner.done)
+        with self.assertRaises(AuthcodeError):
+            scanner.finish()
+        with self.assertRaises(AuthcodeError):
+            self.parser.get_authcode_from_stream([content])
+
+        # an index that is out of range
+        scanner = AuthcodeScanner()
+        scanner.feed(b'(a=["6380e4"],["3"].map((function(t){return a[t]}))')
+        with self.assertRaises(AuthcodeError):
+            scanner.finish()
+
+    def test_invalid_bundle(self):
+        with self.assertRaises(AuthcodeError):
+            self.parser.get_authcode_from_js(b"no authcode here")
+
 
 if __name__ == "__main__":
     unittest.main()
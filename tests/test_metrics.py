@@ -0,0 +1,201 @@
+import unittest
+import urllib.request
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, AuthcodeCache, ScheduleCache, MetricsRegistry, MetricsServer, default_metrics_registry
+from MagisterPy.magister_errors import ConnectionError
+from MagisterPy.metrics import PROMETHEUS_CONTENT_TYPE
+from MagisterPy.simulator import MagisterSimulator, SimulatorAdapter
+
+SCHOOL, USERNAME, PASSWORD = "Simulated School", "student1", "password"
+TENANT = "simulatedschool.magister.net"
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge(self):
+        counter = self.registry.counter("requests_total", "Requests", ("method",))
+        counter.inc(method="GET")
+        counter.inc(2, method="GET")
+        self.assertEqual(counter.get(method="GET"), 3)
+        self.assertEqual(counter.get(method="POST"), 0)
+        with self.assertRaises(ValueError):
+            counter.inc(-1, method="GET")
+
+        gauge = self.registry.gauge("running")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertEqual(gauge.get(), 1)
+        gauge.set(5)
+        self.assertEqual(gauge.get(), 5)
+
+    def test_labels_are_checked(self):
+        counter = self.registry.counter("requests_total", label_names=("method",))
+        with self.assertRaises(ValueError):
+            counter.inc()
+        with self.assertRaises(ValueError):
+            counter.inc(status="200")
+        with self.assertRaises(ValueError):
+            self.registry.counter("invalid name")
+        with self.assertRaises(ValueError):
+            self.registry.histogram("duration", label_names=("le",))
+
+    def test_metrics_are_shared_by_name(self):
+        counter = self.registry.counter("requests_total", label_names=("method",))
+        self.assertIs(self.registry.counter("requests_total", label_names=("method",)), counter)
+        self.assertIs(self.registry.get("requests_total"), counter)
+        with self.assertRaises(ValueError):
+            self.registry.gauge("requests_total", label_names=("method",))
+        with self.assertRaises(ValueError):
+            self.registry.counter("requests_total", label_names=("status",))
+
+    def test_histogram(self):
+        histogram = self.registry.histogram("duration_seconds", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.get_count(), 4)
+        self.assertAlmostEqual(histogram.get_sum(), 3.65)
+
+    def test_prometheus_text(self):
+        self.registry.counter("requests_total", "The \\ requests\nsent", ("path",)).inc(path='a"b\\c')
+        self.registry.gauge("running").set(1.5)
+        histogram = self.registry.histogram("duration_seconds", "Durations", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(2)
+        self.assertEqual(self.registry.to_prometheus_text(), "\n".join([
+            "# HELP duration_seconds Durations",
+            "# TYPE duration_seconds histogram",
+            'duration_seconds_bucket{le="0.1"} 1',
+            'duration_seconds_bucket{le="1"} 2',
+            'duration_seconds_bucket{le="+Inf"} 3',
+            "duration_seconds_sum 2.55",
+            "duration_seconds_count 3",
+            "# HELP requests_total The \\\\ requests\\nsent",
+            "# TYPE requests_total counter",
+            'requests_total{path="a\\"b\\\\c"} 1',
+            "# TYPE running gauge",
+            "running 1.5",
+        ]) + "\n")
+
+        self.registry.clear()
+        self.assertNotIn("requests_total{", self.registry.to_prometheus_text())
+        self.assertEqual(MetricsRegistry().to_prometheus_text(), "")
+
+    def test_server(self):
+        self.registry.counter("requests_total").inc()
+        with MetricsServer(self.registry) as server:
+            with urllib.request.urlopen(server.url) as response:
+                self.assertEqual(response.headers["Content-Type"], PROMETHEUS_CONTENT_TYPE)
+                self.assertEqual(response.read().decode(), self.registry.to_prometheus_text())
+
+
+class TestSessionMetrics(unittest.TestCase):
+    def setUp(self):
+        self.simulator = MagisterSimulator()
+        self.registry = MetricsRegistry()
+
+    def make_session(self, **kwargs):
+        kwargs.setdefault("authcode_cache", AuthcodeCache())
+        kwargs.setdefault("delay_between_relogin_atempts", 0)
+        kwargs.setdefault("enable_metrics", True)
+        return MagisterSession(http_adapter=SimulatorAdapter(self.simulator), metrics_registry=self.registry, **kwargs)
+
+    def get(self, name, **labels):
+        return self.registry.get(name).get(**labels)
+
+    def test_login_and_fetch(self):
+        session = self.make_session()
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        session.get_grades(top=5)
+        session.get_grades(top=5)
+        self.assertEqual(self.get("magister_calls_total", tenant=TENANT, method="login", result="ok"), 1)
+        self.assertEqual(self.get("magister_calls_total", tenant=TENANT, method="get_grades", result="ok"), 2)
+        self.assertEqual(self.registry.get("magister_call_duration_seconds").get_count(
+            tenant=TENANT, method="get_grades"), 2)
+        self.assertEqual(self.get("magister_authcode_cache_total", result="miss"), 1)
+
+        self.make_session(authcode_cache=session.authcode_cache).login(SCHOOL, USERNAME, PASSWORD)
+        self.assertEqual(self.get("magister_authcode_cache_total", result="hit"), 1)
+
+    def test_errors_are_counted(self):
+        session = self.make_session(enable_automatic_relogin=False)
+        self.assertFalse(session.login(SCHOOL, USERNAME, "wrong password"))
+        self.assertEqual(self.get("magister_errors_total", tenant=SCHOOL, method="input_password",
+                                  error="IncorrectCredentials"), 1)
+        self.assertEqual(self.get("magister_calls_total", tenant=SCHOOL, method="input_password", result="error"), 1)
+
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.simulator.inject_errors(1)
+        self.assertIsNone(session.get_grades(top=1))
+        self.assertEqual(self.get("magister_errors_total", tenant=TENANT, method="get_grades", error="FetchError"), 1)
+        self.assertEqual(self.get("magister_session_expirations_total", tenant=TENANT), 0)
+
+    def test_expired_session_relogs_in(self):
+        session = self.make_session()
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.simulator.expire_tokens()
+        self.assertEqual(len(session.get_grades(top=5)), 5)
+
+        self.assertEqual(self.get("magister_session_expirations_total", tenant=TENANT), 1)
+        self.assertEqual(self.get("magister_relogins_total", tenant=TENANT, result="success"), 1)
+        self.assertEqual(self.get("magister_relogin_attempts_total", tenant=TENANT, result="success"), 1)
+        self.assertEqual(self.get("magister_relogins_in_progress", tenant=TENANT), 0)
+        self.assertEqual(self.get("magister_errors_total", tenant=TENANT, method="get_grades", error="FetchError"), 1)
+        self.assertEqual(self.get("magister_calls_total", tenant=TENANT, method="get_grades", result="relogin"), 1)
+        self.assertEqual(self.get("magister_calls_total", tenant=TENANT, method="get_grades", result="ok"), 1)
+        self.assertEqual(self.get("magister_calls_total", tenant=TENANT, method="login", result="ok"), 2)
+
+    def test_failed_relogin(self):
+        session = self.make_session(max_relogin_atempts=2)
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.simulator.expire_tokens()
+        with mock.patch.object(session, "login", return_value=False), self.assertRaises(ConnectionError):
+            session.get_grades(top=5)
+        self.assertEqual(self.get("magister_relogins_total", tenant=TENANT, result="failure"), 1)
+        self.assertEqual(self.get("magister_relogin_attempts_total", tenant=TENANT, result="failure"), 2)
+        self.assertEqual(self.get("magister_relogins_in_progress", tenant=TENANT), 0)
+
+    def test_schedule_cache(self):
+        session = self.make_session(schedule_cache=ScheduleCache())
+        session.login(SCHOOL, USERNAME, PASSWORD)
+        session.get_schedule("2024-11-04", "2024-11-08")
+        session.get_schedule("2024-11-05", "2024-11-06")
+        session.get_schedule("2024-11-05", "2024-11-06", force_refresh=True)
+        self.assertEqual([self.get("magister_schedule_cache_total", result=result) for result in ("miss", "hit", "refresh")],
+                         [1, 1, 1])
+
+    def test_metrics_can_be_disabled(self):
+        session = self.make_session(enable_metrics=False)
+        self.assertIsNone(session.metrics)
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.assertEqual(self.registry.to_prometheus_text(), "")
+
+    def test_default_registry(self):
+        session = MagisterSession(http_adapter=SimulatorAdapter(self.simulator), authcode_cache=AuthcodeCache(),
+                                  enable_metrics=True)
+        self.assertIs(session.metrics.registry, default_metrics_registry)
+
+    def test_metrics_are_off_by_default(self):
+        session = MagisterSession(http_adapter=SimulatorAdapter(self.simulator), authcode_cache=AuthcodeCache())
+        self.assertIsNone(session.metrics)
+
+    def test_registry_turns_the_metrics_on(self):
+        session = MagisterSession(http_adapter=SimulatorAdapter(self.simulator), authcode_cache=AuthcodeCache(),
+                                  metrics_registry=self.registry)
+        self.assertIs(session.metrics.registry, self.registry)
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.assertIn('magister_calls_total{tenant="Simulated School",method="input_school",result="ok"} 1',
+                      self.registry.to_prometheus_text())
+        # unless they are turned off explicitly
+        self.assertIsNone(MagisterSession(metrics_registry=self.registry, enable_metrics=False).metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import sys
+import os
+from unittest import mock
+import requests
+import urllib3
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, AuthorizedRequestSender, LoginRequestsSender
+from MagisterPy import request_manager
+
+
+def make_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b""
+    response._content_consumed = True
+    return response
+
+
+class TestAuthorizedRequestSender(unittest.TestCase):
+    def setUp(self):
+        self.magister_session = MagisterSession()
+        self.magister_session.app_auth_token = "Bearer token"
+        self.magister_session.session.request = mock.Mock(
+            return_value=make_response(200))
+
+    def test_sends_one_request(self):
+        response = AuthorizedRequestSender.send_authorized_request(magister_session=self.magister_session,
+                                                                   url="https://school.magister.net/api/accounts/1", method="PUT",
+                                                                   params={"a": 1}, json={"b": 2}, extra_headers={"x": "y"})
+        self.assertEqual(response.status_code, 200)
+        self.magister_session.session.request.assert_called_once()
+        kwargs = self.magister_session.session.request.call_args.kwargs
+        self.assertEqual(kwargs["method"], "PUT")
+        self.assertEqual(kwargs["params"], {"a": 1})
+        self.assertEqual(kwargs["json"], {"b": 2})
+        self.assertEqual(kwargs["headers"], {
+                         "authorization": "Bearer token", "x": "y"})
+
+    @mock.patch("time.sleep")
+    def test_retries(self, sleep):
+        self.magister_session.session.request.side_effect = [
+            requests.exceptions.ConnectionError(), make_response(503), make_response(200)]
+        response = AuthorizedRequestSender.send_authorized_request(magister_session=self.magister_session,
+                                                                   url="https://school.magister.net/api/accounts/1", retries=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.magister_session.session.request.call_count, 3)
+
+    @mock.patch("time.sleep")
+    def test_retry_delays_are_jittered(self, sleep):
+        self.magister_session.session.request.return_value = make_response(503)
+        with mock.patch("random.uniform", return_value=0.1) as uniform:
+            AuthorizedRequestSender.send_authorized_request(magister_session=self.magister_session,
+                                                            url="https://school.magister.net/api/accounts/1", retries=2)
+        self.assertEqual([call.args for call in uniform.call_args_list], [(0, 0.5), (0, 1.0)])
+        self.assertEqual([call.args for call in sleep.call_args_list], [(0.1,), (0.1,)])
+
+    def test_timeout_is_handled(self):
+        self.magister_session = MagisterSession(request_timeout=1, automatically_handle_errors=True)
+        self.magister_session.app_auth_token = "Bearer token"
+        self.magister_session.api_url = "https://school.magister.net/api"
+        self.magister_session.session.request = mock.Mock(side_effect=requests.exceptions.ReadTimeout())
+        with mock.patch.object(self.magister_session, "relogin") as relogin:
+            self.assertIsNone(self.magister_session.get_grades(top=1))
+        relogin.assert_not_called()
+        self.assertEqual(self.magister_session.session.request.call_args.kwargs["timeout"], 1)
+
+    @mock.patch("time.sleep")
+    def test_post_is_only_retried_before_it_is_sent(self, sleep):
+        url = "https://school.magister.net/api/accounts/1"
+        self.magister_session.session.request.side_effect = [requests.exceptions.ReadTimeout()]
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            AuthorizedRequestSender.send_authorized_request(
+                magister_session=self.magister_session, url=url, method="POST", retries=2)
+        self.magister_session.session.request.side_effect = [make_response(503)]
+        self.assertEqual(AuthorizedRequestSender.send_authorized_request(
+            magister_session=self.magister_session, url=url, method="POST", retries=2).status_code, 503)
+        self.assertEqual(self.magister_session.session.request.call_count, 2)
+
+        connection_error = requests.exceptions.ConnectionError(urllib3.exceptions.MaxRetryError(
+            None, url, urllib3.exceptions.NewConnectionError(None, "refused")))
+        self.magister_session.session.request.side_effect = [
+            connection_error, requests.exceptions.ConnectTimeout(), make_response(200)]
+        self.assertEqual(AuthorizedRequestSender.send_authorized_request(
+            magister_session=self.magister_session, url=url, method="POST", retries=2).status_code, 200)
+        self.assertEqual(self.magister_session.session.request.call_count, 5)
+
+    @mock.patch("time.sleep")
+    def test_put_is_retried(self, sleep):
+        self.magister_session.session.request.side_effect = [requests.exceptions.ReadTimeout(), make_response(200)]
+        self.assertEqual(AuthorizedRequestSender.send_authorized_request(
+            magister_session=self.magister_session, url="https://school.magister.net/api/accounts/1",
+            method="PUT", retries=1).status_code, 200)
+
+    def test_no_retries_by_default(self):
+        self.magister_session.session.request.return_value = make_response(503)
+        response = AuthorizedRequestSender.send_authorized_request(magister_session=self.magister_session,
+                                                                   url="https://school.magister.net/api/accounts/1")
+        self.assertEqual(response.status_code, 503)
+        self.magister_session.session.request.assert_called_once()
+
+
+LOGIN_PAGE = """<!doctype html><html lang="nl"><head><meta charset="utf-8"><title>Magister</title>
+<!-- <script defer="defer" src="js/commented.js"></script> -->
+<script src="js/runtime.js"></script><script defer src="js/bare-defer.js"></script>
+<link href="css/app.css" rel="stylesheet"></head>
+<body><div id="root"></div><script defer="defer" src="js/account-56c22c13622e321fb1f1.js"></script>
+<script defer="defer" src="js/vendor.js"></script></body></html>"""
+
+
+class TestExtractRedirectUrl(unittest.TestCase):
+    def setUp(self):
+        self.request_sender = LoginRequestsSender()
+
+    def test_finds_the_deferred_script(self):
+        self.assertEqual(self.request_sender.extract_redirect_url_from_html(LOGIN_PAGE),
+                         "js/account-56c22c13622e321fb1f1.js")
+
+    def test_no_script(self):
+        self.assertIsNone(self.request_sender.extract_redirect_url_from_html(
+            "<html><body></body></html>"))
+        self.assertIsNone(request_manager.find_deferred_script_src(
+            '<script defer="defer"></script>'))
+
+    def test_falls_back_to_bs4(self):
+        with mock.patch.object(request_manager, "find_deferred_script_src", return_value=None), \
+                mock.patch.object(request_manager, "find_deferred_script_src_bs4", return_value="js/bs4.js") as bs4_finder:
+            self.assertEqual(self.request_sender.extract_redirect_url_from_html(LOGIN_PAGE), "js/bs4.js")
+        bs4_finder.assert_called_once_with(LOGIN_PAGE)
+
+    def test_matches_bs4(self):
+        try:
+            import bs4  # NOQA
+        except ImportError:
+            self.skipTest("bs4 is not installed")
+        for page in (LOGIN_PAGE, "<html></html>", '<script defer="defer"></script><script defer="defer" src="a.js">'):
+            self.assertEqual(request_manager.find_deferred_script_src(page),
+                             request_manager.find_deferred_script_src_bs4(page))
+
+
+if __name__ == "__main__":
+    unittest.main()
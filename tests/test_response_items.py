@@ -1,4 +1,5 @@
 import unittest
+import datetime
 import sys
 import os
 sys.path.insert(0, os.path.abspath(
@@ -51,6 +52,10 @@ class TestLesson(unittest.TestCase):
     def test_get_description(self):
         self.assertEqual(self.lesson.get_description(), "Math")
 
+    def test_has_cancelled_status(self):
+        self.assertFalse(self.lesson.has_cancelled_status())
+        self.assertTrue(Lesson(dict(self.valid_json, Status=5)).has_cancelled_status())
+
 
 class TestGrade(unittest.TestCase):
     def setUp(self):
@@ -83,6 +88,18 @@ class TestGrade(unittest.TestCase):
     def test_get_id(self):
         self.assertEqual(self.grade.get_id(), 1)
 
+    def test_get_numeric_value(self):
+        self.assertIsNone(self.grade.get_numeric_value())
+        self.assertEqual(Grade({"waarde": "7,5"}).get_numeric_value(), 7.5)
+        self.assertEqual(Grade({"waarde": " 10 "}).get_numeric_value(), 10.0)
+        self.assertIsNone(Grade({}).get_numeric_value())
+
+    def test_is_counted(self):
+        self.assertTrue(self.grade.is_counted())
+        self.assertFalse(self.grade.has_exemption())
+        self.assertFalse(Grade({"teltMee": False}).is_counted())
+        self.assertTrue(Grade({}).is_counted())
+
 
 
 class TestPersonProfile(unittest.TestCase):
@@ -165,5 +182,40 @@ class TestAccountProfile(unittest.TestCase):
         self.assertFalse(AccountProfile(invalid_data).is_valid())
 
 
+class TestDatetimes(unittest.TestCase):
+    def test_parse_datetime(self):
+        utc = datetime.timezone.utc
+        self.assertEqual(parse_datetime("2024-04-02T06:00:00.0000000Z"),
+                         datetime.datetime(2024, 4, 2, 6, 0, tzinfo=utc))
+        self.assertEqual(parse_datetime("2024-04-02T06:00:00.1234567Z").microsecond, 123456)
+        self.assertEqual(parse_datetime("2024-04-02"),
+                         datetime.datetime(2024, 4, 2, tzinfo=utc))
+        self.assertEqual(parse_datetime("2024-04-02T08:00:00+02:00"),
+                         datetime.datetime(2024, 4, 2, 6, 0, tzinfo=utc))
+        with self.assertRaises(ValueError):
+            parse_datetime("yesterday")
+
+    def test_lesson_datetimes_are_cached(self):
+        lesson = Lesson({"Start": "2024-04-02T06:00:00.0000000Z", "Einde": "2024-04-02T06:50:00.0000000Z"})
+        start = lesson.get_start_datetime()
+        self.assertIs(lesson.get_start_datetime(), start)
+        self.assertEqual(lesson.get_end_datetime() - start, datetime.timedelta(minutes=50))
+
+        lesson["Start"] = "2024-04-02T07:00:00.0000000Z"
+        self.assertEqual(lesson.get_start_datetime().hour, 7)
+
+    def test_missing_datetime(self):
+        self.assertIsNone(Lesson({}).get_start_datetime())
+        self.assertIsNone(Grade({}).get_entered_datetime())
+
+    def test_parse_datetimes(self):
+        lessons = [Lesson({"Start": "2024-04-02T06:00:00Z", "Einde": "2024-04-02T06:50:00Z"}) for _ in range(3)]
+        grades = [Grade({"ingevoerdOp": "2024-04-03T12:00:00Z"})]
+        self.assertEqual(parse_datetimes(lessons + grades), lessons + grades)
+        # the lessons with the same timestamps share the parsed datetime
+        self.assertIs(lessons[0].get_start_datetime(), lessons[2].get_start_datetime())
+        self.assertEqual(grades[0].get_entered_datetime().day, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import time
+from unittest import mock
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, RetryPolicy, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, ConnectionError, AuthcodeCache
+from MagisterPy.simulator import MagisterSimulator, SimulatorAdapter
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_full_jitter(self):
+        retry_policy = RetryPolicy(base_delay=1, max_delay=10)
+        for atempt in range(10):
+            delay = retry_policy.get_delay(atempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(10, 2 ** atempt))
+
+    def test_without_jitter(self):
+        retry_policy = RetryPolicy(base_delay=1, max_delay=10, jitter=False)
+        self.assertEqual([retry_policy.get_delay(atempt)
+                         for atempt in range(5)], [1, 2, 4, 8, 10])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_failures(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        circuit_breaker.record_failure()
+        self.assertTrue(circuit_breaker.allow_request())
+        circuit_breaker.record_failure()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(circuit_breaker.allow_request())
+
+    def test_half_open(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        circuit_breaker.record_failure()
+        time.sleep(0.06)
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.HALF_OPEN)
+        # only one trial atempt is let through
+        self.assertTrue(circuit_breaker.allow_request())
+        self.assertFalse(circuit_breaker.allow_request())
+        circuit_breaker.record_success()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    def test_release_ends_the_trial(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        circuit_breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(circuit_breaker.allow_request())
+        circuit_breaker.release()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(circuit_breaker.allow_request())
+
+
+class TestRelogin(unittest.TestCase):
+    def setUp(self):
+        self.retry_policy = RetryPolicy(
+            base_delay=0, circuit_breakers=CircuitBreakerRegistry(failure_threshold=3))
+        self.session = MagisterSession(
+            max_relogin_atempts=2, retry_policy=self.retry_policy)
+        self.session._MagisterSession__school_name = "school"
+        self.session._MagisterSession__username = "user"
+        self.session._MagisterSession__password = "password"
+        self.session.api_url = "https://school.magister.net/api"
+        self.session.login = mock.Mock(return_value=False)
+
+    def test_atempts_are_reset(self):
+        with self.assertRaises(ConnectionError):
+            self.session.relogin()
+        self.assertEqual(self.session.login.call_count, 2)
+        self.assertEqual(self.session.relogin_atempts, 2)
+
+    def test_incorrect_credentials_dont_open_the_circuit(self):
+        for _ in range(3):
+            with self.assertRaises(ConnectionError) as context:
+                self.session.relogin()
+            self.assertNotIsInstance(context.exception, CircuitOpenError)
+        self.assertEqual(self.session.login.call_count, 6)
+        self.assertEqual(self.retry_policy.get_circuit_breaker(
+            "school.magister.net").state, CircuitBreaker.CLOSED)
+
+    def test_server_errors_open_the_circuit(self):
+        simulator = MagisterSimulator()
+        session = MagisterSession(http_adapter=SimulatorAdapter(simulator), authcode_cache=AuthcodeCache(),
+                                  max_relogin_atempts=2, retry_policy=self.retry_policy)
+        self.assertTrue(session.login("Simulated School", "student1", "password"))
+        simulator.inject_errors(100, status=503)
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                session.relogin()
+        with self.assertRaises(CircuitOpenError):
+            session.relogin()
+
+    def test_trial_is_released_after_an_interrupt(self):
+        circuit_breaker = self.retry_policy.get_circuit_breaker("school.magister.net")
+        circuit_breaker.reset_timeout = 0
+        for _ in range(3):
+            circuit_breaker.record_failure()
+        self.session.login = mock.Mock(side_effect=KeyboardInterrupt)
+        with self.assertRaises(KeyboardInterrupt):
+            self.session.relogin()
+        self.assertTrue(circuit_breaker.allow_request())
+
+
+if __name__ == "__main__":
+    unittest.main()
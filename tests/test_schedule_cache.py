@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+import time
+from datetime import date
+from unittest import mock
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, ScheduleCache, Lesson
+
+
+def make_lesson(lesson_id, day, end_day=None):
+    return Lesson({"Id": lesson_id, "Start": f"{day}T08:00:00.0000000Z", "Einde": f"{end_day or day}T09:00:00.0000000Z"})
+
+
+class TestScheduleCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ScheduleCache()
+        self.cache.store(1, "2024-11-04", "2024-11-08", [make_lesson(10, "2024-11-04"),
+                                                         make_lesson(11, "2024-11-06")])
+
+    def test_missing_ranges(self):
+        self.assertEqual(self.cache.get_missing_ranges(1, "2024-11-04", "2024-11-08"), [])
+        self.assertEqual(self.cache.get_missing_ranges(1, "2024-11-01", "2024-11-10"),
+                         [(date(2024, 11, 1), date(2024, 11, 3)), (date(2024, 11, 9), date(2024, 11, 10))])
+        # the cache is per person and per with_changes
+        self.assertEqual(self.cache.get_missing_ranges(2, "2024-11-04", "2024-11-04"),
+                         [(date(2024, 11, 4), date(2024, 11, 4))])
+        self.assertEqual(len(self.cache.get_missing_ranges(
+            1, "2024-11-04", "2024-11-04", with_changes=True)), 1)
+
+    def test_get(self):
+        self.assertEqual([lesson.get_id() for lesson in self.cache.get(1, "2024-11-04", "2024-11-08")], [10, 11])
+        self.assertEqual([lesson.get_id() for lesson in self.cache.get(1, "2024-11-05", "2024-11-06")], [11])
+
+    def test_store_replaces_range(self):
+        self.cache.store(1, "2024-11-06", "2024-11-06", [make_lesson(12, "2024-11-06")])
+        self.assertEqual([lesson.get_id() for lesson in self.cache.get(1, "2024-11-04", "2024-11-08")], [10, 12])
+
+    def test_multi_day_lesson(self):
+        self.cache.store(1, "2024-11-11", "2024-11-15", [make_lesson(20, "2024-11-11", "2024-11-13")])
+        self.assertEqual([lesson.get_id() for lesson in self.cache.get(1, "2024-11-12", "2024-11-12")], [20])
+
+    def test_ttl(self):
+        cache = ScheduleCache(ttl=0)
+        cache.store(1, "2024-11-04", "2024-11-04", [])
+        self.assertEqual(len(cache.get_missing_ranges(1, "2024-11-04", "2024-11-04")), 1)
+
+    def test_expired_days_are_evicted(self):
+        cache = ScheduleCache(ttl=60)
+        with mock.patch("time.time", return_value=1000):
+            cache.store(1, "2024-11-04", "2024-11-08", [make_lesson(10, "2024-11-04")])
+        with mock.patch("time.time", return_value=1100):
+            cache.store(2, "2024-11-04", "2024-11-04", [])
+        # the days of person 1 are gone, not only hidden
+        self.assertEqual(cache.get(1, "2024-11-04", "2024-11-08"), [])
+        self.assertEqual(len(cache._ScheduleCache__schedules), 1)
+
+    @unittest.skipUnless(hasattr(time, "tzset"), "time.tzset is not available")
+    def test_lessons_are_indexed_by_their_local_date(self):
+        # runs after the environment is restored
+        self.addCleanup(time.tzset)
+        with mock.patch.dict(os.environ, {"TZ": "Europe/Amsterdam"}):
+            time.tzset()
+            # 23:30 UTC is already the next day in the Netherlands
+            self.cache.store(1, "2024-11-11", "2024-11-15", [Lesson({"Id": 30, "Start": "2024-11-11T23:30:00.0000000Z",
+                                                                     "Einde": "2024-11-12T00:15:00.0000000Z"})])
+            self.assertEqual(self.cache.get(1, "2024-11-11", "2024-11-11"), [])
+            self.assertEqual([lesson.get_id() for lesson in self.cache.get(1, "2024-11-12", "2024-11-12")], [30])
+
+    def test_invalidate(self):
+        self.cache.invalidate(1)
+        self.assertEqual(self.cache.get(1, "2024-11-04", "2024-11-08"), [])
+
+
+class TestCachedGetSchedule(unittest.TestCase):
+    def setUp(self):
+        self.session = MagisterSession(schedule_cache=ScheduleCache())
+        self.session.app_auth_token = "Bearer token"
+        self.session.person_id = 1
+        self.fetch_schedule = mock.Mock(
+            side_effect=lambda _from, to, with_changes: [make_lesson(int(_from[-2:]), _from)])
+        self.session._MagisterSession__fetch_schedule = self.fetch_schedule
+
+    def test_only_missing_ranges_are_fetched(self):
+        self.session.get_schedule("2024-11-04", "2024-11-08")
+        lessons = self.session.get_schedule("2024-11-06", "2024-11-12")
+        self.assertEqual([call.kwargs["_from"] for call in self.fetch_schedule.call_args_list],
+                         ["2024-11-04", "2024-11-09"])
+        self.assertEqual([lesson.get_id() for lesson in lessons], [9])
+
+    def test_force_refresh(self):
+        self.session.get_schedule("2024-11-04", "2024-11-08")
+        self.session.get_schedule("2024-11-04", "2024-11-08", force_refresh=True)
+        self.assertEqual(self.fetch_schedule.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
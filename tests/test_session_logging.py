@@ -0,0 +1,124 @@
+import unittest
+import io
+import logging
+import queue
+import threading
+import sys
+import os
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, AuthcodeCache, QueueLogging
+from MagisterPy.session_logging import NonBlockingQueueHandler, package_logger, session_logger
+from MagisterPy.simulator import MagisterSimulator, SimulatorAdapter
+
+SCHOOL, USERNAME, PASSWORD = "Simulated School", "student1", "password"
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.current_thread().name)
+
+
+class TestSessionLogging(unittest.TestCase):
+    def setUp(self):
+        self.simulator = MagisterSimulator()
+
+    def make_session(self, **kwargs):
+        return MagisterSession(http_adapter=SimulatorAdapter(self.simulator), authcode_cache=AuthcodeCache(),
+                               enable_metrics=False, **kwargs)
+
+    def test_records_have_the_session_context(self):
+        session = self.make_session()
+        with self.assertLogs("MagisterPy.session", logging.INFO) as logs:
+            self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        record = [record for record in logs.records if record.getMessage() == "you have successfully logged in!"][0]
+        self.assertEqual(record.tenant, "simulatedschool.magister.net")
+        self.assertEqual(record.account_id, session.account_id)
+        self.assertEqual(record.correlation_id, session.x_correlation_id)
+        self.assertIsNotNone(record.correlation_id)
+        # the record points to the method that logged the message
+        self.assertEqual(record.funcName, "input_password")
+
+    def test_errors_are_warnings(self):
+        session = self.make_session()
+        with self.assertLogs("MagisterPy.session", logging.WARNING) as logs:
+            self.assertFalse(session.login(SCHOOL, USERNAME, "wrong password"))
+        self.assertEqual(logs.records[0].levelno, logging.WARNING)
+        self.assertTrue(logs.records[0].getMessage().startswith("input_password raised IncorrectCredentials"))
+        self.assertEqual(logs.records[0].tenant, SCHOOL)
+
+    def test_enable_logging_prints(self):
+        with redirect_stdout(io.StringIO()) as output:
+            self.make_session(enable_logging=True).login(SCHOOL, USERNAME, PASSWORD)
+        self.assertIn("you have successfully logged in!\n", output.getvalue())
+
+        with redirect_stdout(io.StringIO()) as output:
+            self.make_session().login(SCHOOL, USERNAME, PASSWORD)
+        self.assertEqual(output.getvalue(), "")
+
+    def test_messages_are_formatted_lazily(self):
+        formatted = []
+
+        class Argument():
+            def __str__(self):
+                formatted.append(True)
+                return "argument"
+
+        session = self.make_session()
+        level = session_logger.level
+        session_logger.setLevel(logging.WARNING)
+        try:
+            session._logMessage("message %s", Argument())
+            self.assertEqual(formatted, [])
+            with self.assertLogs("MagisterPy.session", logging.INFO) as logs:
+                session._logMessage("message %s", Argument(), level=logging.WARNING)
+            self.assertEqual(logs.records[0].getMessage(), "message argument")
+        finally:
+            session_logger.setLevel(level)
+
+
+class TestQueueLogging(unittest.TestCase):
+    def test_records_are_handled_in_the_background(self):
+        handler = RecordingHandler()
+        session = MagisterSession(http_adapter=SimulatorAdapter(MagisterSimulator()), authcode_cache=AuthcodeCache())
+        with QueueLogging(handler) as queue_logging:
+            self.assertFalse(package_logger.propagate)
+            session.login(SCHOOL, USERNAME, "wrong password")
+        self.assertTrue(package_logger.propagate)
+        self.assertNotIn(queue_logging.queue_handler, package_logger.handlers)
+        self.assertEqual(handler.records[0].levelno, logging.WARNING)
+        self.assertNotIn(threading.current_thread().name, handler.threads)
+        self.assertEqual(queue_logging.dropped, 0)
+
+    def test_handlers_of_the_logger_are_moved(self):
+        handler = RecordingHandler()
+        package_logger.addHandler(handler)
+        try:
+            with QueueLogging():
+                self.assertNotIn(handler, package_logger.handlers)
+                session_logger.warning("message")
+            self.assertIn(handler, package_logger.handlers)
+        finally:
+            package_logger.removeHandler(handler)
+        self.assertEqual([record.getMessage() for record in handler.records], ["message"])
+        self.assertNotIn(threading.current_thread().name, handler.threads)
+
+    def test_full_queue_drops_records(self):
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        record = logging.LogRecord("MagisterPy", logging.WARNING, __file__, 0, "message %s", ("argument",), None)
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(handler.dropped, 1)
+        # the record is formatted by the handlers on the other side of the queue
+        self.assertEqual(handler.queue.get_nowait().args, ("argument",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSessionPool, RateLimiter
+
+
+class TestMagisterSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = MagisterSessionPool(max_concurrency=4)
+        for key in range(20):
+            self.pool.create_session(key)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_sessions_share_the_adapter(self):
+        adapters = {self.pool[key].session.get_adapter("https://accounts.magister.net")
+                    for key in range(20)}
+        self.assertEqual(adapters, {self.pool.http_adapter})
+
+    def test_map_returns_all_results(self):
+        results = list(self.pool.map(lambda session, value: value, 5))
+        self.assertEqual(sorted(result.key for result in results), list(range(20)))
+        self.assertTrue(all(result.value == 5 for result in results))
+
+    def test_map_returns_errors(self):
+        def fail(session):
+            raise ValueError()
+        results = list(self.pool.map(fail, keys=[0, 1]))
+        self.assertTrue(all(isinstance(result.error, ValueError) for result in results))
+
+    def test_map_checks_the_keys_first(self):
+        calls = []
+        with self.assertRaises(KeyError):
+            self.pool.map(calls.append, keys=[0, 1, "unknown"])
+        self.assertEqual(calls, [])
+
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        running = [0, 0]  # current, maximum
+
+        def call(session):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        list(self.pool.map(call))
+        self.assertLessEqual(running[1], 4)
+
+    def test_completion_order(self):
+        slow_session = self.pool[0]
+
+        def call(session):
+            time.sleep(0.2 if session is slow_session else 0)
+
+        results = [result.key for result in self.pool.map(call)]
+        self.assertEqual(results[-1], 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_rate(self):
+        rate_limiter = RateLimiter(rate=100, burst=1)
+        start = time.monotonic()
+        for _ in range(11):
+            rate_limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import json
+import base64
+from unittest import mock
+import requests
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, InvalidSessionState
+
+try:
+    from cryptography.fernet import Fernet
+except ImportError:
+    Fernet = None
+
+
+def make_token(expiry):
+    payload = base64.urlsafe_b64encode(json.dumps(
+        {"exp": expiry}).encode()).decode().rstrip("=")
+    return f"Bearer header.{payload}.signature"
+
+
+class TestSessionState(unittest.TestCase):
+    def setUp(self):
+        self.session = MagisterSession()
+        self.session.app_auth_token = make_token(1700000000)
+        self.session.app_auth_token_expiry = 1700000000.0
+        self.session.api_url = "https://school.magister.net/api"
+        self.session.person_id = "999001"
+        self.session.account_id = "888222"
+        self.session._MagisterSession__school_name = "school"
+        self.session._MagisterSession__username = "user"
+        self.session._MagisterSession__password = "password"
+        self.session.session.cookies.set(
+            "Magister.Session", "abc", domain="accounts.magister.net", path="/")
+
+    def assert_resumed(self, session):
+        self.assertTrue(session.is_logged_in())
+        self.assertEqual(session.app_auth_token, self.session.app_auth_token)
+        self.assertEqual(session.app_auth_token_expiry, 1700000000.0)
+        self.assertEqual(session.api_url, "https://school.magister.net/api")
+        self.assertEqual(session.person_id, "999001")
+        self.assertEqual(session.account_id, "888222")
+        self.assertEqual(session.session.cookies.get(
+            "Magister.Session", domain="accounts.magister.net"), "abc")
+
+    def test_export_and_resume(self):
+        state = self.session.export_state()
+        self.assertNotIn("password", state)
+        session = MagisterSession.from_state(state)
+        self.assert_resumed(session)
+        self.assertIsNone(session._MagisterSession__password)
+
+    def test_token_expiry(self):
+        self.assertEqual(self.session.request_sender.get_token_expiry(
+            self.session.app_auth_token), 1700000000.0)
+        self.assertIsNone(
+            self.session.request_sender.get_token_expiry("Bearer not-a-jwt"))
+
+    def test_invalid_state(self):
+        with self.assertRaises(InvalidSessionState):
+            MagisterSession.from_state("{}")
+
+    def test_invalid_state_keeps_the_cause(self):
+        with self.assertRaises(InvalidSessionState) as context:
+            MagisterSession.from_state("not json")
+        self.assertIsInstance(context.exception.__cause__, ValueError)
+
+    def test_invalid_kwargs_are_not_a_state_error(self):
+        state = self.session.export_state()
+        with self.assertRaises(TypeError):
+            MagisterSession.from_state(state, unknown_parameter=True)
+
+    def test_plaintext_credentials_need_an_opt_in(self):
+        with self.assertRaises(ValueError):
+            self.session.export_state(include_credentials=True)
+        state = self.session.export_state(include_credentials=True, allow_plaintext_credentials=True)
+        self.assertEqual(json.loads(state)["credentials"]["password"], "password")
+
+    def test_resumed_session_without_password_cant_relogin(self):
+        session = MagisterSession.from_state(self.session.export_state(), delay_between_relogin_atempts=0)
+        self.assertFalse(session.relogin())
+
+        response = requests.Response()
+        response.status_code = 401
+        response._content = b""
+        session.session.request = mock.Mock(return_value=response)
+        with mock.patch.object(session, "login") as login:
+            self.assertIsNone(session.get_grades(top=1))
+        login.assert_not_called()
+
+    @unittest.skipIf(Fernet is None, "cryptography is not installed")
+    def test_encrypted_state(self):
+        key = Fernet.generate_key()
+        state = self.session.export_state(
+            encryption_key=key, include_credentials=True)
+        self.assertNotIn("999001", state)
+
+        session = MagisterSession.from_state(state, encryption_key=key)
+        self.assert_resumed(session)
+        self.assertEqual(session._MagisterSession__password, "password")
+
+        with self.assertRaises(InvalidSessionState):
+            MagisterSession.from_state(
+                state, encryption_key=Fernet.generate_key())
+
+
+if __name__ == "__main__":
+    unittest.main()
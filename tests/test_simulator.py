@@ -0,0 +1,139 @@
+import unittest
+import time
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, AuthcodeCache, JsParser
+from MagisterPy.simulator import MagisterSimulator, SimulatorAdapter, SimulatorServer, SimulatorServerAdapter
+from MagisterPy.load_generator import run_load_test, percentile
+
+SCHOOL, USERNAME, PASSWORD = "Simulated School", "student1", "password"
+
+
+class TestSimulator(unittest.TestCase):
+    def setUp(self):
+        self.simulator = MagisterSimulator()
+
+    def make_session(self, **kwargs):
+        kwargs.setdefault("authcode_cache", AuthcodeCache())
+        kwargs.setdefault("delay_between_relogin_atempts", 0)
+        return MagisterSession(http_adapter=SimulatorAdapter(self.simulator), **kwargs)
+
+    def test_bundle_hides_the_authcode(self):
+        response = self.simulator.handle(
+            "GET", f"https://accounts.magister.net/js/{self.simulator.bundle_name}")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(len(response.body), self.simulator.bundle_size)
+        self.assertEqual(JsParser().get_authcode_slow(response.body.decode()), self.simulator.authcode)
+        self.assertEqual(JsParser().get_authcode_fast(response.body), self.simulator.authcode)
+
+    def test_login_and_fetch(self):
+        session = self.make_session(automatically_handle_errors=False)
+        self.assertTrue(session.login(SCHOOL.lower(), USERNAME, PASSWORD))
+        self.assertEqual(session.api_url, "https://simulatedschool.magister.net/api")
+        self.assertAlmostEqual(session.app_auth_token_expiry, time.time() + 3600, delta=5)
+
+        lessons = session.get_schedule("2024-11-04", "2024-11-10", with_changes=True)
+        self.assertEqual(len(lessons), 5 * self.simulator.lessons_per_day)
+        self.assertTrue(all(lesson.is_valid() for lesson in lessons))
+        cancelled = [lesson for lesson in lessons if lesson.is_cancelled()]
+        self.assertTrue(cancelled)
+        self.assertTrue(all(lesson.has_cancelled_status() for lesson in cancelled))
+
+        grades = session.get_grades(top=10, skip=5)
+        self.assertEqual(len(grades), 10)
+        self.assertTrue(all(grade.is_valid() for grade in grades))
+        self.assertEqual(len(list(session.iter_grades(page_size=25))),
+                         self.simulator.grades_per_student)
+
+        self.assertTrue(session.get_account_profile().is_valid())
+        self.assertTrue(session.get_person_profile().is_valid())
+        self.assertTrue(session.get_photo().startswith(b"\x89PNG"))
+
+    def test_incorrect_credentials(self):
+        self.assertFalse(self.make_session().login(SCHOOL, USERNAME, "wrong password"))
+        self.assertFalse(self.make_session().login(SCHOOL, "nobody", PASSWORD))
+        session = self.make_session()
+        session.input_school(SCHOOL)
+        response = self.simulator.handle(
+            "GET", f"https://accounts.magister.net/challenges/tenant/search?sessionId={session.sessionid}&key=unknown")
+        self.assertEqual(response.body, b"[]")
+
+    def test_expired_token_relogs_in(self):
+        session = self.make_session()
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.simulator.expire_tokens()
+        self.assertEqual(len(session.get_grades(top=5)), 5)
+        self.assertEqual(self.simulator.request_counts["/challenges/password"], 2)
+
+    def test_token_lifetime(self):
+        self.simulator.token_lifetime = 0.2
+        session = self.make_session(enable_automatic_relogin=False)
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.assertIsNotNone(session.get_grades(top=1))
+        time.sleep(0.3)
+        self.assertIsNone(session.get_grades(top=1))
+
+    def test_expired_tokens_are_removed(self):
+        self.simulator.token_lifetime = 0.05
+        self.assertTrue(self.make_session().login(SCHOOL, USERNAME, PASSWORD))
+        tokens, identities = self.simulator._MagisterSimulator__tokens, self.simulator._MagisterSimulator__identities
+        old_tokens, old_identities = set(tokens), set(identities)
+        time.sleep(0.1)
+        self.assertTrue(self.make_session().login(SCHOOL, USERNAME, PASSWORD))
+        self.assertTrue(tokens)
+        self.assertFalse(old_tokens & set(tokens))
+        self.assertFalse(old_identities & set(identities))
+
+    def test_injected_errors(self):
+        session = self.make_session(enable_automatic_relogin=False)
+        self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+        self.simulator.inject_errors(1)
+        self.assertIsNone(session.get_grades(top=1))
+
+        session.request_retries = 1
+        self.simulator.inject_errors(1)
+        with mock.patch("time.sleep"):
+            self.assertEqual(len(session.get_grades(top=1)), 1)
+
+    def test_error_rate(self):
+        self.simulator.error_rate = 0.5
+        statuses = [self.simulator.handle("GET", "https://accounts.magister.net/").status for _ in range(200)]
+        self.assertEqual(set(statuses), {302, 503})
+        self.assertAlmostEqual(statuses.count(503) / len(statuses), 0.5, delta=0.15)
+        self.assertEqual(self.simulator.request_counts["/"], 200)
+
+    def test_server(self):
+        with SimulatorServer(self.simulator) as server:
+            session = MagisterSession(http_adapter=SimulatorServerAdapter(server.url),
+                                      automatically_handle_errors=False, authcode_cache=AuthcodeCache())
+            self.assertTrue(session.login(SCHOOL, USERNAME, PASSWORD))
+            self.assertEqual(len(session.get_grades(top=3)), 3)
+        # the cookies are stored for the real hosts
+        self.assertEqual({cookie.domain for cookie in session.session.cookies}, {"accounts.magister.net"})
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_run_load_test(self):
+        result = run_load_test(MagisterSimulator(), logins=4, concurrency=2, fetches_per_login=2,
+                               authcode_cache=AuthcodeCache())
+        self.assertEqual((result.logins, result.failed_logins), (4, 0))
+        self.assertEqual((result.fetches, result.failed_fetches), (8, 0))
+        self.assertGreater(result.logins_per_second, 0)
+        self.assertLessEqual(result.fetch_p50, result.fetch_p99)
+        # the bundle is only downloaded by the first logins, the others use the cached authcode
+        self.assertLessEqual(result.request_counts["/js/account.js"], 2)
+        self.assertIn("logins/sec", result.format())
+
+
+if __name__ == "__main__":
+    unittest.main()
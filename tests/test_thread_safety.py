@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import MagisterSession, FetchError
+from MagisterPy.error_handler import error_handler
+
+
+class SharedSession(MagisterSession):
+    def __init__(self):
+        super().__init__(automatically_handle_errors=False)
+        self._MagisterSession__school_name = "school"
+        self._MagisterSession__username = "user"
+        self._MagisterSession__password = "password"
+        self.app_auth_token = "expired"
+        self.login_calls = 0
+
+    def login(self, school_name, username, password):
+        self.login_calls += 1
+        time.sleep(0.1)
+        self.app_auth_token = "fresh"
+        self.token_generation += 1
+        return True
+
+    @error_handler
+    def fetch(self):
+        if self.app_auth_token != "fresh":
+            raise FetchError()
+        return self.app_auth_token
+
+
+class TestSingleFlightRelogin(unittest.TestCase):
+    def run_threads(self, target, amount=10):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(target()))
+                   for _ in range(amount)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_relogins_coalesce(self):
+        session = SharedSession()
+        results = self.run_threads(
+            lambda: session.relogin(token_generation=0))
+        self.assertEqual(results, [True] * 10)
+        self.assertEqual(session.login_calls, 1)
+
+    def test_concurrent_failures_coalesce(self):
+        session = SharedSession()
+        results = self.run_threads(session.fetch)
+        self.assertEqual(results, ["fresh"] * 10)
+        self.assertEqual(session.login_calls, 1)
+        self.assertEqual(session.relogin_atempts, session.max_relogin_atempts)
+
+    def test_calls_wait_for_relogin(self):
+        session = SharedSession()
+        relogin_thread = threading.Thread(target=session.relogin)
+        relogin_thread.start()
+        time.sleep(0.02)
+        # this call would fail with the expired token if it didn't wait
+        self.assertEqual(session.fetch(), "fresh")
+        relogin_thread.join()
+        self.assertEqual(session.login_calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../')))  # NOQA
+from MagisterPy import TokenRefresher, MagisterSession, NotLoggedInError
+
+
+class FakeSession():
+    def __init__(self, expires_in):
+        self.app_auth_token_expiry = time.time() + expires_in
+        self.refreshed = threading.Event()
+
+    def relogin(self):
+        self.app_auth_token_expiry = time.time() + 3600
+        self.refreshed.set()
+        return True
+
+    def _logMessage(self, msg, *args, **kwargs):
+        pass
+
+
+class TestTokenRefresher(unittest.TestCase):
+    def test_refresh_time_is_spread(self):
+        refresher = TokenRefresher(refresh_before=300, spread=240)
+        session = FakeSession(expires_in=3600)
+        refresh_times = {refresher.get_refresh_time(session) for _ in range(20)}
+
+        self.assertGreater(len(refresh_times), 1)
+        for refresh_time in refresh_times:
+            self.assertGreaterEqual(
+                refresh_time, session.app_auth_token_expiry - 540)
+            self.assertLessEqual(
+                refresh_time, session.app_auth_token_expiry - 300)
+
+    def test_unknown_expiry(self):
+        session = FakeSession(expires_in=0)
+        session.app_auth_token_expiry = None
+        self.assertFalse(TokenRefresher().register(session))
+        self.assertTrue(TokenRefresher(
+            fallback_token_lifetime=3600).register(session))
+
+    def test_refreshes_before_expiry(self):
+        session = FakeSession(expires_in=1)
+        with TokenRefresher(refresh_before=1, spread=0.1) as refresher:
+            refresher.register(session)
+            self.assertTrue(session.refreshed.wait(timeout=2))
+        self.assertGreater(session.app_auth_token_expiry, time.time() + 3000)
+
+    def test_unregister(self):
+        session = FakeSession(expires_in=1)
+        with TokenRefresher(refresh_before=1, spread=0.1) as refresher:
+            refresher.register(session)
+            refresher.unregister(session)
+            self.assertFalse(session.refreshed.wait(timeout=0.3))
+
+    def test_failing_relogins_are_retried(self):
+        session = FakeSession(expires_in=0.1)
+        relogin = session.relogin
+        calls = []
+
+        def failing_relogin():
+            calls.append(True)
+            if len(calls) == 1:
+                raise NotLoggedInError()
+            return relogin()
+        session.relogin = failing_relogin
+        with TokenRefresher(refresh_before=0.1, spread=0.05, retry_delay=0.1) as refresher:
+            refresher.register(session)
+            self.assertTrue(session.refreshed.wait(timeout=2))
+        self.assertEqual(len(calls), 2)
+
+    def test_resumed_session_without_password(self):
+        logged_in = MagisterSession()
+        logged_in.app_auth_token = "Bearer token"
+        logged_in.api_url = "https://school.magister.net/api"
+        logged_in.person_id, logged_in.account_id = "1", "2"
+        logged_in._MagisterSession__school_name = "school"
+        logged_in._MagisterSession__username = "user"
+        session = MagisterSession.from_state(logged_in.export_state())
+        session.app_auth_token_expiry = time.time() + 0.1
+
+        calls = threading.Semaphore(0)
+        relogin = session.relogin
+
+        def counting_relogin():
+            try:
+                return relogin()
+            finally:
+                calls.release()
+        session.relogin = counting_relogin
+        with TokenRefresher(refresh_before=0.1, spread=0.05, retry_delay=0.1) as refresher:
+            refresher.register(session)
+            # the relogin fails, but the session stays scheduled and is tried again
+            self.assertTrue(calls.acquire(timeout=2))
+            self.assertTrue(calls.acquire(timeout=2))
+            self.assertEqual(len(refresher), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()